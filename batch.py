@@ -0,0 +1,197 @@
+# imports
+from main import process_input, read_file_content
+from utils.tracing import start_trace
+from utils.metrics import REGISTRY, start_metrics_server_from_env
+from retention import start_retention_from_env
+from dotenv import load_dotenv
+from typing import Dict, Any, List, Iterator, Optional, Callable, Awaitable, TextIO
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import sys
+import time
+import typer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.json', '.txt', '.eml')
+
+# document discovery from directories, glob patterns and jsonl manifests
+def _document_from_path(path: str) -> Dict[str, Any]:
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return {"source": path, "path": path, "input_type": extension or None}
+
+def _documents_from_manifest(manifest_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield documents from a JSONL manifest.
+
+    Each line is either {"path": ...} or {"text": ...}, optionally with
+    "id" and "input_type" keys.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            source = entry.get("id") or f"{manifest_path}:{line_number}"
+            if "path" in entry:
+                path = entry["path"]
+                if not os.path.isabs(path):
+                    path = os.path.join(base_dir, path)
+                document = _document_from_path(path)
+                document["source"] = source
+            elif "text" in entry:
+                document = {"source": source, "text": entry["text"], "input_type": None}
+            else:
+                raise ValueError(f"Manifest line {line_number} needs a 'path' or 'text' key")
+            if entry.get("input_type"):
+                document["input_type"] = entry["input_type"]
+            yield document
+
+def collect_documents(source: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield documents for a batch source.
+
+    Args:
+        source: A directory, a glob pattern or a .jsonl manifest
+
+    Returns:
+        Iterator of document dicts with "source" and either "path" or "text"
+    """
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield _document_from_path(os.path.join(root, name))
+    elif source.lower().endswith('.jsonl'):
+        yield from _documents_from_manifest(source)
+    else:
+        for path in sorted(glob.iglob(source, recursive=True)):
+            if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield _document_from_path(path)
+
+QUEUE_DEPTH = REGISTRY.gauge("flowbit_batch_queue_depth", "Documents discovered but not yet picked up by a worker")
+IN_PROGRESS = REGISTRY.gauge("flowbit_batch_in_progress", "Documents being processed by batch workers")
+
+async def load_document(document: Dict[str, Any]) -> str:
+    """Return the text for a document, reading it from disk if needed."""
+    if "text" in document:
+        return document["text"]
+    return await read_file_content(document["path"])
+
+# throughput and latency reporting
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize_batch(latencies: List[float], failed: int, elapsed: float) -> Dict[str, Any]:
+    documents = len(latencies)
+    return {
+        "documents": documents,
+        "succeeded": documents - failed,
+        "failed": failed,
+        "elapsed_seconds": round(elapsed, 3),
+        "docs_per_sec": round(documents / elapsed, 3) if elapsed > 0 else 0.0,
+        "p50_latency_seconds": round(percentile(latencies, 50), 3),
+        "p95_latency_seconds": round(percentile(latencies, 95), 3),
+    }
+
+# batch runner
+async def run_batch(
+    sources: List[str],
+    concurrency: int = 8,
+    output: Optional[TextIO] = None,
+    process: Callable[..., Awaitable[Dict[str, Any]]] = process_input,
+) -> Dict[str, Any]:
+    """
+    Process every document from the given sources with bounded concurrency.
+
+    Args:
+        sources: Directories, glob patterns or .jsonl manifests
+        concurrency: Maximum number of documents (and so LLM calls) in flight
+        output: Stream that receives one JSON result per line as documents finish
+        process: Coroutine used to process a single document
+
+    Returns:
+        Summary with document counts, docs/sec and p50/p95 latency
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    # Bounded queue keeps discovery lazy for very large backlogs
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    latencies: List[float] = []
+    failed = 0
+
+    async def producer():
+        for source in sources:
+            for document in collect_documents(source):
+                await queue.put(document)
+                QUEUE_DEPTH.inc()
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker():
+        nonlocal failed
+        while True:
+            document = await queue.get()
+            if document is None:
+                return
+            QUEUE_DEPTH.dec()
+            IN_PROGRESS.inc()
+            started = time.perf_counter()
+            try:
+                # File loading joins the document's trace, which process_input names after its input_id
+                with start_trace():
+                    text = await load_document(document)
+                    result = await process(text, document.get("input_type"))
+            except Exception as e:
+                logger.error(f"Failed to process {document['source']}: {str(e)}")
+                result = {"error": str(e), "status": "error"}
+            finally:
+                IN_PROGRESS.dec()
+            latency = time.perf_counter() - started
+            latencies.append(latency)
+            if result.get("status") != "success":
+                failed += 1
+            if output is not None:
+                record = {"source": document["source"], "latency_seconds": round(latency, 3), **result}
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+
+    started = time.perf_counter()
+    await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+    return summarize_batch(latencies, failed, time.perf_counter() - started)
+
+@app.command()
+def run(
+    sources: List[str] = typer.Argument(..., help="Directories, glob patterns or .jsonl manifests"),
+    concurrency: int = typer.Option(8, help="Maximum number of in-flight documents"),
+    output: Optional[str] = typer.Option(None, help="JSONL file for per-document results (default: stdout)"),
+):
+    """Process a backlog of documents and report throughput."""
+    load_dotenv()
+    start_metrics_server_from_env()
+    retention = start_retention_from_env()
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            summary = asyncio.run(run_batch(sources, concurrency, f))
+    else:
+        summary = asyncio.run(run_batch(sources, concurrency, sys.stdout))
+    if retention:
+        retention.stop()
+    typer.echo(json.dumps(summary, indent=2), err=True)
+
+if __name__ == "__main__":
+    app()
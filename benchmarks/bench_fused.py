@@ -0,0 +1,98 @@
+"""
+Compare the fused single-call pipeline with the two-stage pipeline.
+
+Runs every document of a labelled corpus through process_input in both
+modes and reports latency, estimated input/output tokens and how often
+the two modes agree on format, intent and key extracted fields. The
+pre-classifier is disabled by default so both modes exercise the LLM.
+
+Usage: python -m benchmarks.bench_fused [--corpus PATH] [--keep-preclassifier]
+"""
+from benchmarks.eval_preclassifier import load_corpus, DEFAULT_CORPUS
+from batch import percentile
+from chunking import estimate_tokens
+from typing import Dict, Any, List
+import asyncio
+import json
+import time
+import typer
+import main
+
+app = typer.Typer()
+
+class CallRecorder:
+    """Wraps main.invoke_chain to count LLM calls and estimate token usage."""
+
+    def __init__(self, invoke):
+        self.invoke = invoke
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    async def __call__(self, chain, payload):
+        prompt_messages = chain.first.format_messages(**payload)
+        self.input_tokens += sum(estimate_tokens(str(m.content)) for m in prompt_messages)
+        response = await self.invoke(chain, payload)
+        self.calls += 1
+        self.output_tokens += estimate_tokens(str(response.content))
+        return response
+
+def _agreement(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, bool]:
+    ca, cb = a.get("classification", {}), b.get("classification", {})
+    ra, rb = a.get("result", {}), b.get("result", {})
+    if "flowbit_formatted_data" in ra or "flowbit_formatted_data" in rb:
+        fields_match = ra.get("flowbit_formatted_data") == rb.get("flowbit_formatted_data")
+    else:
+        fields_match = all(ra.get(k) == rb.get(k) for k in main.EMAIL_RESULT_KEYS[1:])
+    return {
+        "format": ca.get("classified_format") == cb.get("classified_format"),
+        "intent": ca.get("classified_intent") == cb.get("classified_intent"),
+        "fields": fields_match,
+    }
+
+async def _run_mode(corpus: List[Dict[str, Any]], mode: str) -> Dict[str, Any]:
+    recorder = CallRecorder(main.invoke_chain)
+    original = main.invoke_chain
+    main.invoke_chain = recorder
+    latencies, results = [], []
+    try:
+        for example in corpus:
+            started = time.perf_counter()
+            results.append(await main.process_input(example["text"], example.get("input_type"), use_cache=False, mode=mode))
+            latencies.append(time.perf_counter() - started)
+    finally:
+        main.invoke_chain = original
+    return {
+        "results": results,
+        "summary": {
+            "mode": mode,
+            "llm_calls": recorder.calls,
+            "input_tokens": recorder.input_tokens,
+            "output_tokens": recorder.output_tokens,
+            "p50_latency_seconds": round(percentile(latencies, 50), 3),
+            "p95_latency_seconds": round(percentile(latencies, 95), 3),
+            "errors": sum(r.get("status") != "success" for r in results),
+        }
+    }
+
+async def compare(corpus: List[Dict[str, Any]]) -> Dict[str, Any]:
+    two_stage = await _run_mode(corpus, "two_stage")
+    fused = await _run_mode(corpus, "fused")
+    agreements = [_agreement(a, b) for a, b in zip(two_stage["results"], fused["results"])]
+    return {
+        "two_stage": two_stage["summary"],
+        "fused": fused["summary"],
+        "agreement": {key: round(sum(a[key] for a in agreements) / len(agreements), 3) for key in ("format", "intent", "fields")},
+    }
+
+@app.command()
+def run(corpus: str = typer.Option(DEFAULT_CORPUS, help="Labelled JSONL corpus"),
+        keep_preclassifier: bool = typer.Option(False, help="Leave the rule-based pre-classifier enabled")):
+    """Benchmark fused vs two-stage processing."""
+    if not keep_preclassifier:
+        main.PRECLASSIFY_THRESHOLD = float("inf")
+    report = asyncio.run(compare(load_corpus(corpus)))
+    typer.echo(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,92 @@
+"""
+Benchmark strip_html on large marketing-style HTML emails.
+
+Compares the original BeautifulSoup tree walk with the streaming
+HTMLParser converter and the regex path used above
+HTML_PARSER_MAX_CHARS, and checks that all three agree on the text.
+
+Usage: python -m benchmarks.bench_html --size-kb 500
+"""
+from utils.email_utils import _parse_html_text, _regex_html_text, strip_html
+from bs4 import BeautifulSoup
+import random
+import re
+import time
+import typer
+
+app = typer.Typer()
+
+def legacy_strip_html(content: str) -> str:
+    """strip_html as it was before the streaming converter."""
+    soup = BeautifulSoup(content, 'html.parser')
+    for br in soup.find_all('br'):
+        br.replace_with('\n')
+    for tag in soup.find_all(['p', 'div']):
+        tag.insert_before(soup.new_string('\n'))
+        tag.append(soup.new_string('\n'))
+    text = soup.get_text()
+    text = re.sub(r'\r\n?', '\n', text)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+def _normalize(text: str) -> str:
+    text = re.sub(r'\r\n?', '\n', text)
+    return re.sub(r'\n\s*\n', '\n\n', text).strip()
+
+BLOCK = """
+<table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="max-width:600px;margin:0 auto">
+  <tr><td class="hero" style="padding:24px;font-family:Arial,sans-serif;color:#333333">
+    <div class="headline" style="font-size:22px;font-weight:bold">Offer {n}: save {pct}% on Widget {n}</div>
+    <p style="margin:0 0 12px 0">Dear customer,<br>our <b>spring</b> range &amp; accessories are back &mdash; order before {day}/05.</p>
+    <p><a href="https://example.com/track?u={n}&amp;c=spring" style="color:#0066cc">Shop now &raquo;</a></p>
+    <!-- tracking pixel {n} -->
+    <img src="https://example.com/p/{n}.gif" width="1" height="1" alt="">
+  </td></tr>
+</table>
+"""
+
+def make_marketing_email(size_kb: int, seed: int = 0) -> str:
+    """Nested-table promotional HTML of roughly size_kb kilobytes."""
+    rng = random.Random(seed)
+    head = ("<html><head><style>.hero{padding:24px} @media (max-width:600px){.hero{padding:8px}}</style>"
+            "<script>window.dataLayer=[];</script></head><body>")
+    blocks = []
+    size = len(head)
+    n = 0
+    while size < size_kb * 1024:
+        block = BLOCK.format(n=n, pct=rng.randint(5, 60), day=rng.randint(1, 28))
+        blocks.append(block)
+        size += len(block)
+        n += 1
+    return head + "".join(blocks) + "<div>Unsubscribe<br>Example Ltd</div></body></html>"
+
+def _time(func, content: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+@app.command()
+def main(size_kb: int = typer.Option(500, help="Approximate size of the synthetic email"),
+         repeat: int = typer.Option(3, help="Runs per method (best is reported)")):
+    """Compare HTML-to-text strategies on one large email."""
+    content = make_marketing_email(size_kb)
+    expected = legacy_strip_html(content)
+    methods = {
+        "BeautifulSoup (legacy)": legacy_strip_html,
+        "streaming HTMLParser": lambda html: _normalize(_parse_html_text(html)),
+        "regex (large inputs)": lambda html: _normalize(_regex_html_text(html)),
+        "strip_html": strip_html,
+    }
+    typer.echo(f"{len(content) / 1024:.0f} KB of HTML")
+    baseline = None
+    for name, func in methods.items():
+        seconds = _time(func, content, repeat)
+        baseline = baseline or seconds
+        same = "same text" if func(content) == expected else "TEXT DIFFERS"
+        typer.echo(f"{name:<26}{seconds * 1000:>10.1f} ms  {baseline / seconds:>5.1f}x  {same}")
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,118 @@
+"""
+Microbenchmark for the SharedMemory stores.
+
+Compares per-write commits (the original behaviour), the batched
+SharedMemory writer and AsyncSharedMemory at 1, 10 and 100 concurrent
+writers. Each document performs the three writes process_input makes.
+
+Usage: python -m benchmarks.bench_memory --documents 600
+"""
+from memory import SharedMemory, AsyncSharedMemory, ensure_schema, INSERT_INPUT_SQL, INSERT_CLASSIFICATION_SQL, INSERT_RESULT_SQL, PREVIEW_CHARS
+from datetime import datetime
+from typing import Dict, Any, List
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import typer
+
+app = typer.Typer()
+
+CLASSIFICATION = {"classified_format": "Email_Text", "classified_intent": "RFQ", "reasoning": "benchmark"}
+RESULT = {"primary_request_summary": "benchmark", "action_items_implied": ["a", "b"]}
+TEXT = "Subject: Benchmark\n\n" + "Lorem ipsum dolor sit amet. " * 40
+
+class CommitPerWriteStore:
+    """The original SharedMemory behaviour: one commit per store_* call."""
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path)
+        ensure_schema(self.conn)
+
+    def store_input(self, input_id, input_text, input_type=None):
+        self.conn.execute(INSERT_INPUT_SQL, (input_id, input_text, datetime.now().isoformat(), input_type, None, None,
+                                             input_text[:PREVIEW_CHARS]))
+        self.conn.commit()
+
+    def store_classification(self, input_id, classification):
+        self.conn.execute(INSERT_CLASSIFICATION_SQL, (input_id, classification["classified_format"],
+                          classification["classified_intent"], classification["reasoning"], datetime.now().isoformat()))
+        self.conn.commit()
+
+    def store_result(self, input_id, result):
+        self.conn.execute(INSERT_RESULT_SQL, (input_id, json.dumps(result), datetime.now().isoformat(), None, None))
+        self.conn.commit()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.conn.close()
+
+async def _loop_lag_monitor(stop: asyncio.Event, lags: List[float]):
+    """Record how late a 1 ms timer fires; blocking writes show up as large lags."""
+    while not stop.is_set():
+        expected = time.perf_counter() + 0.001
+        await asyncio.sleep(0.001)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+async def _run(store_name: str, db_path: str, writers: int, documents: int) -> Dict[str, Any]:
+    if store_name == "commit-per-write":
+        store = CommitPerWriteStore(db_path)
+    elif store_name == "sync-batched":
+        store = SharedMemory(db_path)
+    else:
+        store = await AsyncSharedMemory(db_path).open()
+    is_async = isinstance(store, AsyncSharedMemory)
+
+    async def writer(index: int):
+        for n in range(index, documents, writers):
+            input_id = f"doc-{n}"
+            if is_async:
+                await store.store_input(input_id, TEXT, "txt")
+                await store.store_classification(input_id, CLASSIFICATION)
+                await store.store_result(input_id, RESULT)
+            else:
+                store.store_input(input_id, TEXT, "txt")
+                store.store_classification(input_id, CLASSIFICATION)
+                store.store_result(input_id, RESULT)
+                await asyncio.sleep(0)
+
+    stop = asyncio.Event()
+    lags: List[float] = []
+    monitor = asyncio.ensure_future(_loop_lag_monitor(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(i) for i in range(writers)))
+    if is_async:
+        await store.close()
+    else:
+        store.flush()
+        store.close()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+    return {
+        "store": store_name,
+        "writers": writers,
+        "docs_per_sec": round(documents / elapsed, 1),
+        "max_loop_lag_ms": round(max(lags, default=0.0) * 1000, 2),
+    }
+
+@app.command()
+def main(documents: int = typer.Option(600, help="Documents written per run"),
+         writers: List[int] = typer.Option([1, 10, 100], help="Concurrent writer counts")):
+    """Compare SharedMemory stores at several writer counts."""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in writers:
+            for store_name in ("commit-per-write", "sync-batched", "async"):
+                db_path = os.path.join(tmp, f"{store_name}-{count}.db")
+                rows.append(asyncio.run(_run(store_name, db_path, count, documents)))
+    typer.echo(f"{'store':<18}{'writers':>8}{'docs/sec':>12}{'max lag ms':>12}")
+    for row in rows:
+        typer.echo(f"{row['store']:<18}{row['writers']:>8}{row['docs_per_sec']:>12}{row['max_loop_lag_ms']:>12}")
+
+if __name__ == "__main__":
+    app()
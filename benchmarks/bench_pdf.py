@@ -0,0 +1,69 @@
+"""
+Benchmark PDF text extraction on a large synthetic document.
+
+Compares the original approach (open to validate, reopen, += per page)
+with the single-open in-process path and the page-parallel process pool.
+
+Usage: python -m benchmarks.bench_pdf --pages 300
+"""
+from utils.pdf_utils import extract_pdf_text, iter_pdf_pages, get_process_pool
+import fitz
+import os
+import tempfile
+import time
+import typer
+
+app = typer.Typer()
+
+PARAGRAPH = ("Article {n}. Member States shall ensure that operators comply with the "
+             "requirements laid down in this Regulation and report annually. ") * 6
+
+def build_pdf(path: str, pages: int) -> None:
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), PARAGRAPH.format(n=n) * 4, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+def legacy_extract(path: str) -> str:
+    doc = fitz.open(path)
+    doc.close()
+    doc = fitz.open(path)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    doc.close()
+    return text
+
+def _time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+@app.command()
+def main(pages: int = typer.Option(300, help="Pages in the synthetic PDF"),
+         repeat: int = typer.Option(3, help="Runs per method (best is reported)")):
+    """Compare PDF extraction strategies."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "large.pdf")
+        build_pdf(path, pages)
+        # Warm the pool so worker start-up is not billed to the first run
+        get_process_pool().submit(len, "").result()
+        results = {
+            "legacy (open twice, +=)": _time(lambda: legacy_extract(path), repeat),
+            "single open, in-process": _time(lambda: extract_pdf_text(path, parallel_threshold=pages + 1), repeat),
+            "page-parallel pool": _time(lambda: extract_pdf_text(path, parallel_threshold=1), repeat),
+        }
+        first_page = time.perf_counter()
+        next(iter_pdf_pages(path))
+        results["streaming: first page"] = time.perf_counter() - first_page
+    typer.echo(f"{pages} pages, {os.cpu_count()} CPUs")
+    for name, seconds in results.items():
+        typer.echo(f"{name:<28}{seconds * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    app()
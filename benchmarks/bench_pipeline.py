@@ -0,0 +1,226 @@
+"""
+End-to-end pipeline benchmark with a simulated LLM.
+
+Drives process_input through the batch runner over a synthetic corpus of
+plain emails, HTML emails, JSON payloads for every schema and multi-page
+PDFs. The LLM is the deterministic fake backend with latency drawn from a
+configurable distribution, so runs are repeatable and need no network.
+
+Reports throughput, per-stage and per-kind latency, peak Python memory and
+SQLite write rate, and compares them with a stored baseline. Exits with
+status 1 when a metric regresses beyond the tolerance.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--per-kind 5] [--latency lognormal:0.05,0.5]
+    python -m benchmarks.bench_pipeline --save-baseline
+"""
+from benchmarks.synthetic import build_corpus
+from batch import percentile, run_batch
+from fake_llm import FakeChatModel, LatencyDistribution
+from llm_client import get_llm_client
+from memory import get_shared_memory
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+import asyncio
+import functools
+import io
+import json
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+import typer
+import batch
+import main
+
+app = typer.Typer()
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "pipeline.json")
+
+# (module, attribute, stage) patched with timing wrappers during a run
+STAGES = [
+    (batch, "load_document", "load"),
+    (main, "classify_input", "classify"),
+    (main, "process_json_input", "json_agent"),
+    (main, "process_email_input", "email_agent"),
+    (main, "process_fused_input", "fused"),
+    (main, "invoke_chain", "llm_call"),
+]
+
+class StageTimer:
+    """Collects wall-clock samples per pipeline stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, func):
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - started)
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            stage: {
+                "count": len(values),
+                "p50_seconds": round(percentile(values, 50), 4),
+                "p95_seconds": round(percentile(values, 95), 4),
+                "total_seconds": round(sum(values), 3),
+            }
+            for stage, values in sorted(self.samples.items())
+        }
+
+async def run_pipeline(documents: List[Dict[str, Any]], workdir: str, concurrency: int = 8,
+                       use_cache: bool = False, mode: Optional[str] = None) -> Dict[str, Any]:
+    """Process documents via the batch runner and collect metrics; the SQLite store lives in workdir."""
+    manifest = os.path.join(workdir, "manifest.jsonl")
+    with open(manifest, "w", encoding="utf-8") as f:
+        for document in documents:
+            entry = {k: document[k] for k in ("id", "input_type", "text", "path") if document.get(k) is not None}
+            f.write(json.dumps(entry) + "\n")
+    kinds = {document["id"]: document["kind"] for document in documents}
+
+    timer = StageTimer()
+    originals = [(module, attribute, getattr(module, attribute)) for module, attribute, _ in STAGES]
+    for (module, attribute, stage), (_, _, original) in zip(STAGES, originals):
+        setattr(module, attribute, timer.wrap(stage, original))
+    memory = get_shared_memory(os.path.join(workdir, "flowbit.db"))
+    writes_before = memory.writes
+
+    async def process(text: str, input_type: Optional[str] = None) -> Dict[str, Any]:
+        return await main.process_input(text, input_type, use_cache=use_cache, mode=mode)
+
+    output = io.StringIO()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    tracemalloc.start()
+    try:
+        summary = await run_batch([manifest], concurrency, output, timer.wrap("total", process))
+        started = time.perf_counter()
+        memory.flush()
+        flush_seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        os.chdir(cwd)
+        for module, attribute, original in originals:
+            setattr(module, attribute, original)
+
+    by_kind: Dict[str, List[float]] = defaultdict(list)
+    for line in output.getvalue().splitlines():
+        record = json.loads(line)
+        by_kind[kinds[record["source"]]].append(record["latency_seconds"])
+    writes = memory.writes - writes_before
+    return {
+        **summary,
+        "stages": timer.summary(),
+        "kinds": {kind: {"count": len(values), "p50_seconds": round(percentile(values, 50), 4),
+                         "p95_seconds": round(percentile(values, 95), 4)} for kind, values in sorted(by_kind.items())},
+        "memory": {
+            "python_peak_mb": round(peak / 2 ** 20, 2),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        },
+        "db": {
+            "writes": writes,
+            "writes_per_sec": round(writes / (summary["elapsed_seconds"] + flush_seconds), 1) if writes else 0.0,
+            "final_flush_seconds": round(flush_seconds, 4),
+        },
+        "llm": get_llm_client().stats(),
+    }
+
+# baseline comparison: metric name -> (path into the report, True if higher is better)
+def _metrics(report: Dict[str, Any]) -> Dict[str, tuple]:
+    metrics = {
+        "docs_per_sec": (report["docs_per_sec"], True),
+        "p95_latency_seconds": (report["p95_latency_seconds"], False),
+        "python_peak_mb": (report["memory"]["python_peak_mb"], False),
+        "db_writes_per_sec": (report["db"]["writes_per_sec"], True),
+    }
+    for stage, values in report["stages"].items():
+        metrics[f"stage.{stage}.p95_seconds"] = (values["p95_seconds"], False)
+    return metrics
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25,
+                        min_seconds: float = 0.005) -> List[Dict[str, Any]]:
+    """
+    List metrics that are worse than the baseline by more than tolerance.
+
+    Latencies below min_seconds in both runs are ignored; at that scale the
+    difference is timer noise.
+    """
+    regressions = []
+    current, previous = _metrics(report), _metrics(baseline)
+    for name, (value, higher_is_better) in current.items():
+        if name not in previous:
+            continue
+        expected = previous[name][0]
+        if name.endswith("_seconds") and max(value, expected) < min_seconds:
+            continue
+        if higher_is_better:
+            regressed = value < expected * (1 - tolerance)
+        else:
+            regressed = value > expected * (1 + tolerance)
+        if regressed:
+            change = (value - expected) / expected if expected else float("inf")
+            regressions.append({"metric": name, "baseline": expected, "current": value, "change": round(change, 3)})
+    return regressions
+
+async def benchmark(per_kind: int = 5, seed: int = 0, latency: str = "lognormal:0.05,0.5", concurrency: int = 8,
+                    pdf_pages: int = 8, use_cache: bool = False, mode: Optional[str] = None) -> Dict[str, Any]:
+    """Build a corpus in a temporary directory and run it against the fake LLM."""
+    client = get_llm_client()
+    previous_backend = client._model or client.backend_name
+    client.set_backend(FakeChatModel(latency=LatencyDistribution(latency, seed)))
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            documents = build_corpus(workdir, per_kind=per_kind, seed=seed, pdf_pages=pdf_pages)
+            report = await run_pipeline(documents, workdir, concurrency, use_cache, mode)
+            get_shared_memory(os.path.join(workdir, "flowbit.db")).close()
+    finally:
+        client.set_backend(previous_backend)
+    report["config"] = {"per_kind": per_kind, "seed": seed, "latency": latency, "concurrency": concurrency,
+                        "pdf_pages": pdf_pages, "use_cache": use_cache, "mode": mode or main.PIPELINE_MODE}
+    return report
+
+@app.command()
+def run(per_kind: int = typer.Option(5, help="Documents of each kind (JSON: per schema)"),
+        seed: int = typer.Option(0, help="Corpus and latency seed"),
+        latency: str = typer.Option("lognormal:0.05,0.5", help="fixed:S, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA"),
+        concurrency: int = typer.Option(8, help="Documents in flight"),
+        pdf_pages: int = typer.Option(8, help="Typical PDF page count"),
+        use_cache: bool = typer.Option(False, help="Enable the result cache"),
+        mode: Optional[str] = typer.Option(None, help="Pipeline mode: two_stage or fused"),
+        baseline: str = typer.Option(DEFAULT_BASELINE, help="Baseline report to compare against"),
+        save_baseline: bool = typer.Option(False, help="Write this run as the new baseline"),
+        tolerance: float = typer.Option(0.25, help="Allowed relative regression per metric")):
+    """Benchmark the end-to-end pipeline and check for regressions."""
+    report = asyncio.run(benchmark(per_kind, seed, latency, concurrency, pdf_pages, use_cache, mode))
+    typer.echo(json.dumps(report, indent=2))
+    if save_baseline:
+        os.makedirs(os.path.dirname(baseline), exist_ok=True)
+        with open(baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        typer.echo(f"Baseline written to {baseline}", err=True)
+        return
+    if not os.path.exists(baseline):
+        typer.echo(f"No baseline at {baseline}; run with --save-baseline to create one", err=True)
+        return
+    with open(baseline, encoding="utf-8") as f:
+        stored = json.load(f)
+    if stored.get("config") != report["config"]:
+        typer.echo(f"Warning: baseline config {stored.get('config')} differs from this run", err=True)
+    regressions = compare_to_baseline(report, stored, tolerance)
+    for regression in regressions:
+        typer.echo(f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+                   f"({regression['change']:+.1%})", err=True)
+    if regressions:
+        raise typer.Exit(code=1)
+    typer.echo("No regressions against baseline", err=True)
+
+if __name__ == "__main__":
+    app()
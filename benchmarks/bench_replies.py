@@ -0,0 +1,69 @@
+"""
+Measure prompt token reduction from stripping quoted replies, signatures and disclaimers.
+
+Runs reduce_reply_chain over synthetic email threads (or every .txt/.eml
+file in --corpus, one thread per file) and reports estimated tokens before
+and after, per thread and overall.
+
+Usage: python -m benchmarks.bench_replies --threads 20 --messages 6
+"""
+from benchmarks.synthetic import make_thread
+from chunking import estimate_tokens
+from utils.reply_utils import reduce_reply_chain
+from typing import Dict, List, Optional
+import os
+import random
+import time
+import typer
+
+app = typer.Typer()
+
+def _load_corpus(directory: str) -> Dict[str, List[str]]:
+    threads = {}
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.txt', '.eml')):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as f:
+                threads[name] = [f.read()]
+    return threads
+
+def measure(threads: Dict[str, List[str]]) -> Dict[str, Dict[str, float]]:
+    """Estimated tokens before/after reduction, summed over each thread's messages."""
+    report = {}
+    for name, messages in threads.items():
+        before = after = 0
+        kinds: Dict[str, int] = {}
+        for message in messages:
+            reduction = reduce_reply_chain(message)
+            before += estimate_tokens(message)
+            after += estimate_tokens(reduction.text)
+            for span in reduction.stripped:
+                kinds[span["kind"]] = kinds.get(span["kind"], 0) + 1
+        report[name] = {"messages": len(messages), "tokens_before": before, "tokens_after": after,
+                        "reduction": round(1 - after / before, 3) if before else 0.0, "stripped": kinds}
+    return report
+
+@app.command()
+def main(threads: int = typer.Option(20, help="Synthetic threads to generate"),
+         messages: int = typer.Option(6, help="Messages per synthetic thread"),
+         corpus: Optional[str] = typer.Option(None, help="Directory of .txt/.eml files to measure instead"),
+         seed: int = typer.Option(0)):
+    """Report token reduction per thread."""
+    if corpus:
+        sample = _load_corpus(corpus)
+    else:
+        rng = random.Random(seed)
+        sample = {f"thread-{n}": make_thread(rng, messages) for n in range(threads)}
+    started = time.perf_counter()
+    report = measure(sample)
+    elapsed = time.perf_counter() - started
+    for name, row in report.items():
+        typer.echo(f"{name:<24}{row['messages']:>4} msgs {row['tokens_before']:>8} -> {row['tokens_after']:>6} tokens"
+                   f"  ({row['reduction']:.0%})")
+    before = sum(row["tokens_before"] for row in report.values())
+    after = sum(row["tokens_after"] for row in report.values())
+    count = sum(row["messages"] for row in report.values())
+    typer.echo(f"total: {before} -> {after} tokens ({1 - after / max(before, 1):.0%} fewer), "
+               f"{elapsed / max(count, 1) * 1000:.2f} ms per message")
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,90 @@
+"""
+Measure SharedMemory size and throughput with inline vs compact storage.
+
+Stores a synthetic mailbox (reply threads that quote their whole history,
+and PDFs that arrive several times) with inline text and with compressed,
+content-addressed blobs, then reads every record back. Also converts the
+inline database with migrate_storage and reports the time and size change.
+
+Usage: python -m benchmarks.bench_storage --threads 40 --pdfs 20 --copies 5
+"""
+from benchmarks.synthetic import COMPANIES, PRODUCTS, make_thread
+from fake_llm import extract_email
+from memory import SharedMemory
+from migrate_storage import database_size, migrate
+from utils.compression import DEFAULT_CODEC
+from typing import Any, Dict, List, Tuple
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import typer
+
+app = typer.Typer()
+
+def make_pdf_text(rng: random.Random, pages: int) -> str:
+    lines = []
+    for number in range(pages):
+        lines.append(f"INVOICE No. {rng.randint(1000, 9999)}  page {number + 1}/{pages}  Customer: {rng.choice(COMPANIES)}")
+        lines += [f"{rng.randint(1, 99)} x {rng.choice(PRODUCTS)}  ${rng.randint(10, 999)}.00" for _ in range(40)]
+    return "\n".join(lines)
+
+def make_mailbox(threads: int, messages: int, pdfs: int, copies: int, seed: int) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """(input_type, text, result) per document, shuffled."""
+    rng = random.Random(seed)
+    documents = [("email", text, extract_email(text)) for _ in range(threads) for text in make_thread(rng, messages)]
+    for _ in range(pdfs):
+        text = make_pdf_text(rng, rng.randint(2, 10))
+        result = {"flowbit_formatted_data": {"invoice_text_chars": len(text)}, "processing_report": {"status": "success"}}
+        documents += [("pdf", text, result)] * copies
+    rng.shuffle(documents)
+    return documents
+
+def measure(db_path: str, documents: List[Tuple[str, str, Dict[str, Any]]], compact: bool) -> Dict[str, float]:
+    memory = SharedMemory(db_path, compact=compact)
+    started = time.perf_counter()
+    for number, (input_type, text, result) in enumerate(documents):
+        memory.store_input(f"doc-{number}", text, input_type)
+        memory.store_result(f"doc-{number}", result)
+    memory.flush()
+    write_seconds = time.perf_counter() - started
+    memory.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    order = list(range(len(documents)))
+    random.Random(1).shuffle(order)
+    started = time.perf_counter()
+    for number in order:
+        memory.get_record(f"doc-{number}")
+    read_seconds = time.perf_counter() - started
+    memory.close()
+    return {
+        "size_mb": round(database_size(db_path) / 1e6, 2),
+        "writes_per_sec": round(len(documents) / write_seconds),
+        "reads_per_sec": round(len(documents) / read_seconds),
+    }
+
+@app.command()
+def run(threads: int = typer.Option(40, help="Reply threads"),
+        messages: int = typer.Option(8, help="Messages per thread"),
+        pdfs: int = typer.Option(20, help="Distinct PDFs"),
+        copies: int = typer.Option(5, help="Times each PDF is received"),
+        seed: int = typer.Option(0)):
+    """Compare inline and compact storage on the same documents"""
+    documents = make_mailbox(threads, messages, pdfs, copies, seed)
+    raw_mb = sum(len(text.encode()) + len(json.dumps(result)) for _, text, result in documents) / 1e6
+    typer.echo(f"{len(documents)} documents, {raw_mb:.1f} MB of text and results, codec {DEFAULT_CODEC}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for compact in (False, True):
+            report = measure(os.path.join(workdir, f"compact-{compact}.db"), documents, compact)
+            typer.echo(f"{'compact' if compact else 'inline':<8} {report['size_mb']:>8.2f} MB  "
+                       f"{report['writes_per_sec']:>7} docs/s written  {report['reads_per_sec']:>7} records/s read")
+        migrated = os.path.join(workdir, "migrated.db")
+        shutil.copy(os.path.join(workdir, "compact-False.db"), migrated)
+        report = migrate(migrated, vacuum=True)
+        typer.echo(f"migrate  {report['size_before'] / 1e6:>8.2f} MB -> {report['size_after'] / 1e6:.2f} MB "
+                   f"in {report['seconds']:.2f}s")
+
+if __name__ == "__main__":
+    app()
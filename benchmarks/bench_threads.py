@@ -0,0 +1,96 @@
+"""
+Measure per-message LLM cost across a long email thread.
+
+Processes synthetic threads message by message through process_input with
+the fake backend and counts the agent calls and estimated prompt tokens each
+message needs, with the whole history sent, with quoted history stripped,
+and with stripping plus thread state (FLOWBIT_THREADING).
+
+Usage: python -m benchmarks.bench_threads --messages 20
+"""
+from benchmarks.synthetic import make_thread
+from chunking import estimate_tokens
+from llm_client import get_llm_client
+from fake_llm import FakeChatModel
+from memory import get_shared_memory
+from typing import Dict, List
+import asyncio
+import functools
+import os
+import random
+import tempfile
+import typer
+import main
+
+app = typer.Typer()
+
+MODES = {
+    "full_history": {"REDUCE_REPLIES": False, "THREADING": False},
+    "reduced": {"REDUCE_REPLIES": True, "THREADING": False},
+    "threaded": {"REDUCE_REPLIES": True, "THREADING": True},
+}
+
+async def measure(threads: List[List[str]]) -> List[List[Dict[str, int]]]:
+    """Agent calls and prompt tokens for each message of each thread, in order."""
+    report: List[List[Dict[str, int]]] = []
+    costs: List[Dict[str, int]] = []
+    invoke_chain = main.invoke_chain
+
+    @functools.wraps(invoke_chain)
+    async def counted(chain, payload):
+        cost = costs[-1]
+        cost["calls"] += 1
+        cost["tokens"] += sum(estimate_tokens(value) for value in payload.values() if isinstance(value, str))
+        cost["tokens"] += sum(estimate_tokens(str(message.content)) for message in payload.get("messages", []))
+        if main.CHAIN_NAMES.get(id(chain)) == "classifier":
+            cost["classifier_calls"] += 1
+        return await invoke_chain(chain, payload)
+
+    main.invoke_chain = counted
+    try:
+        for thread in threads:
+            costs = []
+            for message in thread:
+                costs.append({"calls": 0, "classifier_calls": 0, "tokens": 0})
+                await main.process_input(message, use_cache=False)
+            report.append(costs)
+    finally:
+        main.invoke_chain = invoke_chain
+    return report
+
+@app.command()
+def run(threads: int = typer.Option(3, help="Synthetic threads to process"),
+        messages: int = typer.Option(20, help="Messages per thread"),
+        seed: int = typer.Option(0)):
+    """Report prompt tokens for the first and last message of each thread, per mode."""
+    client = get_llm_client()
+    previous_backend = client._model or client.backend_name
+    client.set_backend(FakeChatModel())
+    rng = random.Random(seed)
+    sample = [make_thread(rng, messages) for _ in range(threads)]
+    cwd = os.getcwd()
+    defaults = {name: getattr(main, name) for name in MODES["threaded"]}
+    for mode, settings in MODES.items():
+        for name, value in settings.items():
+            setattr(main, name, value)
+        with tempfile.TemporaryDirectory() as directory:
+            # a fresh database per mode, so no thread state carries over
+            os.chdir(directory)
+            try:
+                costs = asyncio.run(measure(sample))
+            finally:
+                os.chdir(cwd)
+                get_shared_memory(os.path.join(directory, "flowbit.db")).close()
+                main.get_thread_store(os.path.join(directory, "flowbit.db")).close()
+        first = sum(thread[0]["tokens"] for thread in costs) / threads
+        last = sum(thread[-1]["tokens"] for thread in costs) / threads
+        total = sum(cost["tokens"] for thread in costs for cost in thread) / threads
+        classifier = sum(cost["classifier_calls"] for thread in costs for cost in thread) / threads
+        typer.echo(f"{mode:<14} first msg {first:>7.0f}  last msg {last:>7.0f}  per thread {total:>8.0f} tokens"
+                   f"  classifier calls {classifier:.1f}")
+    for name, value in defaults.items():
+        setattr(main, name, value)
+    client.set_backend(previous_backend)
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,70 @@
+"""
+Evaluate the rule-based pre-classifier on a labelled corpus.
+
+Reports the fraction of traffic it handles at the configured threshold,
+its accuracy against the labels on that traffic, and, with --with-llm,
+how often it agrees with the classifier agent on the same inputs.
+
+Usage: python -m benchmarks.eval_preclassifier [--corpus PATH] [--threshold 0.85] [--with-llm]
+"""
+from preclassifier import preclassify
+from typing import Dict, Any, List
+import asyncio
+import json
+import os
+import typer
+
+app = typer.Typer()
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "labelled_corpus.jsonl")
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def _llm_classifications(texts: List[str]) -> List[Dict[str, Any]]:
+    from main import invoke_chain
+    from chains import classifier_agent_chain, clean_json_response
+
+    async def classify(text: str) -> Dict[str, Any]:
+        response = await invoke_chain(classifier_agent_chain, {
+            "input_text": text,
+            "messages": [{"role": "user", "content": text}]
+        })
+        return clean_json_response(response.content)
+
+    return await asyncio.gather(*(classify(text) for text in texts))
+
+def evaluate(corpus: List[Dict[str, Any]], threshold: float, llm_results: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    handled = correct = agreed = compared = 0
+    for index, example in enumerate(corpus):
+        prediction = preclassify(example["text"], example.get("input_type"))
+        if prediction["confidence"] < threshold:
+            continue
+        handled += 1
+        if (prediction["classified_format"], prediction["classified_intent"]) == (example["format"], example["intent"]):
+            correct += 1
+        if llm_results is not None:
+            compared += 1
+            agreed += prediction["classified_intent"] == llm_results[index].get("classified_intent")
+    report = {
+        "examples": len(corpus),
+        "threshold": threshold,
+        "handled_fraction": round(handled / len(corpus), 3) if corpus else 0.0,
+        "accuracy_on_handled": round(correct / handled, 3) if handled else None,
+    }
+    if llm_results is not None:
+        report["llm_agreement_on_handled"] = round(agreed / compared, 3) if compared else None
+    return report
+
+@app.command()
+def main(corpus: str = typer.Option(DEFAULT_CORPUS, help="Labelled JSONL corpus (text, format, intent)"),
+         threshold: float = typer.Option(0.85, help="Confidence threshold"),
+         with_llm: bool = typer.Option(False, help="Also compare against the classifier agent")):
+    """Report pre-classifier coverage, accuracy and LLM agreement."""
+    examples = load_corpus(corpus)
+    llm_results = asyncio.run(_llm_classifications([e["text"] for e in examples])) if with_llm else None
+    typer.echo(json.dumps(evaluate(examples, threshold, llm_results), indent=2))
+
+if __name__ == "__main__":
+    app()
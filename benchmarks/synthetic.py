@@ -0,0 +1,204 @@
+"""
+Deterministic synthetic corpora for pipeline benchmarks.
+
+Generates plain-text emails, HTML emails, a JSON payload shaped for every
+schema in data/json_schema.json, and multi-page PDFs, all from a seed so
+runs are comparable.
+"""
+from schema_registry import get_schema_registry, INTENT_TO_SCHEMA
+from typing import Dict, Any, List
+from datetime import date, timedelta
+import fitz
+import json
+import os
+import random
+
+FIRST_NAMES = ["Sarah", "James", "Priya", "Chen", "Maria", "Tom", "Aisha", "Lukas"]
+LAST_NAMES = ["Mitchell", "Okafor", "Nakamura", "Rossi", "Schmidt", "Patel", "Garcia", "Novak"]
+COMPANIES = ["Acme Corp", "Globex Ltd", "Initech GmbH", "Umbrella Supplies", "Stark Logistics"]
+PRODUCTS = ["Widget A", "Gearbox B2", "Sensor Kit", "Steel Bracket", "Control Unit X"]
+
+EMAIL_TEMPLATES = {
+    "RFQ": ("Request for Quotation - {product}",
+            "I would like to request a quotation for {qty} units of {product}. Please include pricing and lead time.\n"
+            "Delivery needed by {deadline}."),
+    "Complaint": ("Complaint about order {ref}",
+                  "I am writing to complain about order {ref}. The {product} arrived damaged and this is unacceptable.\n"
+                  "We are very disappointed and would like a refund."),
+    "Invoice": ("Invoice {ref}",
+                "Please find attached invoice number {ref} for {qty} units of {product}.\n"
+                "The total amount due is ${amount} and the due date is {deadline}."),
+    "Support_Request": ("Support request: {product} not working",
+                        "Our {product} is not working since the last update and we are unable to log in to the console.\n"
+                        "The error code shown is E-{ref}. Please help us troubleshoot."),
+    "General_Inquiry": ("Inquiry about {product}",
+                        "I would like to know more about {product}. Could you tell me whether it ships to Europe?\n"
+                        "Any information about warranty terms is welcome."),
+}
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def _fields(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "product": rng.choice(PRODUCTS),
+        "qty": rng.randint(5, 500),
+        "ref": f"{rng.randint(1000, 9999)}-{rng.randint(10, 99)}",
+        "amount": f"{rng.randint(100, 50000):,}.{rng.randint(0, 99):02d}",
+        "deadline": (date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))).isoformat(),
+    }
+
+def make_email(rng: random.Random, paragraphs: int = 1) -> str:
+    """Plain-text email with headers, salutation and sign-off."""
+    intent = rng.choice(sorted(EMAIL_TEMPLATES))
+    subject, body = EMAIL_TEMPLATES[intent]
+    values = _fields(rng)
+    sender = _person(rng)
+    filler = "\n\n".join(
+        f"For reference, our previous order of {rng.randint(1, 50)} units of {rng.choice(PRODUCTS)} was handled by {_person(rng)}."
+        for _ in range(paragraphs - 1)
+    )
+    return (
+        f"Subject: {subject.format(**values)}\n"
+        f"From: {sender.lower().replace(' ', '.')}@{rng.choice(COMPANIES).split()[0].lower()}.com\n\n"
+        f"Dear Team,\n\n{body.format(**values)}\n\n{filler}\n\n"
+        f"Best regards,\n{sender}\n{rng.choice(COMPANIES)}\n+1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}"
+    )
+
+def make_html_email(rng: random.Random, paragraphs: int = 1) -> str:
+    """The same email shape rendered as an HTML body with inline styling."""
+    lines = make_email(rng, paragraphs).split("\n")
+    headers, body = lines[:2], lines[3:]
+    html = "".join(
+        f'<p style="font-family:Arial;margin:0 0 8px 0"><span>{line}</span></p>' if line else "<br>"
+        for line in body
+    )
+    return "\n".join(headers) + "\n\n" + f'<html><head><style>p{{color:#333}}</style></head><body><div class="email">{html}</div></body></html>'
+
+DISCLAIMER = ("CONFIDENTIALITY NOTICE: This e-mail and any attachments are confidential and intended solely for the "
+              "named addressee. If you have received this message in error, please notify the sender and delete it. "
+              "Any unauthorised use, disclosure or copying is prohibited.")
+REPLIES = [
+    "Thanks for the quick reply. Could you confirm the delivery date?",
+    "Confirmed, we can deliver by the date requested. I have attached the updated quote.",
+    "Please go ahead with the order. Our PO number follows separately.",
+    "Received, we will ship on Monday and send tracking details.",
+]
+
+def make_thread(rng: random.Random, messages: int = 4) -> List[str]:
+    """
+    One email thread as the text of each message in order.
+
+    Every reply quotes the whole history, alternating Gmail-style
+    ("On ... wrote:" and ">" prefixes) and Outlook-style (From/Sent header)
+    quoting, and carries a "-- " signature and a legal disclaimer.
+    """
+    first = make_email(rng)
+    subject = first.split("\n", 1)[0][len("Subject: "):]
+    people = [_person(rng), _person(rng)]
+    thread = [first]
+    for n in range(1, messages):
+        sender = people[n % 2]
+        address = f"{sender.lower().replace(' ', '.')}@{rng.choice(COMPANIES).split()[0].lower()}.com"
+        previous = thread[-1].split("\n\n", 1)[1]
+        sent = (date(2024, 1, 1) + timedelta(days=n)).isoformat()
+        if n % 2:
+            history = f"On {sent} at 09:{n:02d}, {people[(n + 1) % 2]} wrote:\n" + "\n".join(f"> {line}" for line in previous.split("\n"))
+        else:
+            history = (f"________________________________\nFrom: {people[(n + 1) % 2]}\nSent: {sent}\n"
+                       f"To: {sender}\nSubject: RE: {subject}\n\n{previous}")
+        thread.append(
+            f"Subject: RE: {subject}\nFrom: {address}\n\n"
+            f"Hi,\n\n{rng.choice(REPLIES)}\n\nRegards,\n{sender}\n-- \n{sender}\n{rng.choice(COMPANIES)}\n"
+            f"+1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}\n\n{DISCLAIMER}\n\n{history}"
+        )
+    return thread
+
+def _value_for(field, rng: random.Random) -> Any:
+    if field.type == "number":
+        return round(rng.uniform(10, 10000), 2)
+    if field.type == "date":
+        return (date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))).isoformat()
+    if field.type == "datetime":
+        return f"{(date(2024, 1, 1) + timedelta(days=rng.randint(0, 365))).isoformat()}T{rng.randint(0, 23):02d}:00:00"
+    if field.type == "boolean":
+        return rng.random() < 0.5
+    if field.type == "object":
+        return {"note": rng.choice(PRODUCTS), "value": rng.randint(1, 100)}
+    if field.type == "array":
+        if field.item_fields:
+            return [{f.paths[0][1][-1] if f.paths else f.name: _value_for(f, rng) for f in field.item_fields}
+                    for _ in range(rng.randint(1, 4))]
+        return [rng.choice(PRODUCTS) for _ in range(rng.randint(1, 4))]
+    lowered = field.name.lower()
+    if "email" in lowered or "contact" in lowered:
+        return f"{rng.choice(FIRST_NAMES).lower()}@example.com"
+    if "name" in lowered or "agent" in lowered:
+        return _person(rng)
+    if lowered.endswith("id"):
+        return f"{field.name[:3].upper()}-{rng.randint(10000, 99999)}"
+    if lowered == "currency":
+        return rng.choice(["USD", "EUR", "GBP"])
+    return f"{rng.choice(PRODUCTS)} {field.name} {rng.randint(1, 999)}"
+
+def _set_path(payload: Dict[str, Any], keys, value: Any) -> None:
+    for key in keys[:-1]:
+        payload = payload.setdefault(key, {})
+    payload[keys[-1]] = value
+
+def make_json_payload(rng: random.Random, schema) -> Dict[str, Any]:
+    """JSON payload for a compiled schema, using a random source path per field."""
+    payload: Dict[str, Any] = {}
+    for field in schema.fields:
+        paths = [keys for _, keys in field.paths if keys]
+        if not paths or (not field.required and rng.random() < 0.3):
+            continue
+        keys = rng.choice(paths)
+        try:
+            _set_path(payload, keys, _value_for(field, rng))
+        except (TypeError, AttributeError):
+            # Path collides with a scalar set by another field
+            continue
+    return payload
+
+def make_pdf(path: str, rng: random.Random, pages: int) -> None:
+    """Write a multi-page text PDF that reads like an invoice or regulation."""
+    doc = fitz.open()
+    kind = rng.choice(["invoice", "regulation"])
+    for number in range(pages):
+        page = doc.new_page()
+        if kind == "invoice":
+            lines = [f"INVOICE No. {rng.randint(1000, 9999)}  page {number + 1}/{pages}", f"Customer: {rng.choice(COMPANIES)}"]
+            lines += [f"{rng.randint(1, 99)} x {rng.choice(PRODUCTS)}  ${rng.randint(10, 999)}.00" for _ in range(30)]
+            lines.append(f"Total amount due: ${rng.randint(1000, 99999)}.00")
+        else:
+            lines = [f"Regulation (EU) 2024/{rng.randint(100, 999)}  page {number + 1}/{pages}"]
+            lines += [f"Article {rng.randint(1, 80)}: operators shall ensure compliance with {rng.choice(PRODUCTS)} requirements."
+                      for _ in range(30)]
+        page.insert_text((50, 60), "\n".join(lines), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+def build_corpus(workdir: str, per_kind: int = 10, seed: int = 0, pdf_pages: int = 8, email_paragraphs: int = 3) -> List[Dict[str, Any]]:
+    """
+    Build a mixed corpus; PDFs are written under workdir.
+
+    Returns:
+        Documents shaped like batch manifest entries: "id", "kind", "input_type"
+        and either "text" or "path"
+    """
+    rng = random.Random(seed)
+    registry = get_schema_registry()
+    documents: List[Dict[str, Any]] = []
+    for n in range(per_kind):
+        documents.append({"id": f"email-{n}", "kind": "email", "input_type": None,
+                          "text": make_email(rng, rng.randint(1, email_paragraphs))})
+        documents.append({"id": f"html-{n}", "kind": "html_email", "input_type": None,
+                          "text": make_html_email(rng, rng.randint(1, email_paragraphs))})
+        for schema_name in sorted(set(INTENT_TO_SCHEMA.values())):
+            documents.append({"id": f"json-{schema_name}-{n}", "kind": "json", "input_type": "json",
+                              "text": json.dumps(make_json_payload(rng, registry.get_by_name(schema_name)))})
+        pdf_path = os.path.join(workdir, f"doc-{n}.pdf")
+        make_pdf(pdf_path, rng, rng.randint(max(1, pdf_pages // 2), pdf_pages * 2))
+        documents.append({"id": f"pdf-{n}", "kind": "pdf", "input_type": "pdf", "path": pdf_path})
+    return documents
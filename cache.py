@@ -0,0 +1,126 @@
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize input text so trivially different copies share a cache key.
+
+    JSON payloads are re-serialized with sorted keys; everything else has its
+    line endings unified and runs of whitespace collapsed.
+    """
+    stripped = text.strip()
+    if stripped[:1] in ('{', '['):
+        try:
+            return json.dumps(json.loads(stripped), sort_keys=True, separators=(',', ':'))
+        except json.JSONDecodeError:
+            pass
+    lines = (re.sub(r'[ \t\f\v]+', ' ', line).strip() for line in stripped.replace('\r\n', '\n').split('\n'))
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines))
+
+def make_cache_key(text: str, prompt_version: str, schema_version: str) -> str:
+    """Content address for an input under a given prompt and schema version."""
+    digest = hashlib.sha256()
+    for part in (prompt_version, schema_version, normalize_text(text)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ResultCache:
+    """Persistent classification/extraction cache stored next to SharedMemory."""
+
+    def __init__(self, db_path: str = "flowbit.db", ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.create_tables()
+
+    def create_tables(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS result_cache (
+                cache_key TEXT PRIMARY KEY,
+                classification JSON,
+                result_data JSON,
+                created_at REAL,
+                last_accessed REAL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_result_cache_last_accessed ON result_cache (last_accessed)"
+        )
+        self.conn.commit()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached classification and result, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT classification, result_data, created_at FROM result_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if now - row[2] > self.ttl_seconds:
+                self.conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+                self.conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE result_cache SET last_accessed = ? WHERE cache_key = ?", (now, cache_key)
+            )
+            self.conn.commit()
+            self.hits += 1
+        return {"classification": json.loads(row[0]), "result": json.loads(row[1])}
+
+    def put(self, cache_key: str, classification: Dict[str, Any], result: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO result_cache (cache_key, classification, result_data, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, json.dumps(classification), json.dumps(result), now, now)
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones above max_entries."""
+        cursor = self.conn.execute("DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.expirations += cursor.rowcount
+        overflow = self.conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            cursor = self.conn.execute(
+                "DELETE FROM result_cache WHERE cache_key IN "
+                "(SELECT cache_key FROM result_cache ORDER BY last_accessed LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM result_cache")
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": entries,
+        }
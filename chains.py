@@ -1,9 +1,13 @@
 # imports
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import HumanMessagePromptTemplate, SystemMessagePromptTemplate, ChatPromptTemplate, MessagesPlaceholder
 from dotenv import load_dotenv
+from schema_registry import get_schema_registry, INTENT_TO_SCHEMA
+from llm_client import get_llm_client
+from utils.tracing import traced
 import re
 import json
+import hashlib
+import functools
 import logging
 import os
 
@@ -14,13 +18,12 @@ logger = logging.getLogger(__name__)
 # load environment variables
 load_dotenv()
 
-# llm initialization
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    convert_system_message_to_human=True  # Add this parameter
-)
+# shared LLM client; the backend model is created on first call
+llm = get_llm_client()
+
 
 # response processing
+@traced("json.clean")
 def clean_json_response(response_text):
     """Clean and parse JSON response from LLM."""
     # Remove ```json at the start and ``` at the end
@@ -65,29 +68,8 @@ def intent_type(response):
     
 # mapping suitable schema for the intent from json_schema.json file
 def get_schema_for_intent(intent_type):
-    """Get schema for given intent type with proper path handling."""
-    schema_path = os.path.join(os.path.dirname(__file__), "data", "json_schema.json")
-    
-    if not os.path.exists(schema_path):
-        
-        schema_path = os.path.join(os.path.dirname(__file__), "tests", "data", "json_schema.json")
-    
-    with open(schema_path, 'r') as f:
-        schemas = json.load(f)
-    
-    intent_to_schema = {
-        "Invoice": "FlowBitInvoiceV1",
-        "RFQ": "FlowBitRFQ_V1",
-        "Complaint": "FlowBitComplaint_V1", 
-        "Regulation": "FlowBitRegulation_V1",
-        "General_Inquiry": "FlowBitGeneralInquiry_V1",
-        "Order_Confirmation": "FlowBitOrderConfirmation_V1",
-        "Support_Request": "FlowBitSupportRequest_V1",
-        "Other": "FlowBitGenericData_V1"
-    }
-    
-    schema_name = intent_to_schema.get(intent_type, "FlowBitGenericData_V1")
-    return next((schema for schema in schemas if schema["schema_name"] == schema_name), schemas[-1])
+    """Get schema for given intent type from the preloaded schema registry."""
+    return get_schema_registry().get_for_intent(intent_type).schema
 
 # defining classifier agent
 classifier_agent_prompt = ChatPromptTemplate.from_messages([
@@ -190,3 +172,56 @@ Email_parser_agent_prompt = ChatPromptTemplate.from_messages([
 
 email_parser_agent_chain = Email_parser_agent_prompt | llm
 
+# defining fused classifier + extraction agent
+fused_agent_prompt = ChatPromptTemplate.from_messages([
+    HumanMessagePromptTemplate.from_template(
+        """You are an AI Document Processing Specialist. In a single pass, classify the input and extract its data.
+
+        **Input Data:** {input_text}
+
+        **Step 1 - Classification:**
+        * Format: one of `JSON`, `Email_Text`, `PDF_Content`, `Undetermined_Format`
+        * Intent: one of `Invoice`, `RFQ`, `Complaint`, `Regulation`, `General_Inquiry`, `Order_Confirmation`, `Support_Request`, `Other`
+
+        **Step 2 - Extraction:**
+        * If the format is `JSON`, map the input onto the schema for the chosen intent and return
+          {{"flowbit_formatted_data": {{...}}, "processing_report": {{"schema_used": "<schema_name>", "status": "success/error", "missing_required_fields": [], "type_mismatches": [], "unmapped_source_fields": []}}}}
+        * Otherwise return
+          {{"extracted_sender_name": "name", "primary_request_summary": "summary", "key_entities_mentioned": [], "urgency_level": "Low/Medium/High/Specific_Date_Requested", "urgency_reason_or_deadline": "reason", "sentiment": "Positive/Neutral/Negative", "action_items_implied": [], "contact_information_in_body": []}}
+
+        **Schemas by intent:**
+        {schema_catalog}
+
+        **Output Format:**
+        {{
+            "classified_format": "<format>",
+            "classified_intent": "<intent>",
+            "reasoning": "<explanation>",
+            "extraction": {{ ... }}
+        }}
+
+        Return only the JSON object shown above.
+        """
+    ),
+    MessagesPlaceholder(variable_name="messages"),
+])
+
+fused_agent_chain = fused_agent_prompt | llm
+
+def get_schema_catalog():
+    """Compact field list for every intent's schema, used by the fused prompt."""
+    registry = get_schema_registry()
+    return "\n".join(f"* `{intent}` -> {registry.get_for_intent(intent).summary_text}" for intent in INTENT_TO_SCHEMA)
+
+
+# versions used to key cached results
+@functools.lru_cache(maxsize=1)
+def get_prompt_version():
+    """Fingerprint of the agent prompt templates."""
+    prompts = [classifier_agent_prompt, JSON_agent_prompt, Email_parser_agent_prompt, fused_agent_prompt]
+    templates = "\0".join(prompt.messages[0].prompt.template for prompt in prompts)
+    return hashlib.sha256(templates.encode('utf-8')).hexdigest()[:16]
+
+def get_schema_version():
+    """Fingerprint of the JSON schema definitions file."""
+    return get_schema_registry().get_version()
@@ -0,0 +1,178 @@
+# imports
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+from collections import Counter
+import asyncio
+import json
+import re
+
+# Gemini averages roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# document-token budgets per chain, after the prompt template's own overhead
+CHAIN_TOKEN_BUDGETS = {
+    "classifier": 2000,
+    "json_agent": 12000,
+    "email_agent": 6000,
+}
+
+# upper bound on chunk calls in flight for a single document
+MAX_PARALLEL_CHUNKS = 4
+
+URGENCY_RANK = ["Low", "Medium", "High", "Specific_Date_Requested"]
+PLACEHOLDER_VALUES = {"", "name", "summary", "reason", "unknown", "n/a", None}
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def fits_budget(text: str, chain: str) -> bool:
+    return estimate_tokens(text) <= CHAIN_TOKEN_BUDGETS[chain]
+
+def representative_sample(text: str, budget_tokens: int) -> str:
+    """
+    Trim a document to a budget for classification.
+
+    Keeps the head, where subject lines and titles live, and a shorter tail,
+    where sign-offs and totals often sit.
+    """
+    max_chars = budget_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    marker = "\n[...]\n"
+    head_chars = int((max_chars - len(marker)) * 0.75)
+    tail_chars = max_chars - len(marker) - head_chars
+    return text[:head_chars] + marker + text[-tail_chars:]
+
+def _hard_split(text: str, max_chars: int) -> List[str]:
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+def split_text(text: str, budget_tokens: int) -> List[str]:
+    """Split text into chunks within budget, preferring paragraph then line boundaries."""
+    max_chars = budget_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces: List[str] = []
+    for paragraph in re.split(r'(\n\s*\n)', text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.splitlines(keepends=True):
+            pieces.extend([line] if len(line) <= max_chars else _hard_split(line, max_chars))
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+def split_json(payload: Any, budget_tokens: int) -> List[str]:
+    """Split a JSON object into sub-objects of whole top-level keys within budget."""
+    text = json.dumps(payload)
+    if not isinstance(payload, dict) or estimate_tokens(text) <= budget_tokens:
+        return [text]
+    max_chars = budget_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: Dict[str, Any] = {}
+    size = 2
+    for key, value in payload.items():
+        entry_size = len(json.dumps({key: value})) - 1
+        if current and size + entry_size > max_chars:
+            chunks.append(json.dumps(current))
+            current, size = {}, 2
+        current[key] = value
+        size += entry_size
+    if current:
+        chunks.append(json.dumps(current))
+    return chunks
+
+async def map_chunks(chunks: List[str], extract: Callable[[str], Awaitable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Run extract over every chunk with bounded parallelism, preserving order."""
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_CHUNKS)
+
+    async def run(chunk: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await extract(chunk)
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+# reducers
+def _first_value(values: List[Any]) -> Any:
+    for value in values:
+        if isinstance(value, str) and value.strip().lower() in PLACEHOLDER_VALUES:
+            continue
+        if value not in (None, "", [], {}):
+            return value
+    return values[0] if values else None
+
+def _ordered_union(lists: List[Any]) -> List[Any]:
+    seen = set()
+    merged = []
+    for items in lists:
+        for item in items or []:
+            key = json.dumps(item, sort_keys=True) if not isinstance(item, str) else item
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
+
+def merge_email_results(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reduce per-chunk email agent outputs into one result."""
+    valid = [p for p in partials if isinstance(p, dict) and "error" not in p]
+    if not valid:
+        return partials[0] if partials else {}
+    if len(valid) == 1:
+        return valid[0]
+
+    most_urgent = max(
+        valid,
+        key=lambda p: URGENCY_RANK.index(p.get("urgency_level")) if p.get("urgency_level") in URGENCY_RANK else -1
+    )
+    summaries = [p.get("primary_request_summary") for p in valid if p.get("primary_request_summary")]
+    sentiments = Counter(p.get("sentiment") for p in valid if p.get("sentiment"))
+    merged = {
+        "extracted_sender_name": _first_value([p.get("extracted_sender_name") for p in valid]),
+        "primary_request_summary": " ".join(dict.fromkeys(summaries)),
+        "key_entities_mentioned": _ordered_union([p.get("key_entities_mentioned") for p in valid]),
+        "urgency_level": most_urgent.get("urgency_level"),
+        "urgency_reason_or_deadline": most_urgent.get("urgency_reason_or_deadline"),
+        "sentiment": sentiments.most_common(1)[0][0] if sentiments else None,
+        "action_items_implied": _ordered_union([p.get("action_items_implied") for p in valid]),
+        "contact_information_in_body": _ordered_union([p.get("contact_information_in_body") for p in valid]),
+    }
+    # Keep any extra keys the agent returned
+    for partial in valid:
+        for key, value in partial.items():
+            merged.setdefault(key, value)
+    merged["chunks_merged"] = len(valid)
+    return merged
+
+def merge_json_results(partials: List[Dict[str, Any]], required_fields: List[str], schema_name: Optional[str] = None) -> Dict[str, Any]:
+    """Reduce per-chunk JSON agent outputs into one flowbit_formatted_data + processing_report."""
+    valid = [p for p in partials if isinstance(p, dict) and "flowbit_formatted_data" in p]
+    if not valid:
+        return partials[0] if partials else {}
+
+    formatted: Dict[str, Any] = {}
+    for partial in valid:
+        for key, value in (partial.get("flowbit_formatted_data") or {}).items():
+            if value not in (None, "", [], {}) and key not in formatted:
+                formatted[key] = value
+    reports = [p.get("processing_report") or {} for p in valid]
+    missing = [name for name in required_fields if name not in formatted]
+    return {
+        "flowbit_formatted_data": formatted,
+        "processing_report": {
+            "schema_used": schema_name or _first_value([r.get("schema_used") for r in reports]),
+            "status": "error" if missing else "success",
+            "missing_required_fields": missing,
+            "type_mismatches": _ordered_union([r.get("type_mismatches") for r in reports]),
+            "unmapped_source_fields": _ordered_union([r.get("unmapped_source_fields") for r in reports]),
+            "chunks_merged": len(valid)
+        }
+    }
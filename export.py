@@ -0,0 +1,204 @@
+"""
+Bulk export of stored records for analytics.
+
+Streams inputs joined with their classification and result out of
+flowbit.db in fixed-size chunks and writes each chunk as a part file:
+gzip-compressed JSONL, Parquet or Arrow IPC (the columnar formats need
+pyarrow). Chunks are serialized and compressed on a thread pool with a
+bounded number in flight, so memory stays flat however large the store is.
+
+Exports are incremental: the last exported (timestamp, input_id) is kept
+in export_state.json in the output directory, and the next run only
+exports newer rows.
+
+Usage:
+    python export.py out/ --format jsonl
+    python export.py out/ --format parquet --chunk-rows 20000 --workers 4
+"""
+from memory import register_blob_functions
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Tuple
+import gzip
+import json
+import os
+import sqlite3
+import time
+import typer
+
+app = typer.Typer()
+
+STATE_FILE = "export_state.json"
+FORMATS = ("jsonl", "parquet", "arrow")
+EXTENSIONS = {"jsonl": ".jsonl.gz", "parquet": ".parquet", "arrow": ".arrow"}
+
+COLUMNS = ["input_id", "timestamp", "input_type", "input_text", "metadata", "classified_format", "classified_intent",
+           "reasoning", "classified_at", "result", "result_summary", "result_at"]
+# stored as JSON text; embedded as-is in JSONL and kept as strings in columnar files
+JSON_COLUMNS = ("metadata", "result")
+
+# one short read transaction per chunk, so the writer is never held back by an export
+EXPORT_CHUNK_SQL = """
+    SELECT i.input_id, i.timestamp, i.input_type, COALESCE(i.input_text, flowbit_blob(bi.codec, bi.data)), i.metadata,
+           c.format, c.intent, c.reasoning, c.timestamp,
+           COALESCE(r.result_data, flowbit_blob(br.codec, br.data)), r.summary, r.timestamp
+    FROM inputs i
+    LEFT JOIN classifications c ON c.input_id = i.input_id
+    LEFT JOIN results r ON r.input_id = i.input_id
+    LEFT JOIN blobs bi ON bi.hash = i.input_hash
+    LEFT JOIN blobs br ON br.hash = r.result_hash
+    WHERE (i.timestamp, i.input_id) > (?, ?) AND i.timestamp < ?
+    ORDER BY i.timestamp, i.input_id
+    LIMIT ?
+"""
+
+# state
+def load_state(output_dir: str) -> Dict[str, Any]:
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(output_dir: str, state: Dict[str, Any]) -> None:
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+# reading
+def iter_chunks(conn: sqlite3.Connection, after: Tuple[str, str], before: str, chunk_rows: int) -> Iterator[List[tuple]]:
+    """Rows with after < (timestamp, input_id) and timestamp < before, in keyset-paged chunks."""
+    while True:
+        rows = conn.execute(EXPORT_CHUNK_SQL, (after[0], after[1], before, chunk_rows)).fetchall()
+        if not rows:
+            return
+        yield rows
+        after = (rows[-1][1], rows[-1][0])
+        if len(rows) < chunk_rows:
+            return
+
+# writing; runs on the worker threads
+_SCALAR_COLUMNS = [name for name in COLUMNS if name not in JSON_COLUMNS]
+_scalars = itemgetter(*(COLUMNS.index(name) for name in _SCALAR_COLUMNS))
+_METADATA, _RESULT = COLUMNS.index("metadata"), COLUMNS.index("result")
+_encode = json.JSONEncoder().encode
+
+def _jsonl_line(row: tuple) -> str:
+    # splice the stored JSON in rather than parsing and re-serializing it
+    return (f'{_encode(dict(zip(_SCALAR_COLUMNS, _scalars(row))))[:-1]}, '
+            f'"metadata": {row[_METADATA] or "null"}, "result": {row[_RESULT] or "null"}}}\n')
+
+def _write_jsonl(rows: List[tuple], path: str, compresslevel: int) -> int:
+    data = "".join(_jsonl_line(row) for row in rows).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=compresslevel))
+    return len(rows)
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ModuleNotFoundError:
+        raise RuntimeError("Columnar export needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+def _arrow_table(rows: List[tuple]):
+    pa = _pyarrow()
+    columns = list(zip(*rows))
+    return pa.table({name: pa.array(values, type=pa.string()) for name, values in zip(COLUMNS, columns)})
+
+def _write_parquet(rows: List[tuple], path: str, compression: str) -> int:
+    import pyarrow.parquet as pq
+    pq.write_table(_arrow_table(rows), path, compression=compression)
+    return len(rows)
+
+def _write_arrow(rows: List[tuple], path: str, compression: str) -> int:
+    import pyarrow.feather as feather
+    feather.write_feather(_arrow_table(rows), path, compression=compression)
+    return len(rows)
+
+def _write_part(format: str, rows: List[tuple], path: str, level: int, compression: str) -> int:
+    if format == "jsonl":
+        return _write_jsonl(rows, path, level)
+    if format == "parquet":
+        return _write_parquet(rows, path, compression)
+    return _write_arrow(rows, path, compression)
+
+def export(db_path: str, output_dir: str, format: str = "jsonl", chunk_rows: int = 10000, workers: int = 4,
+           incremental: bool = True, settle_seconds: float = 60, level: int = 6, compression: str = "zstd") -> Dict[str, Any]:
+    """
+    Export rows newer than the saved cursor; returns a summary of the run.
+
+    Rows stored within the last settle_seconds are left for the next run, so
+    documents still being processed are exported once they have a result.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if format != "jsonl":
+        _pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    state = load_state(output_dir)
+    previous = state.get(format, {}) if incremental else {}
+    after = tuple(previous.get("cursor", ("", "")))
+    before = (datetime.now() - timedelta(seconds=settle_seconds)).isoformat()
+    run = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    register_blob_functions(conn)
+    started = time.perf_counter()
+    files: List[str] = []
+    pending: List[Future] = []
+    rows_exported = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flowbit-export") as pool:
+            for part, rows in enumerate(iter_chunks(conn, after, before, chunk_rows)):
+                # at most `workers` chunks are held in memory at once
+                while len(pending) >= workers:
+                    rows_exported += pending.pop(0).result()
+                path = os.path.join(output_dir, f"flowbit-{run}-{part:05d}{EXTENSIONS[format]}")
+                files.append(path)
+                pending.append(pool.submit(_write_part, format, rows, path, level, compression))
+                after = (rows[-1][1], rows[-1][0])
+            for future in pending:
+                rows_exported += future.result()
+    except BaseException:
+        # leave no partial run behind; the cursor has not moved, so the next run redoes it
+        for path in files:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        conn.close()
+
+    if files:
+        state[format] = {"cursor": list(after), "last_run": run,
+                         "exported_rows": previous.get("exported_rows", 0) + rows_exported}
+        save_state(output_dir, state)
+    elapsed = time.perf_counter() - started
+    return {"format": format, "rows": rows_exported, "files": files, "cursor": list(after),
+            "bytes": sum(os.path.getsize(path) for path in files), "seconds": round(elapsed, 3)}
+
+@app.command()
+def run(output_dir: str,
+        db_path: str = typer.Option("flowbit.db", "--db", help="SQLite database to export"),
+        format: str = typer.Option("jsonl", "--format", help="jsonl (gzip), parquet or arrow"),
+        chunk_rows: int = typer.Option(10000, help="Rows per part file"),
+        workers: int = typer.Option(4, help="Parts serialized and compressed in parallel"),
+        full: bool = typer.Option(False, "--full", help="Export everything, ignoring the saved cursor"),
+        settle_seconds: float = typer.Option(60, help="Skip rows newer than this; they may still be processing"),
+        level: int = typer.Option(6, help="gzip level for jsonl"),
+        compression: str = typer.Option("zstd", help="Codec for parquet/arrow")):
+    """Export inputs with their classification and result to part files in OUTPUT_DIR"""
+    if format not in FORMATS:
+        raise typer.BadParameter(f"format must be one of {', '.join(FORMATS)}")
+    try:
+        summary = export(db_path, output_dir, format, chunk_rows, workers, not full, settle_seconds, level, compression)
+    except RuntimeError as e:
+        raise typer.BadParameter(str(e))
+    rate = summary["rows"] / summary["seconds"] if summary["seconds"] else 0
+    typer.echo(f"Exported {summary['rows']} rows to {len(summary['files'])} files "
+               f"({summary['bytes'] / 1e6:.1f} MB) in {summary['seconds']:.2f}s ({rate:.0f} rows/s)")
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,210 @@
+# imports
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from preclassifier import preclassify
+from schema_mapper import map_to_schema
+from schema_registry import get_schema_registry
+from utils.email_utils import extract_email_parts
+from typing import Dict, Any, List, Optional, Union
+import ast
+import asyncio
+import json
+import math
+import random
+import re
+import time
+
+# prompt sections, matched against the templates in chains.py
+CLASSIFIER_INPUT = re.compile(r'\*\*Input Data:\*\* (.*)\n\s*\*\*Instructions:\*\*', re.DOTALL)
+JSON_INPUT = re.compile(r'Input JSON: (.*)\n\s*Schema Definition: (.*)\n\s*Process the input using the schema', re.DOTALL)
+EMAIL_INPUT = re.compile(r'Email Text: (.*)\n\s*Intent Classification: (\S*)', re.DOTALL)
+FUSED_INPUT = re.compile(r'\*\*Input Data:\*\* (.*)\n\s*\*\*Step 1 - Classification:\*\*', re.DOTALL)
+
+# extraction heuristics
+HIGH_URGENCY = re.compile(r'\b(?:urgent(?:ly)?|asap|as soon as possible|immediately|critical)\b', re.IGNORECASE)
+MEDIUM_URGENCY = re.compile(r'\b(?:soon|at your earliest|this week|prompt(?:ly)?)\b', re.IGNORECASE)
+DEADLINE = re.compile(r'\b(?:by|before|no later than|due)\s+(?:the\s+)?(?:end of \w+ \w+|\d{4}-\d{2}-\d{2}|\w+ \d{1,2}(?:st|nd|rd|th)?(?:,? \d{4})?|\d{1,2}[/.]\d{1,2}[/.]\d{2,4}|(?:mon|tues|wednes|thurs|fri|satur|sun)day)', re.IGNORECASE)
+NEGATIVE = re.compile(r'\b(?:complain\w*|dissatisfied|unacceptable|disappointed|frustrat\w+|damaged|defective|broken|poor|angry|not working)\b', re.IGNORECASE)
+POSITIVE = re.compile(r'\b(?:thank(?:s| you)|appreciate\w*|pleased|great|happy|delighted)\b', re.IGNORECASE)
+ACTION = re.compile(r'\b(?:please|kindly|could you|can you|would you|we need|i need|request(?:ing)?)\b', re.IGNORECASE)
+EMAIL_ADDRESS = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+PHONE = re.compile(r'\+?\d[\d\s().-]{7,}\d')
+ENTITY = re.compile(r'\b\d[\d,]*\s+(?:units?|pcs|pieces|boxes|licenses?)\s+of\s+[A-Z][\w-]*(?:\s+[A-Z0-9][\w-]*)?'
+                    r'|[$€£]\s?\d[\d,]*(?:\.\d+)?'
+                    r'|\b(?:[A-Z]{2,}-)?\d{3,}(?:-\d+)+\b')
+SIGN_OFF = re.compile(r'^(?:best|kind|warm)?\s*(?:regards|sincerely|thanks|thank you|cheers),?$', re.IGNORECASE)
+
+def _sentences(text: str) -> List[str]:
+    return [s.strip() for s in re.split(r'(?<=[.!?])\s+|\n+', text) if s.strip()]
+
+def _parse_payload(text: str) -> Any:
+    """Parse JSON, or a Python literal dict/list as a model would read it."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    if text.lstrip()[:1] in ('{', '['):
+        try:
+            return ast.literal_eval(text.strip())
+        except (ValueError, SyntaxError):
+            pass
+    return None
+
+def classify(text: str) -> Dict[str, Any]:
+    """Classifier agent output for text."""
+    payload = _parse_payload(text)
+    classification = preclassify(json.dumps(payload) if isinstance(payload, (dict, list)) else text)
+    classification.pop("confidence")
+    if classification["classified_format"] == "Undetermined_Format":
+        classification["classified_format"] = "PDF_Content"
+    classification["reasoning"] = classification["reasoning"].replace("Rule-based pre-classifier", "Fake LLM")
+    return classification
+
+def _sender_name(parts: Dict[str, str], lines: List[str]) -> str:
+    sender = parts["from"]
+    if sender:
+        name = re.sub(r'\s*<[^>]*>', '', sender).strip().strip('"')
+        if '@' in name:
+            name = name.split('@')[0].replace('.', ' ').replace('_', ' ').title()
+        return name
+    for i, line in enumerate(lines[:-1]):
+        if SIGN_OFF.match(line):
+            return lines[i + 1]
+    return "Unknown"
+
+def extract_email(text: str) -> Dict[str, Any]:
+    """Email agent output for text."""
+    parts = extract_email_parts(text)
+    body = parts["body"] or text
+    lines = [line.strip() for line in body.splitlines() if line.strip()]
+    sentences = _sentences(body)
+    request_sentences = [s for s in sentences if ACTION.search(s)]
+
+    deadline = DEADLINE.search(body)
+    if deadline:
+        urgency, reason = "Specific_Date_Requested", deadline.group(0)
+    elif HIGH_URGENCY.search(body):
+        urgency, reason = "High", HIGH_URGENCY.search(body).group(0)
+    elif MEDIUM_URGENCY.search(body):
+        urgency, reason = "Medium", MEDIUM_URGENCY.search(body).group(0)
+    else:
+        urgency, reason = "Low", "No deadline mentioned"
+
+    negative, positive = len(NEGATIVE.findall(body)), len(POSITIVE.findall(body))
+    sentiment = "Negative" if negative > positive else "Positive" if positive > negative + 1 else "Neutral"
+
+    summary = parts["subject"] or (request_sentences or sentences or [""])[0]
+    return {
+        "extracted_sender_name": _sender_name(parts, lines),
+        "primary_request_summary": summary[:200],
+        "key_entities_mentioned": list(dict.fromkeys(m.strip() for m in ENTITY.findall(body))),
+        "urgency_level": urgency,
+        "urgency_reason_or_deadline": reason,
+        "sentiment": sentiment,
+        "action_items_implied": request_sentences[:3],
+        "contact_information_in_body": list(dict.fromkeys(EMAIL_ADDRESS.findall(body) + [p.strip() for p in PHONE.findall(body)]))
+    }
+
+def map_json(input_json: str, schema: Any) -> Dict[str, Any]:
+    """JSON agent output for a payload and schema definition."""
+    payload = _parse_payload(input_json)
+    if payload is None:
+        return {"flowbit_formatted_data": {}, "processing_report": {
+            "schema_used": schema.get("schema_name") if isinstance(schema, dict) else None,
+            "status": "error", "missing_required_fields": [], "type_mismatches": [],
+            "unmapped_source_fields": [], "error": "Input is not valid JSON"
+        }}
+    return map_to_schema(payload, schema, raw_text=input_json)
+
+def respond(prompt: str) -> Dict[str, Any]:
+    """Answer one of the agent prompts from chains.py."""
+    match = FUSED_INPUT.search(prompt)
+    if match:
+        text = match.group(1)
+        classification = classify(text)
+        if classification["classified_format"] == "JSON":
+            schema = get_schema_registry().get_for_intent(classification["classified_intent"])
+            classification["extraction"] = map_json(text, schema)
+        else:
+            classification["extraction"] = extract_email(text)
+        return classification
+    match = CLASSIFIER_INPUT.search(prompt)
+    if match:
+        return classify(match.group(1))
+    match = JSON_INPUT.search(prompt)
+    if match:
+        return map_json(match.group(1), json.loads(match.group(2)))
+    match = EMAIL_INPUT.search(prompt)
+    if match:
+        return extract_email(match.group(1))
+    return {"error": "Unrecognised prompt"}
+
+class LatencyDistribution:
+    """
+    Simulated LLM latency parsed from a spec string.
+
+    Specs: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,SD" and
+    "lognormal:MEDIAN,SIGMA", all in seconds. Samples are seeded and
+    never negative.
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec: str, seed: int = 0):
+        kind, _, args = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}', expected one of {', '.join(self.KINDS)}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(arg) for arg in args.split(",") if arg.strip()]
+        self.rng = random.Random(seed)
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = self.rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = self.rng.gauss(p[0], p[1])
+        else:
+            value = self.rng.lognormvariate(math.log(p[0]), p[1])
+        return max(0.0, value)
+
+class FakeChatModel(SimpleChatModel):
+    """
+    Deterministic offline stand-in for the Gemini chat model.
+
+    Recognises the agent prompts in chains.py and answers them with local
+    rules (preclassifier, schema_mapper and regex extraction), after an
+    optional simulated latency: fixed seconds or a LatencyDistribution.
+    """
+
+    latency: Union[float, LatencyDistribution] = 0.0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _delay(self) -> float:
+        return self.latency.sample() if isinstance(self.latency, LatencyDistribution) else self.latency
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(messages)))])
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        return json.dumps(respond(prompt))
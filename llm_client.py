@@ -0,0 +1,187 @@
+# imports
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.language_models.chat_models import BaseChatModel
+from typing import Dict, Any, Callable, Optional, Tuple, Union
+from utils.rate_limit import RateLimiter, AIMDController, is_overload_error
+from utils.retry import get_retry_after
+from utils.tracing import span
+from utils.metrics import REGISTRY
+from chunking import estimate_tokens
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# backend factories, keyed by name
+def _gemini_backend() -> BaseChatModel:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=os.getenv("MODEL_NAME", "gemini-2.0-flash"),
+        convert_system_message_to_human=True
+    )
+
+def _fake_backend() -> BaseChatModel:
+    from fake_llm import FakeChatModel
+    return FakeChatModel()
+
+BACKENDS: Dict[str, Callable[[], BaseChatModel]] = {
+    "gemini": _gemini_backend,
+    "fake": _fake_backend,
+}
+
+# default (requests, tokens) per minute; Gemini 2.0 Flash tier 1 quotas, none for local backends
+BACKEND_RATE_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gemini": (2000, 4000000),
+}
+# tokens reserved for the response when charging the tokens-per-minute bucket
+EXPECTED_OUTPUT_TOKENS = 512
+
+def register_backend(name: str, factory: Callable[[], BaseChatModel], rate_limits: Optional[Tuple[int, int]] = None) -> None:
+    """Make a chat model factory available as FLOWBIT_LLM_BACKEND=<name>."""
+    BACKENDS[name] = factory
+    if rate_limits is not None:
+        BACKEND_RATE_LIMITS[name] = rate_limits
+
+def _make_rate_limiter(backend: str) -> RateLimiter:
+    rpm, tpm = BACKEND_RATE_LIMITS.get(backend, (0, 0))
+    return RateLimiter(
+        requests_per_minute=float(os.getenv("FLOWBIT_LLM_RPM", rpm)),
+        tokens_per_minute=float(os.getenv("FLOWBIT_LLM_TPM", tpm))
+    )
+
+def _make_concurrency_controller() -> AIMDController:
+    return AIMDController(
+        initial_limit=int(os.getenv("FLOWBIT_LLM_INITIAL_CONCURRENCY", 4)),
+        max_limit=int(os.getenv("FLOWBIT_LLM_MAX_CONCURRENCY", 64))
+    )
+
+class LLMClient(Runnable):
+    """
+    Single entry point for every chain's model calls.
+
+    The backend chat model is created on first use, so importing the chains
+    needs no API key. Identical prompts that are in flight at the same time
+    share one backend call. Async calls pass through the backend's rate
+    limiter and an adaptive concurrency limit.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend_name = backend or os.getenv("FLOWBIT_LLM_BACKEND", "gemini")
+        self._model: Optional[BaseChatModel] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.rate_limiter = _make_rate_limiter(self.backend_name)
+        self.concurrency = _make_concurrency_controller()
+        self.calls = 0
+        self.coalesced = 0
+
+    # backend management
+    @property
+    def model(self) -> BaseChatModel:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    if self.backend_name not in BACKENDS:
+                        raise ValueError(f"Unknown LLM backend: {self.backend_name}")
+                    self._model = BACKENDS[self.backend_name]()
+                    logger.info(f"Initialized LLM backend '{self.backend_name}'")
+        return self._model
+
+    def set_backend(self, backend: Union[str, BaseChatModel]) -> None:
+        """Switch to a named backend or to a ready-made chat model instance."""
+        with self._lock:
+            if isinstance(backend, str):
+                self.backend_name = backend
+                self._model = None
+            else:
+                self.backend_name = getattr(backend, "_llm_type", type(backend).__name__)
+                self._model = backend
+            self._inflight = {}
+            self.rate_limiter = _make_rate_limiter(self.backend_name)
+            self.concurrency = _make_concurrency_controller()
+
+    # Runnable interface
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        self.calls += 1
+        return self.model.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        key = self._prompt_key(input, kwargs)
+        pending = self._inflight.get(key)
+        if pending is not None and not pending.done():
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.calls += 1
+        future = asyncio.ensure_future(self._limited_ainvoke(input, config, **kwargs))
+        self._inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _limited_ainvoke(self, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        text = input.to_string() if hasattr(input, "to_string") else str(input)
+        input_tokens = estimate_tokens(text)
+        with span("llm.rate_limit_wait"):
+            await self.rate_limiter.acquire(input_tokens + EXPECTED_OUTPUT_TOKENS)
+        try:
+            with span("llm.slot_wait"):
+                started = await self.concurrency.acquire()
+            with span("llm.call", backend=self.backend_name, input_tokens=input_tokens) as call_span:
+                try:
+                    response = await self.model.ainvoke(input, config, **kwargs)
+                except BaseException as e:
+                    self.concurrency.release(started, e)
+                    raise
+                self.concurrency.release(started)
+                call_span.set(output_tokens=estimate_tokens(str(response.content)), **_usage(response))
+                return response
+        except Exception as e:
+            if is_overload_error(e):
+                retry_after = get_retry_after(e)
+                if retry_after:
+                    self.rate_limiter.pause(retry_after)
+            raise
+
+    def _prompt_key(self, input: Any, kwargs: Dict[str, Any]) -> str:
+        text = input.to_string() if hasattr(input, "to_string") else str(input)
+        digest = hashlib.sha256(f"{self.backend_name}\0{text}\0{sorted(kwargs.items())}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend_name,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "rate_limiter": self.rate_limiter.stats(),
+            "concurrency": self.concurrency.stats()
+        }
+
+def _usage(response: Any) -> Dict[str, Any]:
+    """Provider-reported token counts, when the backend returns them."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return {f"reported_{key}": value for key, value in usage.items() if isinstance(value, int)}
+
+_client: Optional[LLMClient] = None
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client shared by all chains."""
+    global _client
+    if _client is None:
+        _client = LLMClient()
+    return _client
+
+def _llm_samples():
+    if _client is None:
+        return []
+    concurrency = _client.concurrency.stats()
+    return [({"kind": "in_flight"}, concurrency["in_flight"]), ({"kind": "limit"}, concurrency["limit"])]
+
+REGISTRY.register_callback("flowbit_llm_concurrency", "LLM calls in flight and the adaptive concurrency limit", ("kind",), _llm_samples)
+REGISTRY.register_callback("flowbit_llm_coalesced_total", "LLM calls served by an identical in-flight request", (),
+                           lambda: [({}, _client.coalesced)] if _client is not None else [], type="counter")
@@ -1,28 +1,95 @@
 # imports
-from chains import classifier_agent_chain, JSON_agent_chain, email_parser_agent_chain, clean_json_response, decide_next_agent, intent_type, get_schema_for_intent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_client import get_llm_client
+from chains import classifier_agent_chain, JSON_agent_chain, email_parser_agent_chain, fused_agent_chain, clean_json_response, decide_next_agent, intent_type, get_schema_for_intent, get_schema_catalog, get_prompt_version, get_schema_version
 from utils.retry import retry_with_exponential_backoff, RetryError
+from utils.tracing import span, start_trace, current_span
+from utils.metrics import REGISTRY, start_metrics_server_from_env
+from retention import start_retention_from_env
 from langchain_core.exceptions import OutputParserException
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
 from utils.email_utils import strip_html, extract_email_parts
+from utils.mime_utils import Attachment, is_mime_message, parse_mime
+from utils.reply_utils import reduce_reply_chain
+from utils.pdf_utils import open_pdf, extract_pdf_text_async
 from dotenv import load_dotenv
 import json
 import logging
-from typing import Dict, Any
-import fitz 
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
+import time
 import uuid
-from memory import SharedMemory
+from memory import SharedMemory, get_shared_memory
+from cache import ResultCache, make_cache_key
+from threads import ThreadStore, ThreadContext, message_headers
+from langchain_core.messages import HumanMessage
+from schema_mapper import map_to_schema
+from schema_registry import get_schema_registry, INTENT_TO_SCHEMA
+from preclassifier import try_preclassify, preclassify, detect_format
+from chunking import CHAIN_TOKEN_BUDGETS, fits_budget, representative_sample, split_text, split_json, map_chunks, merge_email_results, merge_json_results
 from datetime import datetime
 import os 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# llm initialization
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    convert_system_message_to_human=True  # Add this parameter
-)
+
+# result cache settings
+CACHE_TTL_SECONDS = float(os.getenv("FLOWBIT_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.getenv("FLOWBIT_CACHE_MAX_ENTRIES", 10000))
+_result_cache = None
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache, creating it on first use."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+    return _result_cache
+
+# email threads, stored per database path like SharedMemory
+THREADING = os.getenv("FLOWBIT_THREADING", "1").lower() not in ("0", "false", "no")
+_thread_stores: Dict[str, ThreadStore] = {}
+
+def get_thread_store(db_path: str = "flowbit.db") -> ThreadStore:
+    """Return the process-wide ThreadStore for db_path, creating it on first use."""
+    key = os.path.abspath(db_path)
+    if key not in _thread_stores:
+        _thread_stores[key] = ThreadStore(db_path)
+    return _thread_stores[key]
+
+# confidence above which the rule-based pre-classifier skips the classifier LLM call
+PRECLASSIFY_THRESHOLD = float(os.getenv("FLOWBIT_PRECLASSIFY_THRESHOLD", 0.85))
+
+# "two_stage" (classifier then extraction agent) or "fused" (one combined call)
+PIPELINE_MODE = os.getenv("FLOWBIT_PIPELINE_MODE", "two_stage")
+VALID_FORMATS = ("JSON", "Email_Text", "PDF_Content", "Undetermined_Format")
+EMAIL_RESULT_KEYS = ("primary_request_summary", "urgency_level", "sentiment")
+# strip quoted history, signatures and disclaimers from emails before prompting
+REDUCE_REPLIES = os.getenv("FLOWBIT_REDUCE_REPLIES", "1").lower() not in ("0", "false", "no")
+
+# operational metrics, scraped from the endpoint started by FLOWBIT_METRICS_PORT
+DOCUMENTS = REGISTRY.counter("flowbit_documents_total", "Documents processed", ("format", "intent", "status"))
+DOCUMENT_SECONDS = REGISTRY.histogram("flowbit_document_seconds", "End-to-end processing time per document", ("status",))
+LLM_SECONDS = REGISTRY.histogram("flowbit_llm_request_seconds", "Agent chain call latency, per attempt", ("chain",))
+LLM_ERRORS = REGISTRY.counter("flowbit_llm_errors_total", "Failed agent chain calls, per attempt", ("chain", "error"))
+THREAD_MESSAGES = REGISTRY.counter("flowbit_thread_messages_total", "Emails matched to threads",
+                                   ("outcome",))
+CHAIN_NAMES = {
+    id(classifier_agent_chain): "classifier",
+    id(JSON_agent_chain): "json_agent",
+    id(email_parser_agent_chain): "email_agent",
+    id(fused_agent_chain): "fused",
+}
+
+def _cache_samples():
+    # Only report once the cache exists; scraping must not open its database
+    if _result_cache is None:
+        return []
+    stats = _result_cache.stats()
+    return [({"kind": key}, stats[key]) for key in ("hits", "misses", "evictions", "expirations")]
+
+REGISTRY.register_callback("flowbit_cache_events_total", "Result cache lookups and removals", ("kind",), _cache_samples, type="counter")
+REGISTRY.register_callback("flowbit_cache_hit_ratio", "Result cache hits / lookups", (),
+                           lambda: [({}, _result_cache.stats()["hit_rate"])] if _result_cache is not None else [])
 
 # Custom error for processing failures
 class ProcessingError(Exception):
@@ -32,15 +99,33 @@ class ProcessingError(Exception):
         super().__init__(self.message)
 
 
+# agent calls with non-blocking retry and jittered backoff
 @retry_with_exponential_backoff(
     max_retries=3,
-    exceptions=(OutputParserException, ConnectionError, ValueError)
+    exceptions=(OutputParserException, ConnectionError, ValueError, ResourceExhausted, ServiceUnavailable),
+    max_total_time=60
 )
+async def invoke_chain(chain, payload: Dict[str, Any]) -> Any:
+    """Invoke an agent chain asynchronously, retrying transient failures."""
+    name = CHAIN_NAMES.get(id(chain), "other")
+    current_span().set(chain=name)
+    started = time.perf_counter()
+    try:
+        return await chain.ainvoke(payload)
+    except Exception as e:
+        LLM_ERRORS.inc(chain=name, error=type(e).__name__)
+        raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - started, chain=name)
 
 # pdf validation
+async def is_pdf(file_path: str) -> bool:
+    """Check if the path names a PDF file."""
+    return file_path.lower().endswith('.pdf')
+
 async def is_valid_pdf(pdf_path: str) -> bool:
     try:
-        doc = fitz.open(pdf_path)
+        doc = await asyncio.to_thread(open_pdf, pdf_path)
         doc.close()
         return True
     except Exception:
@@ -49,24 +134,21 @@ async def is_valid_pdf(pdf_path: str) -> bool:
 # text extraction from pdfs, json and txt files
 async def is_file_input(file_path: str) -> bool:
     """Check if the input is a file path."""
-    return any(file_path.lower().endswith(ext) for ext in ['.pdf', '.json', '.txt'])
+    return any(file_path.lower().endswith(ext) for ext in ['.pdf', '.json', '.txt', '.eml'])
 
 async def read_file_content(file_path: str) -> str:
     """Read content from different file types."""
+    with span("read_file", path=os.path.basename(file_path)):
+        return await _read_file_content(file_path)
+
+async def _read_file_content(file_path: str) -> str:
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        # Handle PDF files
-        if file_path.lower().endswith('.pdf'):
-            if not await is_valid_pdf(file_path):
-                raise ValueError("Invalid PDF file")
-            doc = fitz.open(file_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-            return text
+        # Handle PDF files (validated and decoded off the event loop, opened once)
+        if await is_pdf(file_path):
+            return await extract_pdf_text_async(file_path)
             
         # Handle JSON files
         elif file_path.lower().endswith('.json'):
@@ -78,6 +160,11 @@ async def read_file_content(file_path: str) -> str:
             with open(file_path, 'r', encoding='utf-8') as f:
                 return f.read()
                 
+        # Handle raw RFC 5322 messages; 8-bit bytes survive until the MIME parser decodes them
+        elif file_path.lower().endswith('.eml'):
+            with open(file_path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+                return f.read()
+                
         else:
             raise ValueError(f"Unsupported file type: {file_path}")
             
@@ -91,15 +178,7 @@ async def extract_text_from_pdf(pdf_path: str) -> str:
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
-        if not is_valid_pdf(pdf_path):
-            raise ValueError("Invalid PDF file")
-            
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text
+        return await extract_pdf_text_async(pdf_path)
         
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {str(e)}")
@@ -109,7 +188,7 @@ async def extract_text_from_pdf(pdf_path: str) -> str:
 async def get_user_input() -> str:
     """Get multi-line input from user or read from file."""
     print("Enter your text (end with ':q' on a new line or Ctrl+Z+Enter):")
-    print("Or enter a file path (.pdf, .json, or .txt)")
+    print("Or enter a file path (.pdf, .json, .txt or .eml)")
     lines = []
     
     try:
@@ -126,18 +205,23 @@ async def get_user_input() -> str:
     return '\n'.join(lines)
 
 # using classifier agent on the user input
-async def classify_input(input_data: str) -> Dict[str, Any]:
+async def classify_input(input_data: str, input_type: str = None) -> Dict[str, Any]:
     """Classify input using the classifier agent with retry logic."""
     if not input_data:
         raise ValueError("Empty input data")
+    
+    # Obvious inputs are classified locally; only ambiguous ones reach the LLM
+    with span("preclassify") as preclassify_span:
+        classification = try_preclassify(input_data, input_type, PRECLASSIFY_THRESHOLD)
+        preclassify_span.set(handled=classification is not None)
+    if classification is not None:
+        return classification
         
     try:
-        response = classifier_agent_chain.invoke({
-            "input_text": input_data,
-            "messages": [{
-                "role": "user",
-                "content": input_data
-            }]
+        # Classify from a representative sample; the document is sent once, not twice
+        response = await invoke_chain(classifier_agent_chain, {
+            "input_text": representative_sample(input_data, CHAIN_TOKEN_BUDGETS["classifier"]),
+            "messages": []
         })
         
         if not hasattr(response, 'content'):
@@ -155,73 +239,316 @@ async def classify_input(input_data: str) -> Dict[str, Any]:
 # initializing json agent
 async def process_json_input(input_data: str, intent: str) -> Dict[str, Any]:
     """Process input using JSON agent with schema."""
-    schema = get_schema_for_intent(intent)
-    response = JSON_agent_chain.invoke({
-        "input_json": input_data, 
-        "schema": json.dumps(schema, indent=2),
-        "messages": [{
-            "role": "user",
-            "content": input_data
-        }]
-    })
-    return clean_json_response(response.content)
+    schema = get_schema_registry().get_for_intent(intent)
+    
+    # Deterministic fast path: only fall back to the LLM when required fields are missing
+    try:
+        payload = json.loads(input_data)
+    except json.JSONDecodeError:
+        payload = None
+    if isinstance(payload, dict):
+        with span("json.local_map", schema=schema.name):
+            mapped = map_to_schema(payload, schema, raw_text=input_data)
+        if not mapped["processing_report"]["missing_required_fields"]:
+            return mapped
+        logger.info(f"Local mapping missing {mapped['processing_report']['missing_required_fields']}, using JSON agent")
+    
+    async def extract(chunk: str) -> Dict[str, Any]:
+        response = await invoke_chain(JSON_agent_chain, {
+            "input_json": chunk,
+            "schema": schema.prompt_text,
+            "messages": []
+        })
+        return clean_json_response(response.content)
+    
+    # Oversized payloads are split by top-level keys and mapped in parallel
+    budget = CHAIN_TOKEN_BUDGETS["json_agent"]
+    chunks = split_json(payload, budget) if isinstance(payload, dict) else split_text(input_data, budget)
+    current_span().set(chunks=len(chunks))
+    if len(chunks) == 1:
+        return await extract(input_data)
+    partials = await map_chunks(chunks, extract)
+    return merge_json_results(partials, schema.required_fields, schema.name)
 
 # initializing email agent
-async def process_email_input(input_data: str, intent: str) -> Dict[str, Any]:
-    """Process input using email parser agent."""
+async def process_email_input(input_data: str, intent: str, thread_context: str = None) -> Dict[str, Any]:
+    """Process input using email parser agent; thread_context summarizes earlier messages in the thread."""
     if not input_data.strip():
         raise ValueError("Empty email content")
 
     # Clean HTML and extract parts
-    cleaned_content = strip_html(input_data)
-    email_parts = extract_email_parts(cleaned_content)
+    with span("strip_html", input_chars=len(input_data)):
+        cleaned_content = strip_html(input_data)
+    with span("email.parts"):
+        email_parts = extract_email_parts(cleaned_content)
     
-    response = email_parser_agent_chain.invoke({
-        "email_text": cleaned_content,
-        "email_parts": email_parts,
-        "intent": intent,
-        "messages": [{
-            "role": "user",
-            "content": cleaned_content
-        }]
-    })
-    return clean_json_response(response.content)
+    async def extract(chunk: str) -> Dict[str, Any]:
+        response = await invoke_chain(email_parser_agent_chain, {
+            "email_text": chunk,
+            "email_parts": email_parts,
+            "intent": intent,
+            "messages": [HumanMessage(content=thread_context)] if thread_context else []
+        })
+        return clean_json_response(response.content)
+    
+    # Long documents are extracted chunk by chunk in parallel and merged
+    chunks = split_text(cleaned_content, CHAIN_TOKEN_BUDGETS["email_agent"])
+    current_span().set(chunks=len(chunks))
+    if len(chunks) == 1:
+        return await extract(cleaned_content)
+    partials = await map_chunks(chunks, extract)
+    return merge_email_results(partials)
+
+# fused single-call classification + extraction
+def validate_fused_response(response: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Check a fused agent response locally.
+
+    Returns:
+        (classification, result) if the response is usable, otherwise None
+    """
+    if "error" in response:
+        return None
+    classification = {
+        "classified_format": response.get("classified_format"),
+        "classified_intent": response.get("classified_intent"),
+        "reasoning": response.get("reasoning", "")
+    }
+    extraction = response.get("extraction")
+    if classification["classified_format"] not in VALID_FORMATS or classification["classified_intent"] not in INTENT_TO_SCHEMA:
+        return None
+    if not isinstance(extraction, dict):
+        return None
+    
+    if decide_next_agent(classification) == "JSON_agent":
+        formatted = extraction.get("flowbit_formatted_data")
+        if not isinstance(formatted, dict):
+            return None
+        # Recompute the report from the schema rather than trusting the model's
+        schema = get_schema_registry().get_for_intent(classification["classified_intent"])
+        missing = [name for name in schema.required_fields if formatted.get(name) in (None, "")]
+        report = extraction.get("processing_report") if isinstance(extraction.get("processing_report"), dict) else {}
+        report.update({
+            "schema_used": schema.name,
+            "status": "error" if missing else "success",
+            "missing_required_fields": missing
+        })
+        report.setdefault("type_mismatches", [])
+        report.setdefault("unmapped_source_fields", [])
+        return classification, {"flowbit_formatted_data": formatted, "processing_report": report}
+    
+    if not all(key in extraction for key in EMAIL_RESULT_KEYS):
+        return None
+    return classification, extraction
+
+async def process_fused_input(input_data: str, input_type: str = None) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Classify and extract with one LLM call; None means use the two-stage path."""
+    input_format, _, _ = detect_format(input_data, input_type)
+    catalog = get_schema_catalog() if input_format == "JSON" else "Not needed: the input is not JSON."
+    try:
+        response = await invoke_chain(fused_agent_chain, {
+            "input_text": input_data,
+            "schema_catalog": catalog,
+            "messages": []
+        })
+        return validate_fused_response(clean_json_response(response.content))
+    except (RetryError, ProcessingError) as e:
+        logger.warning(f"Fused agent failed, falling back to two-stage processing: {str(e)}")
+        return None
+
+def _reduce_email(memory: SharedMemory, input_id: str, input_data: str, input_type: str) -> str:
+    """Return the text to prompt with; removed spans are stored against input_id for audit."""
+    if not REDUCE_REPLIES or detect_format(input_data, input_type)[0] != "Email_Text":
+        return input_data
+    with span("email.reduce") as reduce_span:
+        reduction = reduce_reply_chain(input_data)
+        reduce_span.set(removed_chars=reduction.removed_chars, stripped=len(reduction.stripped))
+    if not reduction.stripped:
+        return input_data
+    memory.store_stripped_spans(input_id, reduction.stripped)
+    return reduction.text
+
+def _resolve_thread(input_data: str, input_type: str, metadata: Optional[Dict[str, Any]]) -> Optional[ThreadContext]:
+    """Place an email in its thread; other formats are not threaded."""
+    if not THREADING or detect_format(input_data, input_type)[0] != "Email_Text":
+        return None
+    with span("thread.resolve") as resolve_span:
+        thread = get_thread_store().resolve(message_headers(input_data, metadata))
+        resolve_span.set(thread_id=thread.thread_id, outcome=thread.outcome)
+    THREAD_MESSAGES.inc(outcome=thread.outcome)
+    return thread
+
+def _inherited_classification(thread: Optional[ThreadContext], input_data: str, input_type: str) -> Optional[Dict[str, Any]]:
+    """A reply keeps its thread's classification unless the pre-classifier is confident on its own."""
+    if thread is None or thread.classification is None:
+        return None
+    if preclassify(input_data, input_type)["confidence"] >= PRECLASSIFY_THRESHOLD:
+        return None
+    return {**thread.classification, "reasoning": f"Inherited from thread {thread.thread_id}"}
+
+def _use_fused_mode(input_data: str, input_type: str, mode: str) -> bool:
+    """Fused mode only helps when the two-stage path would need the classifier LLM."""
+    if mode != "fused" or not fits_budget(input_data, "email_agent"):
+        return False
+    return preclassify(input_data, input_type)["confidence"] < PRECLASSIFY_THRESHOLD
+
+# email attachments, processed as child documents of the message
+async def process_attachments(attachments: List[Attachment], parent_input_id: str, use_cache: bool = True,
+                              mode: str = None) -> List[Dict[str, Any]]:
+    """Process attachments in parallel, each stored with parent_input_id in its metadata."""
+    async def process_attachment(attachment: Attachment) -> Dict[str, Any]:
+        summary = {"filename": attachment.filename, "content_type": attachment.content_type}
+        try:
+            text = await asyncio.to_thread(attachment.text)
+        except Exception as e:
+            logger.error(f"Could not decode attachment {attachment.filename}: {str(e)}")
+            return {**summary, "status": "error", "error": str(e)}
+        response = await process_input(text, attachment.input_type, use_cache, mode,
+                                       metadata={"parent_input_id": parent_input_id, **attachment.as_dict()})
+        return {**summary, "input_id": response["input_id"], "status": response["status"],
+                "classification": response.get("classification")}
+
+    with span("attachments", count=len(attachments)):
+        return list(await asyncio.gather(*(process_attachment(attachment) for attachment in attachments)))
 
 # Process input with enhanced error handling and retry logic
-async def process_input(input_data: str, input_type: str = None) -> Dict[str, Any]:
-    memory = SharedMemory()
+async def process_input(input_data: str, input_type: str = None, use_cache: bool = True, mode: str = None,
+                        metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+    memory = get_shared_memory()
     input_id = str(uuid.uuid4())
     
+    # Every stage is timed as a span when tracing is enabled; spans are stored under input_id
+    with start_trace(input_id) as trace:
+        if trace is not None:
+            trace.on_finish(lambda finished: memory.store_spans(finished.trace_id, finished))
+        started = time.perf_counter()
+        with span("process_input", input_type=input_type, input_chars=len(input_data or "")) as root:
+            # MIME messages are reduced to their best text part; attachments become child documents
+            attachments = []
+            if input_data and is_mime_message(input_data):
+                try:
+                    with span("mime.parse") as parse_span:
+                        message = parse_mime(input_data)
+                        parse_span.set(attachments=len(message.attachments), dropped=len(message.dropped))
+                    input_data, input_type = message.prompt_text(), "email"
+                    metadata = {**(metadata or {}), "mime": message.metadata()}
+                    attachments = message.attachments
+                except Exception as e:
+                    logger.warning(f"MIME parsing failed, processing raw message: {str(e)}")
+            if attachments:
+                response, children = await asyncio.gather(
+                    _process_input(memory, input_id, input_data, input_type, use_cache, mode, metadata),
+                    process_attachments(attachments, input_id, use_cache, mode))
+                response["attachments"] = children
+            else:
+                response = await _process_input(memory, input_id, input_data, input_type, use_cache, mode, metadata)
+            root.set(status=response["status"], cached=response.get("cached", False))
+        classification = response.get("classification") or {}
+        DOCUMENTS.inc(format=classification.get("classified_format") or "unknown",
+                      intent=classification.get("classified_intent") or "unknown", status=response["status"])
+        DOCUMENT_SECONDS.observe(time.perf_counter() - started, status=response["status"])
+        return response
+
+async def _process_input(memory: SharedMemory, input_id: str, input_data: str, input_type: str,
+                         use_cache: bool, mode: Optional[str], metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     try:
         # Input validation
         if not input_data:
             raise ValueError("Empty input data")
             
         # Store input
-        memory.store_input(input_id, input_data, input_type)
+        memory.store_input(input_id, input_data, input_type, metadata)
+        
+        # Replies are processed against their thread's stored state; a message seen before is not reprocessed
+        thread = _resolve_thread(input_data, input_type, metadata)
+        thread_fields = {"thread_id": thread.thread_id} if thread is not None else {}
+        if thread is not None and thread.duplicate is not None and use_cache:
+            memory.store_classification(input_id, thread.duplicate["classification"])
+            memory.store_result(input_id, thread.duplicate["result"])
+            return {
+                "input_id": input_id,
+                "classification": thread.duplicate["classification"],
+                "result": thread.duplicate["result"],
+                "status": "success",
+                "duplicate": True,
+                **thread_fields
+            }
+        
+        # Serve exact and near-exact duplicates from the result cache
+        cache_key = None
+        if use_cache:
+            # Results from different backends must not be served for each other
+            prompt_version = f"{get_prompt_version()}:{get_llm_client().backend_name}"
+            cache_key = make_cache_key(input_data, prompt_version, get_schema_version())
+            with span("cache.lookup") as lookup:
+                cached = get_result_cache().get(cache_key)
+                lookup.set(hit=cached is not None)
+            if cached is not None:
+                memory.store_classification(input_id, cached["classification"])
+                memory.store_result(input_id, cached["result"])
+                if thread is not None:
+                    get_thread_store().record(thread, input_id, cached["classification"], cached["result"])
+                return {
+                    "input_id": input_id,
+                    "classification": cached["classification"],
+                    "result": cached["result"],
+                    "status": "success",
+                    "cached": True,
+                    **thread_fields
+                }
+        
+        input_data = _reduce_email(memory, input_id, input_data, input_type)
+        
+        inherited = _inherited_classification(thread, input_data, input_type)
         
         try:
-            # Process with classifier
-            classification = await classify_input(input_data)
-            memory.store_classification(input_id, classification)
+            fused = None
+            if inherited is None and _use_fused_mode(input_data, input_type, mode or PIPELINE_MODE):
+                with span("fused") as fused_span:
+                    fused = await process_fused_input(input_data, input_type)
+                    fused_span.set(accepted=fused is not None)
+                if fused is None:
+                    logger.info("Fused response failed validation, using two-stage processing")
             
-            # Route to appropriate agent
-            agent_type = decide_next_agent(classification)
-            intent = intent_type(classification)
-            
-            # Process with selected agent
-            if agent_type == "JSON_agent":
-                result = await process_json_input(input_data, intent)
+            if fused is not None:
+                classification, result = fused
+                memory.store_classification(input_id, classification)
             else:
-                result = await process_email_input(input_data, intent)
+                # Process with classifier
+                with span("classify", inherited=inherited is not None) as classify_span:
+                    classification = inherited or await classify_input(input_data, input_type)
+                    classify_span.set(intent=classification.get("classified_intent"),
+                                      format=classification.get("classified_format"))
+                memory.store_classification(input_id, classification)
+                
+                # Route to appropriate agent
+                agent_type = decide_next_agent(classification)
+                intent = intent_type(classification)
+                
+                # Process with selected agent
+                with span("extract", agent=agent_type, intent=intent):
+                    if agent_type == "JSON_agent":
+                        result = await process_json_input(input_data, intent)
+                    else:
+                        result = await process_email_input(input_data, intent,
+                                                           thread.prompt_context() if thread is not None else None)
                 
             memory.store_result(input_id, result)
             
+            if thread is not None and "error" not in classification and "error" not in result:
+                with span("thread.record"):
+                    get_thread_store().record(thread, input_id, classification, result)
+            
+            if cache_key and "error" not in classification and "error" not in result:
+                with span("cache.store"):
+                    get_result_cache().put(cache_key, classification, result)
+            
             return {
                 "input_id": input_id,
                 "classification": classification,
                 "result": result,
-                "status": "success"
+                "status": "success",
+                **thread_fields
             }
             
         except RetryError as e:
@@ -251,6 +578,8 @@ async def process_input(input_data: str, input_type: str = None) -> Dict[str, An
 async def main_async():
     """Async main program loop."""
     load_dotenv()
+    start_metrics_server_from_env()
+    start_retention_from_env()
     
     print("FlowBit Document Processor")
     print("-------------------------")
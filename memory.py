@@ -1,64 +1,626 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import aiosqlite
+import asyncio
+import atexit
+import logging
+import os
+import queue
 import sqlite3
 import json
+import threading
+import time
 import uuid
 from datetime import datetime
+from utils.tracing import Trace, current_trace
+from utils.metrics import REGISTRY
+from utils.compression import compress, content_hash, decompress
+
+logger = logging.getLogger(__name__)
+
+CREATE_TABLE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS inputs (
+        input_id TEXT PRIMARY KEY,
+        input_text TEXT,
+        timestamp TEXT,
+        input_type TEXT,
+        metadata JSON
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS classifications (
+        input_id TEXT PRIMARY KEY,
+        format TEXT,
+        intent TEXT,
+        reasoning TEXT,
+        timestamp TEXT,
+        FOREIGN KEY (input_id) REFERENCES inputs(input_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS results (
+        input_id TEXT PRIMARY KEY,
+        result_data JSON,
+        timestamp TEXT,
+        summary TEXT,
+        FOREIGN KEY (input_id) REFERENCES inputs(input_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS spans (
+        input_id TEXT,
+        span_id INTEGER,
+        parent_id INTEGER,
+        name TEXT,
+        start_us INTEGER,
+        duration_us INTEGER,
+        lane TEXT,
+        attributes JSON,
+        PRIMARY KEY (input_id, span_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        codec TEXT,
+        size INTEGER,
+        data BLOB
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stripped_spans (
+        input_id TEXT,
+        kind TEXT,
+        start_offset INTEGER,
+        end_offset INTEGER,
+        text TEXT,
+        FOREIGN KEY (input_id) REFERENCES inputs(input_id)
+    )
+    """,
+]
+
+# columns added after a table was first released: (table, column, type)
+ADDED_COLUMNS = [("results", "summary", "TEXT"), ("inputs", "input_hash", "TEXT"), ("results", "result_hash", "TEXT"),
+                 ("inputs", "preview", "TEXT")]
+
+# listing and filtering indexes; timestamps are ISO strings, so they sort chronologically
+CREATE_INDEX_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_inputs_timestamp ON inputs (timestamp, input_id)",
+    "CREATE INDEX IF NOT EXISTS idx_classifications_timestamp ON classifications (timestamp, input_id)",
+    "CREATE INDEX IF NOT EXISTS idx_classifications_intent ON classifications (intent, timestamp, input_id)",
+    "CREATE INDEX IF NOT EXISTS idx_classifications_format ON classifications (format, timestamp, input_id)",
+    "CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp, input_id)",
+    "CREATE INDEX IF NOT EXISTS idx_stripped_spans_input ON stripped_spans (input_id)",
+    # blob reference lookups, for dropping blobs once retention has archived every row using them
+    "CREATE INDEX IF NOT EXISTS idx_inputs_hash ON inputs (input_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_results_hash ON results (result_hash)",
+]
+
+# store input text and result JSON once per distinct content, compressed, in the blobs table
+COMPACT_STORAGE = os.getenv("FLOWBIT_COMPACT_STORAGE", "1").lower() not in ("0", "false", "no")
+
+# length of results.summary, the preview shown when listing results
+SUMMARY_CHARS = 120
+# length of inputs.preview, kept inline so listing compact inputs never decompresses a blob
+PREVIEW_CHARS = 50
+
+# prepared statements, reused through sqlite3's statement cache
+INSERT_INPUT_SQL = "INSERT INTO inputs (input_id, input_text, timestamp, input_type, metadata, input_hash, preview) VALUES (?, ?, ?, ?, ?, ?, ?)"
+INSERT_CLASSIFICATION_SQL = "INSERT INTO classifications (input_id, format, intent, reasoning, timestamp) VALUES (?, ?, ?, ?, ?)"
+INSERT_RESULT_SQL = "INSERT INTO results (input_id, result_data, timestamp, summary, result_hash) VALUES (?, ?, ?, ?, ?)"
+INSERT_BLOB_SQL = "INSERT OR IGNORE INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)"
+SELECT_BLOB_EXISTS_SQL = "SELECT 1 FROM blobs WHERE hash = ?"
+# rows written before compact storage keep their text inline; compact rows have NULL text and a blob
+SELECT_INPUT_SQL = "SELECT i.input_id, i.input_text, i.timestamp, i.input_type, i.metadata, b.codec, b.data FROM inputs i LEFT JOIN blobs b ON b.hash = i.input_hash WHERE i.input_id = ?"
+SELECT_CLASSIFICATION_SQL = "SELECT input_id, format, intent, reasoning, timestamp FROM classifications WHERE input_id = ?"
+SELECT_RESULT_SQL = "SELECT r.input_id, r.result_data, r.timestamp, b.codec, b.data FROM results r LEFT JOIN blobs b ON b.hash = r.result_hash WHERE r.input_id = ?"
+INSERT_STRIPPED_SPAN_SQL = "INSERT INTO stripped_spans (input_id, kind, start_offset, end_offset, text) VALUES (?, ?, ?, ?, ?)"
+SELECT_STRIPPED_SPANS_SQL = "SELECT kind, start_offset, end_offset, text FROM stripped_spans WHERE input_id = ? ORDER BY start_offset"
+# attachments and other child documents record their parent in inputs.metadata
+SELECT_CHILD_INPUTS_SQL = "SELECT i.input_id, i.input_text, i.timestamp, i.input_type, i.metadata, b.codec, b.data FROM inputs i LEFT JOIN blobs b ON b.hash = i.input_hash WHERE json_extract(i.metadata, '$.parent_input_id') = ? ORDER BY i.timestamp"
+INSERT_SPAN_SQL = "INSERT OR REPLACE INTO spans (input_id, span_id, parent_id, name, start_us, duration_us, lane, attributes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_SPANS_SQL = "SELECT input_id, span_id, parent_id, name, start_us, duration_us, lane, attributes FROM spans WHERE input_id = ? ORDER BY start_us, span_id"
+
+def _migration_sql(table_columns: Dict[str, List[str]]) -> List[str]:
+    """ALTER TABLE statements for ADDED_COLUMNS missing from an existing database."""
+    return [f"ALTER TABLE {table} ADD COLUMN {column} {kind}"
+            for table, column, kind in ADDED_COLUMNS if column not in table_columns.get(table, [])]
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Create missing tables, columns and indexes; safe to run on every open."""
+    for statement in CREATE_TABLE_SQL:
+        conn.execute(statement)
+    columns = {table: [row[1] for row in conn.execute(f"PRAGMA table_info({table})")] for table, _, _ in ADDED_COLUMNS}
+    for statement in _migration_sql(columns) + CREATE_INDEX_SQL:
+        conn.execute(statement)
+    conn.commit()
+
+# content-addressed blobs
+class PendingBlob:
+    """Blob write queued with its hash; compression is deferred to whoever writes it."""
+
+    __slots__ = ('digest', 'data')
+
+    def __init__(self, data: bytes):
+        self.digest = content_hash(data)
+        self.data = data
+
+    @classmethod
+    def from_text(cls, text: str) -> "PendingBlob":
+        # surrogatepass keeps undecodable bytes from raw .eml files round-trippable
+        return cls(text.encode('utf-8', 'surrogatepass'))
+
+    def params(self) -> tuple:
+        codec, payload = compress(self.data)
+        return (self.digest, codec, len(self.data), payload)
+
+def blob_text(codec: Optional[str], data: Optional[bytes]) -> Optional[str]:
+    if codec is None:
+        return None
+    return decompress(codec, data).decode('utf-8', 'surrogatepass')
+
+def register_blob_functions(conn: sqlite3.Connection) -> None:
+    """Expose flowbit_blob(codec, data) to SQL, for queries that read compact rows directly."""
+    conn.create_function("flowbit_blob", 2, blob_text, deterministic=True)
+
+def result_summary(result: Dict[str, Any]) -> str:
+    """One-line preview of a result, stored alongside it so listings never parse result_data."""
+    if "error" in result:
+        text = f"error: {result['error']}"
+    elif "primary_request_summary" in result:
+        text = str(result["primary_request_summary"])
+    elif isinstance(result.get("processing_report"), dict):
+        report = result["processing_report"]
+        text = f"{report.get('schema_used')}: {report.get('status')}"
+        if report.get("missing_required_fields"):
+            text += f" (missing {', '.join(map(str, report['missing_required_fields']))})"
+    else:
+        text = json.dumps(result, default=str)
+    return " ".join(text.split())[:SUMMARY_CHARS]
+
+def _input_row(row) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    return {
+        "input_id": row[0],
+        "input_text": row[1] if row[1] is not None else blob_text(row[5], row[6]),
+        "timestamp": row[2],
+        "input_type": row[3],
+        "metadata": json.loads(row[4]) if row[4] else None
+    }
+
+def _classification_row(row) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    return {
+        "input_id": row[0],
+        "classified_format": row[1],
+        "classified_intent": row[2],
+        "reasoning": row[3],
+        "timestamp": row[4]
+    }
+
+def _result_row(row) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    data = row[1] if row[1] is not None else blob_text(row[3], row[4])
+    return {"input_id": row[0], "result": json.loads(data) if data is not None else None, "timestamp": row[2]}
+
+def span_row(row) -> Dict[str, Any]:
+    return {
+        "trace_id": row[0],
+        "span_id": row[1],
+        "parent_id": row[2],
+        "name": row[3],
+        "start_us": row[4],
+        "duration_us": row[5],
+        "lane": row[6],
+        "attributes": json.loads(row[7]) if row[7] else {}
+    }
+
+def _span_params(input_id: str, trace: Trace) -> List[tuple]:
+    return [(input_id, s.span_id, s.parent_id, s.name, s.start_us, s.duration_us, s.lane, json.dumps(s.attributes, default=str))
+            for s in list(trace.spans)]
+
+class _PersistSpans:
+    """Writer queue item: store a trace's spans once the batch holding its rows has committed."""
+
+    __slots__ = ('input_id', 'trace')
+
+    def __init__(self, input_id: str, trace: Trace):
+        self.input_id = input_id
+        self.trace = trace
+
+# writer metrics, shared by every SharedMemory in the process
+COMMIT_SECONDS = REGISTRY.histogram("flowbit_db_commit_seconds", "SQLite batch commit latency",
+                                    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+DB_WRITES = REGISTRY.counter("flowbit_db_writes_total", "Rows committed by the background writer")
+
+def _input_writes(input_id: str, input_text: str, input_type: Optional[str], metadata: Optional[Dict[str, Any]],
+                  compact: bool) -> List[tuple]:
+    """(sql, params) pairs storing an input; compact inputs reference a blob instead of holding the text."""
+    metadata_json = json.dumps(metadata) if metadata else None
+    timestamp = datetime.now().isoformat()
+    preview = input_text[:PREVIEW_CHARS]
+    if not compact:
+        return [(INSERT_INPUT_SQL, (input_id, input_text, timestamp, input_type, metadata_json, None, preview))]
+    blob = PendingBlob.from_text(input_text)
+    return [(INSERT_BLOB_SQL, blob), (INSERT_INPUT_SQL, (input_id, None, timestamp, input_type, metadata_json, blob.digest, preview))]
+
+def _stripped_span_params(input_id: str, span: Dict[str, Any]) -> tuple:
+    return (input_id, span["kind"], span["start"], span["end"], span["text"])
+
+def _stripped_span_row(row) -> Dict[str, Any]:
+    return {"kind": row[0], "start": row[1], "end": row[2], "text": row[3]}
+
+def _result_writes(input_id: str, result: Dict[str, Any], compact: bool) -> List[tuple]:
+    data = json.dumps(result)
+    timestamp = datetime.now().isoformat()
+    if not compact:
+        return [(INSERT_RESULT_SQL, (input_id, data, timestamp, result_summary(result), None))]
+    blob = PendingBlob.from_text(data)
+    return [(INSERT_BLOB_SQL, blob), (INSERT_RESULT_SQL, (input_id, None, timestamp, result_summary(result), blob.digest))]
+
+def _classification_params(input_id: str, classification: Dict[str, Any]) -> tuple:
+    return (input_id, classification.get('classified_format'), classification.get('classified_intent'),
+            classification.get('reasoning'), datetime.now().isoformat())
 
 class SharedMemory:
-    def __init__(self, db_path: str = "flowbit.db"):
-        self.conn = sqlite3.connect(db_path)
+    """
+    SQLite store for inputs, classifications and results.
+
+    Writes are queued and applied by a background thread that groups them
+    into one transaction per batch_size writes or flush_interval seconds,
+    whichever comes first. Call flush() before reading back fresh writes.
+
+    When the calling document is traced, each commit is recorded as a
+    "sqlite.commit" span on that document's trace.
+
+    With compact storage, input text and result JSON go to the blobs table,
+    keyed by content hash; the writer thread compresses each new blob and
+    skips ones already stored.
+    """
+
+    def __init__(self, db_path: str = "flowbit.db", batch_size: int = 200, flush_interval: float = 0.05,
+                 compact: Optional[bool] = None):
+        self.db_path = db_path
+        self.compact = COMPACT_STORAGE if compact is None else compact
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.writes = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        self.configure()
         self.create_tables()
-    
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="flowbit-memory-writer", daemon=True)
+        self._writer.start()
+
+    def configure(self):
+        # only takes effect on a new file; lets retention return freed pages without a full VACUUM
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL lets readers run alongside the writer and makes commits cheaper
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
     def create_tables(self):
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS inputs (
-                input_id TEXT PRIMARY KEY,
-                input_text TEXT,
-                timestamp TEXT,
-                input_type TEXT,
-                metadata JSON
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS classifications (
-                input_id TEXT PRIMARY KEY,
-                format TEXT,
-                intent TEXT,
-                reasoning TEXT,
-                timestamp TEXT,
-                FOREIGN KEY (input_id) REFERENCES inputs(input_id)
-            )
-        """)
-        
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS results (
-                input_id TEXT PRIMARY KEY,
-                result_data JSON,
-                timestamp TEXT,
-                FOREIGN KEY (input_id) REFERENCES inputs(input_id)
-            )
-        """)
-        self.conn.commit()
-    
-    def store_input(self, input_id: str, input_text: str, input_type: str = None) -> None:
-        self.conn.execute(
-            "INSERT INTO inputs (input_id, input_text, timestamp, input_type) VALUES (?, ?, ?, ?)",
-            (input_id, input_text, datetime.now().isoformat(), input_type)
-        )
-        self.conn.commit()
-    
+        ensure_schema(self.conn)
+
+    def store_input(self, input_id: str, input_text: str, input_type: str = None, metadata: Dict[str, Any] = None) -> None:
+        for sql, params in _input_writes(input_id, input_text, input_type, metadata, self.compact):
+            self._enqueue(sql, params)
+
     def store_classification(self, input_id: str, classification: Dict[str, Any]) -> None:
-        self.conn.execute(
-            "INSERT INTO classifications (input_id, format, intent, reasoning, timestamp) VALUES (?, ?, ?, ?, ?)",
-            (input_id, classification.get('classified_format'), classification.get('classified_intent'),
-             classification.get('reasoning'), datetime.now().isoformat())
-        )
-        self.conn.commit()
-    
+        self._enqueue(INSERT_CLASSIFICATION_SQL, _classification_params(input_id, classification))
+
     def store_result(self, input_id: str, result: Dict[str, Any]) -> None:
-        self.conn.execute(
-            "INSERT INTO results (input_id, result_data, timestamp) VALUES (?, ?, ?)",
-            (input_id, json.dumps(result), datetime.now().isoformat())
-        )
-        self.conn.commit()
\ No newline at end of file
+        for sql, params in _result_writes(input_id, result, self.compact):
+            self._enqueue(sql, params)
+
+    def store_stripped_spans(self, input_id: str, spans: List[Dict[str, Any]]) -> None:
+        """Record text removed from an input before prompting (quoted replies, signatures, disclaimers)."""
+        for span in spans:
+            self._enqueue(INSERT_STRIPPED_SPAN_SQL, _stripped_span_params(input_id, span))
+
+    def store_spans(self, input_id: str, trace: Trace) -> None:
+        if self._closed:
+            raise RuntimeError("SharedMemory is closed")
+        self._queue.put(_PersistSpans(input_id, trace))
+
+    # reads only see committed writes; call flush() first to include queued ones
+    def _fetchone(self, sql: str, params: tuple):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def get_input(self, input_id: str) -> Optional[Dict[str, Any]]:
+        return _input_row(self._fetchone(SELECT_INPUT_SQL, (input_id,)))
+
+    def get_classification(self, input_id: str) -> Optional[Dict[str, Any]]:
+        return _classification_row(self._fetchone(SELECT_CLASSIFICATION_SQL, (input_id,)))
+
+    def get_result(self, input_id: str) -> Optional[Dict[str, Any]]:
+        return _result_row(self._fetchone(SELECT_RESULT_SQL, (input_id,)))
+
+    def get_children(self, input_id: str) -> List[Dict[str, Any]]:
+        """Inputs stored with parent_input_id == input_id, e.g. email attachments."""
+        with self._lock:
+            return [_input_row(row) for row in self.conn.execute(SELECT_CHILD_INPUTS_SQL, (input_id,)).fetchall()]
+
+    def get_record(self, input_id: str) -> Dict[str, Any]:
+        return {
+            "input": self.get_input(input_id),
+            "classification": self.get_classification(input_id),
+            "result": self.get_result(input_id)
+        }
+
+    def get_stripped_spans(self, input_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [_stripped_span_row(row) for row in self.conn.execute(SELECT_STRIPPED_SPANS_SQL, (input_id,)).fetchall()]
+
+    def get_spans(self, input_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [span_row(row) for row in self.conn.execute(SELECT_SPANS_SQL, (input_id,)).fetchall()]
+
+    # background writer
+    def _enqueue(self, sql: str, params: tuple) -> None:
+        if self._closed:
+            raise RuntimeError("SharedMemory is closed")
+        self._queue.put((sql, params, current_trace()))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            # Flush requests close the batch early
+            while len(batch) < self.batch_size and not isinstance(batch[-1], threading.Event):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Any]) -> None:
+        statements = [item for item in batch if isinstance(item, tuple)]
+        span_batches = [item for item in batch if isinstance(item, _PersistSpans)]
+        with self._lock:
+            if statements:
+                try:
+                    started_us = time.time_ns() // 1000
+                    started = time.perf_counter_ns()
+                    with self.conn:
+                        for sql, params, _ in statements:
+                            self._execute(sql, params)
+                    duration_us = (time.perf_counter_ns() - started) // 1000
+                    # blob rows belong to the input/result write that follows them
+                    self.writes += sum(not isinstance(params, PendingBlob) for _, params, _ in statements)
+                    self.batches += 1
+                    COMMIT_SECONDS.observe(duration_us / 1e6)
+                    DB_WRITES.inc(len(statements))
+                    self._record_commit(statements, started_us, duration_us)
+                except sqlite3.Error as e:
+                    # Retry one by one so a single bad row does not drop the batch
+                    logger.warning(f"Batch write failed ({str(e)}), retrying writes individually")
+                    for sql, params, _ in statements:
+                        try:
+                            with self.conn:
+                                self._execute(sql, params)
+                            self.writes += not isinstance(params, PendingBlob)
+                            self.batches += 1
+                            DB_WRITES.inc()
+                        except sqlite3.Error as row_error:
+                            logger.error(f"Dropped write: {str(row_error)}")
+            if span_batches:
+                try:
+                    with self.conn:
+                        for item in span_batches:
+                            self.conn.executemany(INSERT_SPAN_SQL, _span_params(item.input_id, item.trace))
+                except sqlite3.Error as e:
+                    logger.error(f"Dropped spans: {str(e)}")
+        for item in batch:
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def _execute(self, sql: str, params: Any) -> None:
+        if isinstance(params, PendingBlob):
+            # duplicate content is never compressed twice
+            if self.conn.execute(SELECT_BLOB_EXISTS_SQL, (params.digest,)).fetchone():
+                return
+            params = params.params()
+        self.conn.execute(sql, params)
+
+    @staticmethod
+    def _record_commit(statements: List[tuple], started_us: int, duration_us: int) -> None:
+        traces: Dict[int, Any] = {}
+        rows: Dict[int, int] = {}
+        for _, _, trace in statements:
+            if trace is not None:
+                traces[id(trace)] = trace
+                rows[id(trace)] = rows.get(id(trace), 0) + 1
+        for key, trace in traces.items():
+            trace.add_span("sqlite.commit", started_us, duration_us, rows=rows[key], batch_rows=len(statements))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every write queued so far has been committed."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self.conn.close()
+
+class AsyncSharedMemory:
+    """
+    aiosqlite-backed variant of SharedMemory for use inside the event loop.
+
+    Statements run on aiosqlite's worker thread. Writers that finish at the
+    same time share a single commit, so concurrent documents do not pay one
+    fsync each.
+    """
+
+    def __init__(self, db_path: str = "flowbit.db", compact: Optional[bool] = None):
+        self.db_path = db_path
+        self.compact = COMPACT_STORAGE if compact is None else compact
+        self.conn: Optional[aiosqlite.Connection] = None
+        self.writes = 0
+        self.commits = 0
+        self._pending_commit: Optional[asyncio.Future] = None
+
+    async def open(self) -> "AsyncSharedMemory":
+        if self.conn is None:
+            self.conn = await aiosqlite.connect(self.db_path)
+            await self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await self.conn.execute("PRAGMA journal_mode=WAL")
+            await self.conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in CREATE_TABLE_SQL:
+                await self.conn.execute(statement)
+            columns = {}
+            for table, _, _ in ADDED_COLUMNS:
+                async with self.conn.execute(f"PRAGMA table_info({table})") as cursor:
+                    columns[table] = [row[1] for row in await cursor.fetchall()]
+            for statement in _migration_sql(columns) + CREATE_INDEX_SQL:
+                await self.conn.execute(statement)
+            await self.conn.commit()
+        return self
+
+    async def __aenter__(self) -> "AsyncSharedMemory":
+        return await self.open()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            await self._commit()
+            await self.conn.close()
+            self.conn = None
+
+    async def _write(self, sql: str, params: tuple) -> None:
+        await self.open()
+        await self.conn.execute(sql, params)
+        self.writes += 1
+        await self._commit()
+
+    async def _commit(self) -> None:
+        """Group commit: join the pending commit or start a new one."""
+        if self._pending_commit is None:
+            self._pending_commit = asyncio.ensure_future(self._run_commit())
+        await asyncio.shield(self._pending_commit)
+
+    async def _run_commit(self) -> None:
+        # Yield once so writers finishing in the same tick join this commit
+        await asyncio.sleep(0)
+        self._pending_commit = None
+        await self.conn.commit()
+        self.commits += 1
+
+    async def _write_all(self, writes: List[tuple]) -> None:
+        for sql, params in writes:
+            if isinstance(params, PendingBlob):
+                # committed together with the row that references it
+                await self.open()
+                await self.conn.execute(sql, await asyncio.to_thread(params.params))
+            else:
+                await self._write(sql, params)
+
+    async def store_input(self, input_id: str, input_text: str, input_type: str = None, metadata: Dict[str, Any] = None) -> None:
+        await self._write_all(_input_writes(input_id, input_text, input_type, metadata, self.compact))
+
+    async def store_classification(self, input_id: str, classification: Dict[str, Any]) -> None:
+        await self._write(INSERT_CLASSIFICATION_SQL, _classification_params(input_id, classification))
+
+    async def store_result(self, input_id: str, result: Dict[str, Any]) -> None:
+        await self._write_all(_result_writes(input_id, result, self.compact))
+
+    async def store_stripped_spans(self, input_id: str, spans: List[Dict[str, Any]]) -> None:
+        for span in spans:
+            await self._write(INSERT_STRIPPED_SPAN_SQL, _stripped_span_params(input_id, span))
+
+    async def store_spans(self, input_id: str, trace: Trace) -> None:
+        await self.open()
+        await self.conn.executemany(INSERT_SPAN_SQL, _span_params(input_id, trace))
+        self.writes += 1
+        await self._commit()
+
+    async def _fetchone(self, sql: str, params: tuple):
+        await self.open()
+        async with self.conn.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    async def get_input(self, input_id: str) -> Optional[Dict[str, Any]]:
+        return _input_row(await self._fetchone(SELECT_INPUT_SQL, (input_id,)))
+
+    async def get_classification(self, input_id: str) -> Optional[Dict[str, Any]]:
+        return _classification_row(await self._fetchone(SELECT_CLASSIFICATION_SQL, (input_id,)))
+
+    async def get_result(self, input_id: str) -> Optional[Dict[str, Any]]:
+        return _result_row(await self._fetchone(SELECT_RESULT_SQL, (input_id,)))
+
+    async def get_children(self, input_id: str) -> List[Dict[str, Any]]:
+        await self.open()
+        async with self.conn.execute(SELECT_CHILD_INPUTS_SQL, (input_id,)) as cursor:
+            return [_input_row(row) for row in await cursor.fetchall()]
+
+    async def get_record(self, input_id: str) -> Dict[str, Any]:
+        return {
+            "input": await self.get_input(input_id),
+            "classification": await self.get_classification(input_id),
+            "result": await self.get_result(input_id)
+        }
+
+    async def get_stripped_spans(self, input_id: str) -> List[Dict[str, Any]]:
+        await self.open()
+        async with self.conn.execute(SELECT_STRIPPED_SPANS_SQL, (input_id,)) as cursor:
+            return [_stripped_span_row(row) for row in await cursor.fetchall()]
+
+    async def get_spans(self, input_id: str) -> List[Dict[str, Any]]:
+        await self.open()
+        async with self.conn.execute(SELECT_SPANS_SQL, (input_id,)) as cursor:
+            return [span_row(row) for row in await cursor.fetchall()]
+
+# long-lived stores shared by every document in the process
+_shared_memories: Dict[str, SharedMemory] = {}
+_shared_lock = threading.Lock()
+
+def get_shared_memory(db_path: str = "flowbit.db") -> SharedMemory:
+    """Return the process-wide SharedMemory for db_path, opening it on first use."""
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _shared_lock:
+        memory = _shared_memories.get(key)
+        if memory is None or memory._closed:
+            memory = SharedMemory(db_path)
+            _shared_memories[key] = memory
+        return memory
+
+REGISTRY.register_callback(
+    "flowbit_db_write_queue_depth", "Writes waiting for the background SQLite writer", ("db",),
+    lambda: [({"db": path}, memory._queue.qsize()) for path, memory in list(_shared_memories.items())])
+
+@atexit.register
+def close_shared_memories() -> None:
+    with _shared_lock:
+        for memory in _shared_memories.values():
+            memory.close()
+        _shared_memories.clear()
@@ -0,0 +1,102 @@
+"""
+Convert an existing flowbit.db to compact storage.
+
+Moves inline input text and result JSON into the content-addressed blobs
+table, compressed, one short transaction per batch so a running pipeline
+can keep writing. Rows already converted are skipped, so an interrupted
+migration can simply be run again. Pass --vacuum to hand the freed pages
+back to the filesystem afterwards (this rewrites the whole file).
+Inputs missing the inline preview shown by view_db.py get it filled in
+from their text first.
+
+Usage: python migrate_storage.py flowbit.db --batch-rows 500 --vacuum
+"""
+from memory import INSERT_BLOB_SQL, PREVIEW_CHARS, SELECT_BLOB_EXISTS_SQL, PendingBlob, ensure_schema, register_blob_functions
+from typing import Any, Dict
+import json
+import os
+import sqlite3
+import time
+import typer
+
+app = typer.Typer()
+
+# (table, inline column, hash column)
+COMPACTED_COLUMNS = [("inputs", "input_text", "input_hash"), ("results", "result_data", "result_hash")]
+
+def database_size(db_path: str) -> int:
+    """Bytes on disk, including the WAL."""
+    return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+
+# rows are picked by rowid, so one whose text is missing altogether is not revisited
+BACKFILL_PREVIEW_SQL = f"""
+    UPDATE inputs SET preview = substr(COALESCE(
+        input_text, (SELECT flowbit_blob(codec, data) FROM blobs WHERE hash = inputs.input_hash)), 1, {PREVIEW_CHARS})
+    WHERE rowid IN (SELECT value FROM json_each(?))
+"""
+
+def backfill_previews(conn: sqlite3.Connection, batch_rows: int) -> int:
+    """Fill inputs.preview for rows written before it existed, batch_rows rows per transaction."""
+    register_blob_functions(conn)
+    last_rowid, filled = 0, 0
+    while True:
+        rowids = [row[0] for row in conn.execute(
+            "SELECT rowid FROM inputs WHERE rowid > ? AND preview IS NULL ORDER BY rowid LIMIT ?", (last_rowid, batch_rows)
+        )]
+        if not rowids:
+            return filled
+        with conn:
+            filled += conn.execute(BACKFILL_PREVIEW_SQL, (json.dumps(rowids),)).rowcount
+        last_rowid = rowids[-1]
+
+def compact_table(conn: sqlite3.Connection, table: str, column: str, hash_column: str, batch_rows: int) -> Dict[str, int]:
+    """Move one column's inline values into blobs, batch_rows rows per transaction."""
+    last_rowid, rows_moved, blobs_added = 0, 0, 0
+    while True:
+        rows = conn.execute(
+            f"SELECT rowid, {column} FROM {table} WHERE rowid > ? AND {column} IS NOT NULL ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_rows)
+        ).fetchall()
+        if not rows:
+            return {"rows": rows_moved, "blobs": blobs_added}
+        with conn:
+            for rowid, value in rows:
+                blob = PendingBlob.from_text(value)
+                if conn.execute(SELECT_BLOB_EXISTS_SQL, (blob.digest,)).fetchone() is None:
+                    conn.execute(INSERT_BLOB_SQL, blob.params())
+                    blobs_added += 1
+                conn.execute(f"UPDATE {table} SET {column} = NULL, {hash_column} = ? WHERE rowid = ?", (blob.digest, rowid))
+        rows_moved += len(rows)
+        last_rowid = rows[-1][0]
+
+def migrate(db_path: str, batch_rows: int = 500, vacuum: bool = False) -> Dict[str, Any]:
+    size_before = database_size(db_path)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_schema(conn)
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"size_before": size_before, "previews": backfill_previews(conn, batch_rows)}
+    for table, column, hash_column in COMPACTED_COLUMNS:
+        report[table] = compact_table(conn, table, column, hash_column, batch_rows)
+    if vacuum:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+    conn.close()
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["size_after"] = database_size(db_path)
+    return report
+
+@app.command()
+def run(db_path: str = typer.Argument("flowbit.db"),
+        batch_rows: int = typer.Option(500, help="Rows converted per transaction"),
+        vacuum: bool = typer.Option(False, help="Rewrite the file afterwards to return freed space")):
+    """Move inline inputs and results into compressed, deduplicated blobs"""
+    report = migrate(db_path, batch_rows, vacuum)
+    for table, _, _ in COMPACTED_COLUMNS:
+        typer.echo(f"{table}: {report[table]['rows']} rows moved, {report[table]['blobs']} new blobs")
+    typer.echo(f"inputs: {report['previews']} previews filled in")
+    typer.echo(f"{report['size_before'] / 1e6:.1f} MB -> {report['size_after'] / 1e6:.1f} MB in {report['seconds']:.2f}s"
+               + ("" if vacuum else " (run with --vacuum to return freed pages to the filesystem)"))
+
+if __name__ == "__main__":
+    app()
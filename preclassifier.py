@@ -0,0 +1,194 @@
+# imports
+from utils.email_utils import extract_email_parts
+from schema_registry import get_schema_registry, INTENT_TO_SCHEMA
+from schema_mapper import resolve_keys, MISSING
+from typing import Dict, Any, Optional, Tuple
+import json
+import re
+
+# weighted keyword patterns per intent
+INTENT_LEXICON = {
+    "Invoice": [
+        (r'\binvoice\s*(?:no\.?|number|#|id)', 3.0),
+        (r'\b(?:amount|balance|total)\s+due\b', 2.5),
+        (r'\binvoice\b', 1.5),
+        (r'\bpayment terms\b|\bremit(?:tance)?\b|\bdue date\b', 1.0),
+    ],
+    "RFQ": [
+        (r'\brequest for (?:a )?quot', 3.5),
+        (r'\brfq\b', 3.0),
+        (r'\bquot(?:e|ation)\b', 1.5),
+        (r'\bpricing\b|\blead time\b|\bvolume discount', 1.0),
+    ],
+    "Complaint": [
+        (r'\bcomplain(?:t|ing)?\b', 3.0),
+        (r'\b(?:dissatisfied|unacceptable|disappointed|frustrated)\b', 2.0),
+        (r'\b(?:damaged|defective|broken on arrival|poor service)\b', 1.5),
+        (r'\brefund\b', 1.0),
+    ],
+    "Regulation": [
+        (r'\bregulation\b|\bdirective\b', 2.5),
+        (r'\bpursuant to\b|\bin accordance with article\b|\barticle \d+', 2.0),
+        (r'\bcompliance\b|\benforcement\b|\bcomes into force\b', 1.5),
+        (r'\bshall\b', 0.5),
+    ],
+    "General_Inquiry": [
+        (r'\binquiry\b|\benquiry\b', 2.0),
+        (r'\bwould like to know\b|\bcould you (?:tell|let me know)\b', 2.0),
+        (r'\binformation (?:about|on|regarding)\b', 1.5),
+    ],
+    "Order_Confirmation": [
+        (r'\border confirmation\b|\border (?:has been )?confirmed\b', 3.5),
+        (r'\border\s*(?:no\.?|number|#)', 2.0),
+        (r'\bthank you for your order\b', 2.5),
+        (r'\btracking number\b|\bestimated delivery\b', 1.0),
+    ],
+    "Support_Request": [
+        (r'\bsupport (?:ticket|request)\b|\btechnical support\b', 3.0),
+        (r'\bnot working\b|\bunable to\b|\bcan(?:no|\')t (?:log ?in|access|connect)\b', 2.0),
+        (r'\berror (?:message|code)\b|\bcrash(?:es|ed|ing)?\b', 1.5),
+        (r'\bplease help\b|\btroubleshoot', 1.0),
+    ],
+}
+_COMPILED_LEXICON = {
+    intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+    for intent, patterns in INTENT_LEXICON.items()
+}
+
+# Score at which keyword (text) or matched-field (JSON) evidence counts as certain
+SCORE_SATURATION = 4.0
+JSON_SCORE_SATURATION = 3.0
+# Only the head of a document is scanned; intent is almost always stated early
+SCAN_CHARS = 20000
+
+class PreClassifierStats:
+    def __init__(self):
+        self.handled = 0
+        self.fallbacks = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.handled + self.fallbacks
+        return {
+            "handled": self.handled,
+            "fallbacks": self.fallbacks,
+            "handled_fraction": round(self.handled / total, 4) if total else 0.0,
+        }
+
+stats = PreClassifierStats()
+
+def get_preclassifier_stats() -> Dict[str, Any]:
+    return stats.as_dict()
+
+# format detection
+def detect_format(text: str, input_type: Optional[str] = None) -> Tuple[str, float, Any]:
+    """
+    Detect the input format.
+
+    Returns:
+        (format, confidence, parsed JSON payload or None)
+    """
+    stripped = text.lstrip()
+    if stripped[:1] in ('{', '['):
+        try:
+            return "JSON", 1.0, json.loads(text)
+        except json.JSONDecodeError:
+            pass
+    if input_type and input_type.lower() == 'pdf':
+        return "PDF_Content", 1.0, None
+    parts = extract_email_parts(text[:SCAN_CHARS])
+    if parts['subject'] or parts['from']:
+        return "Email_Text", 0.95, None
+    head = stripped[:500].lower()
+    if re.match(r'(?:dear|hi|hello)\b', head) and re.search(r'\b(?:regards|sincerely|thanks|thank you)\b', stripped[-500:].lower()):
+        return "Email_Text", 0.8, None
+    return "Undetermined_Format", 0.0, None
+
+# intent detection
+def _score_text(text: str) -> Dict[str, float]:
+    sample = text[:SCAN_CHARS]
+    return {
+        intent: sum(weight for pattern, weight in patterns if pattern.search(sample))
+        for intent, patterns in _COMPILED_LEXICON.items()
+    }
+
+def _confidence(scores: Dict[str, float], saturation: float) -> Tuple[str, float]:
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best_intent, best), (_, second) = ranked[0], ranked[1]
+    if best <= 0:
+        return "Other", 0.0
+    # Evidence strength, discounted by how close the runner-up is (a tie halves it)
+    return best_intent, min(1.0, best / saturation) * (1 - second / (2 * best))
+
+_path_frequency: Dict[str, Any] = {"version": None, "counts": {}}
+
+def _schema_path_counts() -> Dict[Tuple[str, ...], int]:
+    """How many intent schemas reference each source path, rebuilt when schemas change."""
+    registry = get_schema_registry()
+    version = registry.get_version()
+    if _path_frequency["version"] != version:
+        counts: Dict[Tuple[str, ...], int] = {}
+        for intent, schema_name in INTENT_TO_SCHEMA.items():
+            if intent == "Other":
+                continue
+            for keys in {keys for field in registry.get_by_name(schema_name).fields for _, keys in field.paths}:
+                counts[keys] = counts.get(keys, 0) + 1
+        _path_frequency.update(version=version, counts=counts)
+    return _path_frequency["counts"]
+
+def _score_json(payload: Any) -> Dict[str, float]:
+    """
+    Score each intent by the schema fields that resolve in the payload.
+
+    A path shared by k schemas contributes 1/k, so distinctive keys such as
+    "invoice_id" count fully and generic ones such as "id" barely count.
+    """
+    scores = {}
+    if not isinstance(payload, dict):
+        return scores
+    registry = get_schema_registry()
+    counts = _schema_path_counts()
+    for intent, schema_name in INTENT_TO_SCHEMA.items():
+        if intent == "Other":
+            continue
+        score = 0.0
+        for field in registry.get_by_name(schema_name).fields:
+            matched = [keys for _, keys in field.paths if keys and resolve_keys(payload, keys) is not MISSING]
+            if matched:
+                score += max(1.0 / counts.get(keys, 1) for keys in matched)
+        scores[intent] = score
+    return scores
+
+def preclassify(text: str, input_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Classify format and intent with local rules.
+
+    Args:
+        text: Input text
+        input_type: Optional hint such as "pdf" or "json"
+
+    Returns:
+        Classification dict shaped like the classifier agent output, plus "confidence"
+    """
+    input_format, format_confidence, payload = detect_format(text, input_type)
+    scores = _score_json(payload) if input_format == "JSON" else {}
+    saturation = JSON_SCORE_SATURATION
+    if not scores or max(scores.values()) <= 0:
+        scores = _score_text(text if payload is None else json.dumps(payload))
+        saturation = SCORE_SATURATION
+    intent, intent_confidence = _confidence(scores, saturation)
+    matched = [name for name, score in sorted(scores.items(), key=lambda item: -item[1]) if score > 0][:3]
+    return {
+        "classified_format": input_format,
+        "classified_intent": intent,
+        "reasoning": f"Rule-based pre-classifier: format {input_format}, intent scores led by {', '.join(matched) or 'none'}",
+        "confidence": round(min(format_confidence, intent_confidence), 4)
+    }
+
+def try_preclassify(text: str, input_type: Optional[str] = None, threshold: float = 0.85) -> Optional[Dict[str, Any]]:
+    """Return the local classification if it clears threshold, otherwise None (use the LLM)."""
+    classification = preclassify(text, input_type)
+    if classification["confidence"] >= threshold:
+        stats.handled += 1
+        return classification
+    stats.fallbacks += 1
+    return None
@@ -0,0 +1,387 @@
+"""
+Retention, archival and vacuum for flowbit.db.
+
+A policy gives the maximum age in days per classified intent, with "*"
+covering every other intent and unclassified inputs; intents without a
+rule (or set to "forever") are kept. Expired documents are copied with
+their classification, result, spans, thread messages and blobs into
+monthly archive databases (archive/flowbit-YYYY-MM.db, by the document's
+timestamp) and then deleted from flowbit.db, batch_rows documents per
+short transaction, so the pipeline's writer is never held back for long.
+Threads go with their last document once no other processed message is left in them.
+Blobs no longer referenced are dropped, result cache entries past the
+same policy are deleted rather than archived, and the freed pages are
+handed back to the filesystem with incremental vacuum, a few pages at a time.
+
+Archives have the same schema as flowbit.db, so SharedMemory opens them as is.
+
+Usage:
+    python retention.py flowbit.db --policy "RFQ=30,Invoice=365,*=90"
+    FLOWBIT_RETENTION="*=90" python batch.py docs/   # also runs hourly in the background
+"""
+from memory import ensure_schema
+from migrate_storage import database_size
+from threads import ensure_thread_schema
+from utils.metrics import REGISTRY
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typer
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+DEFAULT_RULE = "*"
+KEEP = ("forever", "keep", "never")
+
+# every table holding per-document rows; children are deleted before inputs
+ARCHIVED_TABLES = ["inputs", "classifications", "results", "stripped_spans", "spans", "thread_messages"]
+
+# rules for a named intent walk the intent index; matching rows are deleted, so there is no cursor
+EXPIRED_INTENT_SQL = """
+    SELECT c.input_id, i.timestamp FROM classifications c JOIN inputs i ON i.input_id = c.input_id
+    WHERE c.intent = ? AND c.timestamp < ?
+    ORDER BY c.timestamp, c.input_id LIMIT ?
+"""
+# the default rule skips old rows kept by other rules, so it is keyset-paged past them
+EXPIRED_DEFAULT_SQL = """
+    SELECT i.input_id, i.timestamp FROM inputs i LEFT JOIN classifications c ON c.input_id = i.input_id
+    WHERE (i.timestamp, i.input_id) > (?, ?) AND i.timestamp < ?
+      AND (c.intent IS NULL OR c.intent NOT IN (SELECT value FROM json_each(?)))
+    ORDER BY i.timestamp, i.input_id LIMIT ?
+"""
+BATCH_IDS = "SELECT value FROM json_each(?)"
+SELECT_BATCH_HASHES_SQL = f"""
+    SELECT input_hash FROM inputs WHERE input_id IN ({BATCH_IDS}) AND input_hash IS NOT NULL
+    UNION SELECT result_hash FROM results WHERE input_id IN ({BATCH_IDS}) AND result_hash IS NOT NULL
+"""
+COPY_BLOBS_SQL = f"INSERT OR IGNORE INTO archive.blobs (hash, codec, size, data) SELECT hash, codec, size, data FROM main.blobs WHERE hash IN ({BATCH_IDS})"
+DELETE_ORPHAN_BLOBS_SQL = f"""
+    DELETE FROM blobs WHERE hash IN ({BATCH_IDS})
+      AND NOT EXISTS (SELECT 1 FROM inputs WHERE input_hash = blobs.hash)
+      AND NOT EXISTS (SELECT 1 FROM results WHERE result_hash = blobs.hash)
+"""
+
+# threads last updated by a document in the batch and with no processed message outside it
+ORPHAN_THREADS_SQL = f"""
+    SELECT t.thread_id FROM threads t WHERE t.last_input_id IN ({BATCH_IDS})
+      AND NOT EXISTS (SELECT 1 FROM thread_messages m WHERE m.thread_id = t.thread_id
+                      AND m.input_id IS NOT NULL AND m.input_id NOT IN ({BATCH_IDS}))
+"""
+COPY_THREADS_SQL = f"INSERT OR REPLACE INTO archive.threads SELECT * FROM main.threads WHERE thread_id IN ({BATCH_IDS})"
+# re-checked inside the delete transaction, in case a message joined the thread since the copy
+DELETE_ORPHAN_THREADS_SQL = f"""
+    DELETE FROM threads WHERE thread_id IN ({BATCH_IDS}) AND last_input_id IN ({BATCH_IDS})
+      AND NOT EXISTS (SELECT 1 FROM thread_messages m WHERE m.thread_id = threads.thread_id AND m.input_id IS NOT NULL)
+"""
+# Message-IDs only referenced by the dropped threads
+DELETE_ORPHAN_PLACEHOLDERS_SQL = f"""
+    DELETE FROM thread_messages WHERE thread_id IN ({BATCH_IDS}) AND input_id IS NULL
+      AND NOT EXISTS (SELECT 1 FROM threads t WHERE t.thread_id = thread_messages.thread_id)
+"""
+# cache entries are keyed by content, not input_id, so they expire by the intent they were classified as
+CACHE_INTENT = "json_extract(classification, '$.classified_intent')"
+EXPIRED_CACHE_INTENT_SQL = f"""
+    DELETE FROM result_cache WHERE cache_key IN (
+        SELECT cache_key FROM result_cache WHERE {CACHE_INTENT} = ? AND created_at < ? LIMIT ?)
+"""
+EXPIRED_CACHE_DEFAULT_SQL = f"""
+    DELETE FROM result_cache WHERE cache_key IN (
+        SELECT cache_key FROM result_cache WHERE created_at < ?
+          AND ({CACHE_INTENT} IS NULL OR {CACHE_INTENT} NOT IN (SELECT value FROM json_each(?))) LIMIT ?)
+"""
+
+ARCHIVED_DOCUMENTS = REGISTRY.counter("flowbit_retention_archived_total", "Documents moved to archive databases")
+RECLAIMED_BYTES = REGISTRY.counter("flowbit_retention_reclaimed_bytes_total", "Bytes returned to the filesystem by retention")
+PAUSE_SECONDS = REGISTRY.histogram("flowbit_retention_pause_seconds", "Time retention held the database write lock, per step",
+                                   ("phase",), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+
+# policy
+def parse_policy(spec: str) -> Dict[str, Optional[float]]:
+    """'RFQ=30,Invoice=365d,*=90' -> {intent: max age in days}; None keeps the intent forever."""
+    policy: Dict[str, Optional[float]] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        intent, sep, age = item.partition("=")
+        if not sep or not intent.strip():
+            raise ValueError(f"Retention rules look like intent=days, got {item!r}")
+        age = age.strip().lower()
+        policy[intent.strip()] = None if age in KEEP else float(age.rstrip("d"))
+    return policy
+
+def cutoffs(policy: Dict[str, Optional[float]], now: datetime) -> Dict[str, str]:
+    """ISO timestamp per rule; rows older than it have expired."""
+    return {intent: (now - timedelta(days=days)).isoformat() for intent, days in policy.items() if days is not None}
+
+def archive_path(archive_dir: str, timestamp: str) -> str:
+    return os.path.join(archive_dir, f"flowbit-{timestamp[:7]}.db")
+
+# archiving
+def _columns(conn: sqlite3.Connection, table: str) -> str:
+    return ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})"))
+
+def expired_batches(conn: sqlite3.Connection, policy: Dict[str, Optional[float]], now: datetime,
+                    batch_rows: int):
+    """Yield (input_id, timestamp) batches, rule by rule; each batch must be archived before the next is read."""
+    limits = cutoffs(policy, now)
+    for intent, cutoff in limits.items():
+        if intent == DEFAULT_RULE:
+            continue
+        while True:
+            rows = conn.execute(EXPIRED_INTENT_SQL, (intent, cutoff, batch_rows)).fetchall()
+            if not rows:
+                break
+            yield rows
+    if DEFAULT_RULE in limits:
+        ruled = json.dumps([intent for intent in policy if intent != DEFAULT_RULE])
+        after = ("", "")
+        while True:
+            rows = conn.execute(EXPIRED_DEFAULT_SQL, (after[0], after[1], limits[DEFAULT_RULE], ruled, batch_rows)).fetchall()
+            if not rows:
+                break
+            after = (rows[-1][1], rows[-1][0])
+            yield rows
+
+def archive_batch(conn: sqlite3.Connection, path: str, input_ids: List[str]) -> Tuple[int, int, float]:
+    """
+    Copy documents into the archive at path, then delete them here.
+
+    The copy only reads flowbit.db; the delete is the one write transaction
+    on it, and its duration is returned with the number of blobs and
+    threads dropped. Copying first makes an interrupted run safe to repeat.
+    """
+    ids = json.dumps(input_ids)
+    hashes = json.dumps([row[0] for row in conn.execute(SELECT_BATCH_HASHES_SQL, (ids, ids))])
+    threads = json.dumps([row[0] for row in conn.execute(ORPHAN_THREADS_SQL, (ids, ids))])
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        conn.execute("BEGIN")
+        try:
+            for table in ARCHIVED_TABLES:
+                columns = _columns(conn, table)
+                conn.execute(f"DELETE FROM archive.{table} WHERE input_id IN ({BATCH_IDS})", (ids,))
+                conn.execute(f"INSERT INTO archive.{table} ({columns}) SELECT {columns} FROM main.{table} "
+                             f"WHERE input_id IN ({BATCH_IDS})", (ids,))
+            conn.execute(COPY_BLOBS_SQL, (hashes,))
+            conn.execute(COPY_THREADS_SQL, (threads,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+
+    started = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for table in reversed(ARCHIVED_TABLES):
+            conn.execute(f"DELETE FROM {table} WHERE input_id IN ({BATCH_IDS})", (ids,))
+        blobs_deleted = conn.execute(DELETE_ORPHAN_BLOBS_SQL, (hashes,)).rowcount
+        threads_deleted = conn.execute(DELETE_ORPHAN_THREADS_SQL, (threads, ids)).rowcount
+        conn.execute(DELETE_ORPHAN_PLACEHOLDERS_SQL, (threads,))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    pause = time.perf_counter() - started
+    PAUSE_SECONDS.observe(pause, phase="archive")
+    return blobs_deleted, threads_deleted, pause
+
+def expire_cache(conn: sqlite3.Connection, policy: Dict[str, Optional[float]], now: datetime, batch_rows: int,
+                 yield_seconds: float, stop: Optional[threading.Event] = None) -> Tuple[int, List[float]]:
+    """Delete result cache entries past their intent's retention age; (entries dropped, pause per batch)."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'result_cache'").fetchone() is None:
+        return 0, []
+    ruled = json.dumps([intent for intent in policy if intent != DEFAULT_RULE])
+    deleted, pauses = 0, []
+    for intent, days in policy.items():
+        if days is None:
+            continue
+        cutoff = (now - timedelta(days=days)).timestamp()
+        sql, params = ((EXPIRED_CACHE_DEFAULT_SQL, (cutoff, ruled, batch_rows)) if intent == DEFAULT_RULE
+                       else (EXPIRED_CACHE_INTENT_SQL, (intent, cutoff, batch_rows)))
+        while not (stop is not None and stop.is_set()):
+            started = time.perf_counter()
+            count = conn.execute(sql, params).rowcount
+            pauses.append(time.perf_counter() - started)
+            PAUSE_SECONDS.observe(pauses[-1], phase="cache")
+            deleted += count
+            if count < batch_rows:
+                break
+            time.sleep(yield_seconds)
+    return deleted, pauses
+
+# vacuum
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """One-off full rewrite for databases created before auto_vacuum was set; blocks writers throughout."""
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+def incremental_vacuum(conn: sqlite3.Connection, step_pages: int, yield_seconds: float) -> Tuple[int, List[float]]:
+    """Return free pages to the filesystem step_pages at a time; (pages freed, pause per step)."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0, []
+    pages, pauses = 0, []
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    while free:
+        started = time.perf_counter()
+        # execute() would step the pragma once, freeing a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({step_pages})")
+        pauses.append(time.perf_counter() - started)
+        PAUSE_SECONDS.observe(pauses[-1], phase="vacuum")
+        remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if remaining >= free:
+            break
+        pages += free - remaining
+        free = remaining
+        time.sleep(yield_seconds)
+    # the file only shrinks once the WAL is checkpointed
+    started = time.perf_counter()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    pauses.append(time.perf_counter() - started)
+    PAUSE_SECONDS.observe(pauses[-1], phase="checkpoint")
+    return pages, pauses
+
+def apply_retention(db_path: str, policy: Dict[str, Optional[float]], archive_dir: str = "archive",
+                    batch_rows: int = 500, vacuum_pages: int = 1000, yield_seconds: float = 0.05,
+                    now: Optional[datetime] = None, stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Archive expired documents and vacuum; returns a report of the run.
+
+    Sleeps yield_seconds between batches so a running pipeline gets the
+    write lock; setting stop ends the run after the current batch.
+    """
+    now = now or datetime.now()
+    size_before = database_size(db_path)
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_schema(conn)
+    ensure_thread_schema(conn)
+    os.makedirs(archive_dir, exist_ok=True)
+    archives: Dict[str, int] = {}
+    pauses: List[float] = []
+    blobs_deleted = threads_deleted = 0
+    try:
+        for rows in expired_batches(conn, policy, now, batch_rows):
+            by_archive: Dict[str, List[str]] = {}
+            for input_id, timestamp in rows:
+                by_archive.setdefault(archive_path(archive_dir, timestamp or now.isoformat()), []).append(input_id)
+            for path, input_ids in by_archive.items():
+                if path not in archives:
+                    archive = sqlite3.connect(path)
+                    ensure_schema(archive)
+                    ensure_thread_schema(archive)
+                    archive.close()
+                    archives[path] = 0
+                deleted, threads, pause = archive_batch(conn, path, input_ids)
+                blobs_deleted += deleted
+                threads_deleted += threads
+                pauses.append(pause)
+                archives[path] += len(input_ids)
+                ARCHIVED_DOCUMENTS.inc(len(input_ids))
+            if stop is not None and stop.is_set():
+                break
+            time.sleep(yield_seconds)
+        cache_deleted, cache_pauses = expire_cache(conn, policy, now, batch_rows, yield_seconds, stop)
+        vacuum_pages_freed, vacuum_pauses = incremental_vacuum(conn, vacuum_pages, yield_seconds)
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        free_bytes = conn.execute("PRAGMA freelist_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+    size_after = database_size(db_path)
+    RECLAIMED_BYTES.inc(max(size_before - size_after, 0))
+    all_pauses = pauses + cache_pauses + vacuum_pauses
+    return {
+        "archived": sum(archives.values()), "archives": archives, "blobs_deleted": blobs_deleted,
+        "threads_deleted": threads_deleted, "cache_deleted": cache_deleted,
+        "batches": len(pauses), "vacuum_pages": vacuum_pages_freed, "incremental_vacuum": auto_vacuum,
+        "free_bytes": free_bytes, "size_before": size_before, "size_after": size_after,
+        "reclaimed_bytes": size_before - size_after,
+        "max_pause_ms": round(max(all_pauses, default=0) * 1000, 2),
+        "total_pause_ms": round(sum(all_pauses) * 1000, 2),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+# scheduling
+class RetentionScheduler:
+    """Runs apply_retention on a daemon thread at start-up and every interval_seconds after."""
+
+    def __init__(self, db_path: str, policy: Dict[str, Optional[float]], archive_dir: str = "archive",
+                 interval_seconds: float = 3600, **options: Any):
+        self.db_path = db_path
+        self.policy = policy
+        self.archive_dir = archive_dir
+        self.interval_seconds = interval_seconds
+        self.options = options
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="flowbit-retention", daemon=True)
+
+    def start(self) -> "RetentionScheduler":
+        self._thread.start()
+        return self
+
+    def run_once(self) -> Dict[str, Any]:
+        self.last_report = apply_retention(self.db_path, self.policy, self.archive_dir, stop=self._stop, **self.options)
+        logger.info("Retention archived %d documents, reclaimed %d bytes, longest pause %.1f ms",
+                    self.last_report["archived"], self.last_report["reclaimed_bytes"], self.last_report["max_pause_ms"])
+        return self.last_report
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Retention run failed; retrying in %.0fs", self.interval_seconds)
+            self._stop.wait(self.interval_seconds)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+
+def start_retention_from_env(db_path: str = "flowbit.db") -> Optional[RetentionScheduler]:
+    """Start the scheduler when FLOWBIT_RETENTION holds a policy; long-running processes opt in this way."""
+    spec = os.getenv("FLOWBIT_RETENTION")
+    if not spec:
+        return None
+    return RetentionScheduler(db_path, parse_policy(spec), os.getenv("FLOWBIT_ARCHIVE_DIR", "archive"),
+                              float(os.getenv("FLOWBIT_RETENTION_INTERVAL", 3600))).start()
+
+@app.command()
+def run(db_path: str = typer.Argument("flowbit.db"),
+        policy: str = typer.Option(None, help="intent=days rules, '*' for the rest; defaults to FLOWBIT_RETENTION"),
+        archive_dir: str = typer.Option("archive", help="Directory for the monthly archive databases"),
+        batch_rows: int = typer.Option(500, help="Documents moved per transaction"),
+        vacuum_pages: int = typer.Option(1000, help="Pages returned to the filesystem per vacuum step"),
+        enable_vacuum: bool = typer.Option(False, help="Switch an older database to incremental vacuum (rewrites the file once)")):
+    """Move documents past their retention age into archive databases and reclaim the space"""
+    spec = policy or os.getenv("FLOWBIT_RETENTION")
+    if not spec:
+        raise typer.BadParameter("Give a policy with --policy or FLOWBIT_RETENTION, e.g. 'RFQ=30,*=90'")
+    try:
+        rules = parse_policy(spec)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    if enable_vacuum:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        enable_incremental_vacuum(conn)
+        conn.close()
+    report = apply_retention(db_path, rules, archive_dir, batch_rows, vacuum_pages)
+    for path, count in report["archives"].items():
+        typer.echo(f"{path}: {count} documents")
+    typer.echo(f"Archived {report['archived']} documents in {report['batches']} batches, dropped {report['blobs_deleted']} blobs, "
+               f"{report['threads_deleted']} threads and {report['cache_deleted']} cache entries")
+    typer.echo(f"{report['size_before'] / 1e6:.1f} MB -> {report['size_after'] / 1e6:.1f} MB in {report['seconds']:.2f}s; "
+               f"write lock held {report['total_pause_ms']:.1f} ms in total, {report['max_pause_ms']:.1f} ms at most")
+    if not report["incremental_vacuum"] and report["free_bytes"]:
+        typer.echo(f"{report['free_bytes'] / 1e6:.1f} MB free inside the file; run once with --enable-vacuum to return it")
+
+if __name__ == "__main__":
+    app()
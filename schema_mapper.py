@@ -0,0 +1,253 @@
+# imports
+from typing import Dict, Any, List, Optional, Tuple, Union
+from datetime import datetime, date
+import hashlib
+import json
+import re
+
+MISSING = object()
+
+DATE_FORMATS = ('%Y/%m/%d', '%d.%m.%Y', '%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%d %b %Y')
+DESCRIPTION_KEYS = ('description', 'name', 'product', 'title', 'item', 'sku')
+QUANTITY_KEYS = ('quantity', 'qty', 'count')
+
+# source path resolution
+def _split_path(path: str) -> Tuple[str, ...]:
+    return () if path == '$' else tuple(path.split('.'))
+
+def resolve_keys(data: Any, keys: Tuple[str, ...]) -> Any:
+    """Follow pre-split path keys through dicts and lists; MISSING if absent."""
+    current = data
+    for key in keys:
+        if isinstance(current, dict) and key in current:
+            current = current[key]
+        elif isinstance(current, list) and key.isdigit() and int(key) < len(current):
+            current = current[int(key)]
+        else:
+            return MISSING
+    return current
+
+def resolve_path(data: Any, path: str) -> Any:
+    """Resolve a dotted source path ("customer.name", "$" for the root)."""
+    return resolve_keys(data, _split_path(path))
+
+# type coercion
+class CoercionError(ValueError):
+    pass
+
+def _describe_item(item: Any) -> str:
+    if not isinstance(item, dict):
+        return str(item)
+    label = next((str(item[k]) for k in DESCRIPTION_KEYS if item.get(k) not in (None, "")), None)
+    quantity = next((item[k] for k in QUANTITY_KEYS if item.get(k) not in (None, "")), None)
+    if label is None:
+        return json.dumps(item, separators=(',', ':'))
+    return f"{label} x{quantity}" if quantity is not None else label
+
+def _to_number(value: Any):
+    if isinstance(value, bool):
+        raise CoercionError("boolean is not a number")
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        cleaned = re.sub(r'[\s,$€£¥]|[A-Z]{3}$|^[A-Z]{3}', '', value.strip())
+        try:
+            number = float(cleaned)
+        except ValueError:
+            raise CoercionError(f"'{value}' is not a number")
+        return int(number) if number.is_integer() and '.' not in cleaned else number
+    raise CoercionError(f"{type(value).__name__} is not a number")
+
+def _to_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value)
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            pass
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+    raise CoercionError(f"'{value}' is not a recognised date")
+
+def _coerce_string(value: Any, field: "CompiledField") -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "; ".join(_describe_item(item) for item in value)
+    if isinstance(value, dict):
+        return _describe_item(value)
+    return str(value)
+
+def _coerce_number(value: Any, field: "CompiledField"):
+    return _to_number(value)
+
+def _coerce_date(value: Any, field: "CompiledField") -> str:
+    return _to_datetime(value).date().isoformat()
+
+def _coerce_datetime(value: Any, field: "CompiledField") -> str:
+    return _to_datetime(value).isoformat()
+
+def _coerce_array(value: Any, field: "CompiledField") -> List[Any]:
+    if not isinstance(value, list):
+        value = [value]
+    if field.item_fields is not None:
+        return [_map_fields(item, field.item_fields)[0] if isinstance(item, dict) else item for item in value]
+    if field.item_field is not None:
+        return [field.item_field.coerce(item, field.item_field) for item in value]
+    return value
+
+def _coerce_object(value: Any, field: "CompiledField") -> Dict[str, Any]:
+    if not isinstance(value, dict):
+        raise CoercionError(f"{type(value).__name__} is not an object")
+    return value
+
+def _coerce_boolean(value: Any, field: "CompiledField") -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ('true', 'false', 'yes', 'no'):
+        return value.lower() in ('true', 'yes')
+    raise CoercionError(f"'{value}' is not a boolean")
+
+def _coerce_passthrough(value: Any, field: "CompiledField") -> Any:
+    return value
+
+COERCERS = {
+    'string': _coerce_string,
+    'number': _coerce_number,
+    'date': _coerce_date,
+    'datetime': _coerce_datetime,
+    'array': _coerce_array,
+    'object': _coerce_object,
+    'boolean': _coerce_boolean,
+}
+
+def coerce_value(value: Any, field: Dict[str, Any]) -> Any:
+    """Coerce a source value to the field's declared type."""
+    compiled = CompiledField(field)
+    return compiled.coerce(value, compiled)
+
+# schema compilation
+class CompiledField:
+    """A schema field with pre-split source paths and a bound type coercer."""
+
+    __slots__ = ('name', 'type', 'required', 'has_default', 'default', 'paths', 'coerce', 'item_fields', 'item_field')
+
+    def __init__(self, field: Dict[str, Any]):
+        self.name = field.get('flowbit_name')
+        self.type = field.get('type', 'string')
+        self.required = bool(field.get('required'))
+        self.has_default = 'default' in field
+        self.default = field.get('default')
+        self.paths = [(path, _split_path(path)) for path in field.get('source_path', [])]
+        self.coerce = COERCERS.get(self.type, _coerce_passthrough)
+        item_schema = field.get('array_item_schema') or {}
+        self.item_fields = [CompiledField(f) for f in item_schema['fields']] if 'fields' in item_schema else None
+        self.item_field = CompiledField(item_schema) if 'type' in item_schema else None
+
+class CompiledSchema:
+    """A schema definition prepared for repeated local mapping and prompting."""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.name = schema.get('schema_name')
+        self.fields = [CompiledField(field) for field in schema.get('fields', [])]
+        self.field_names = {field.name for field in self.fields}
+        self.required_fields = [field.name for field in self.fields if field.required]
+        # Serialized once instead of for every JSON agent call
+        self.prompt_text = json.dumps(schema, indent=2)
+        # One-line field list for prompts that cover every schema at once
+        self.summary_text = f"{self.name}: " + ", ".join(
+            f"{field.name} ({field.type}{', required' if field.required else ''}; from {' | '.join(p for p, _ in field.paths) or 'generated'})"
+            for field in self.fields
+        )
+
+def compile_schema(schema: Dict[str, Any]) -> CompiledSchema:
+    return CompiledSchema(schema)
+
+# mapping
+def _map_fields(data: Dict[str, Any], fields: List[CompiledField]) -> Tuple[Dict[str, Any], List[str], List[Dict[str, Any]], set]:
+    formatted: Dict[str, Any] = {}
+    missing: List[str] = []
+    mismatches: List[Dict[str, Any]] = []
+    used_keys = set()
+
+    for field in fields:
+        for path, keys in field.paths:
+            value = resolve_keys(data, keys)
+            if value is not MISSING and value is not None and value != "":
+                break
+        else:
+            path, value = None, MISSING
+        if value is not MISSING:
+            used_keys.add(keys[0] if keys else '$')
+            try:
+                formatted[field.name] = field.coerce(value, field)
+                continue
+            except CoercionError as e:
+                mismatches.append({"field": field.name, "source_path": path, "expected": field.type, "error": str(e)})
+        if field.has_default:
+            formatted[field.name] = field.default
+        elif field.required:
+            missing.append(field.name)
+
+    return formatted, missing, mismatches, used_keys
+
+def _apply_special_handling(formatted: Dict[str, Any], schema: CompiledSchema, data: Any, raw_text: str) -> None:
+    """Fill generated fields the LLM prompt would otherwise compute."""
+    names = schema.field_names
+    if 'rawDataHash' in names:
+        formatted['rawDataHash'] = hashlib.sha256(raw_text.encode('utf-8')).hexdigest()
+    if 'rawDataPreview' in names:
+        formatted['rawDataPreview'] = raw_text[:500]
+    if 'summary' in names and 'summary' not in formatted and isinstance(data, dict):
+        preview = ", ".join(f"{k}: {v}" for k, v in list(data.items())[:3] if not isinstance(v, (dict, list)))
+        if preview:
+            formatted['summary'] = preview
+    if 'receivedTimestamp' in names and 'receivedTimestamp' not in formatted:
+        formatted['receivedTimestamp'] = datetime.now().isoformat()
+
+def map_to_schema(data: Any, schema: Union[Dict[str, Any], CompiledSchema], raw_text: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Map a parsed JSON payload onto a FlowBit schema without calling the LLM.
+
+    Args:
+        data: Parsed JSON payload
+        schema: Schema definition from data/json_schema.json, or its compiled form
+        raw_text: Original JSON text, used for hash/preview fields
+
+    Returns:
+        Dict with flowbit_formatted_data and processing_report, matching the JSON agent output
+    """
+    if not isinstance(schema, CompiledSchema):
+        schema = compile_schema(schema)
+    if raw_text is None:
+        raw_text = json.dumps(data)
+    fields = schema.fields
+    if isinstance(data, dict):
+        formatted, missing, mismatches, used_keys = _map_fields(data, fields)
+        unmapped = [] if '$' in used_keys else [key for key in data if key not in used_keys]
+    else:
+        formatted, missing, mismatches, used_keys = _map_fields({}, fields)
+        unmapped = []
+    _apply_special_handling(formatted, schema, data, raw_text)
+    missing = [name for name in missing if name not in formatted]
+
+    return {
+        "flowbit_formatted_data": formatted,
+        "processing_report": {
+            "schema_used": schema.name,
+            "status": "error" if missing else "success",
+            "missing_required_fields": missing,
+            "type_mismatches": mismatches,
+            "unmapped_source_fields": unmapped
+        }
+    }
@@ -0,0 +1,99 @@
+# imports
+from schema_mapper import CompiledSchema, compile_schema
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+INTENT_TO_SCHEMA = {
+    "Invoice": "FlowBitInvoiceV1",
+    "RFQ": "FlowBitRFQ_V1",
+    "Complaint": "FlowBitComplaint_V1",
+    "Regulation": "FlowBitRegulation_V1",
+    "General_Inquiry": "FlowBitGeneralInquiry_V1",
+    "Order_Confirmation": "FlowBitOrderConfirmation_V1",
+    "Support_Request": "FlowBitSupportRequest_V1",
+    "Other": "FlowBitGenericData_V1"
+}
+DEFAULT_SCHEMA = "FlowBitGenericData_V1"
+
+def default_schema_path() -> str:
+    """Locate json_schema.json, falling back to the test data directory."""
+    schema_path = os.path.join(os.path.dirname(__file__), "data", "json_schema.json")
+    if not os.path.exists(schema_path):
+        schema_path = os.path.join(os.path.dirname(__file__), "tests", "data", "json_schema.json")
+    return schema_path
+
+class SchemaRegistry:
+    """
+    Loads json_schema.json once, indexes schemas by name and intent and keeps
+    a compiled form of each. The file is re-read when its mtime changes,
+    checked at most every check_interval seconds.
+    """
+
+    def __init__(self, schema_path: Optional[str] = None, check_interval: float = 1.0):
+        self.schema_path = schema_path or default_schema_path()
+        self.check_interval = check_interval
+        self.version = ""
+        self._by_name: Dict[str, CompiledSchema] = {}
+        self._fallback: Optional[CompiledSchema] = None
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        with open(self.schema_path, 'rb') as f:
+            raw = f.read()
+        schemas = json.loads(raw)
+        compiled = [compile_schema(schema) for schema in schemas]
+        with self._lock:
+            self._by_name = {schema.name: schema for schema in compiled}
+            # Unknown names fall back to the last schema, as before
+            self._fallback = self._by_name.get(DEFAULT_SCHEMA, compiled[-1])
+            self.version = hashlib.sha256(raw).hexdigest()[:16]
+            self._mtime = os.stat(self.schema_path).st_mtime_ns
+            self._last_check = time.monotonic()
+        logger.info(f"Loaded {len(compiled)} schemas from {self.schema_path} (version {self.version})")
+
+    def _check_for_changes(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.stat(self.schema_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            try:
+                self.reload()
+            except (OSError, ValueError) as e:
+                # Keep serving the previous schemas if the new file is broken
+                logger.error(f"Failed to reload schemas: {str(e)}")
+                self._mtime = mtime
+
+    def get_by_name(self, schema_name: str) -> CompiledSchema:
+        self._check_for_changes()
+        return self._by_name.get(schema_name, self._fallback)
+
+    def get_for_intent(self, intent: str) -> CompiledSchema:
+        return self.get_by_name(INTENT_TO_SCHEMA.get(intent, DEFAULT_SCHEMA))
+
+    def get_version(self) -> str:
+        self._check_for_changes()
+        return self.version
+
+_registry: Optional[SchemaRegistry] = None
+
+def get_schema_registry() -> SchemaRegistry:
+    """Return the process-wide schema registry, loading it on first use."""
+    global _registry
+    if _registry is None:
+        _registry = SchemaRegistry()
+    return _registry
@@ -8,6 +8,7 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '.env.test'))
 # Test environment setup with default values
 test_env = {
     'GOOGLE_API_KEY': os.getenv('GOOGLE_API_KEY', 'test_api_key'),
+    'FLOWBIT_LLM_BACKEND': os.getenv('FLOWBIT_LLM_BACKEND', 'fake'),
     'MODEL_NAME': os.getenv('MODEL_NAME', 'gemini-pro'),
     'TEST_MODE': os.getenv('TEST_MODE', 'True'),
     'LOG_LEVEL': os.getenv('LOG_LEVEL', 'DEBUG'),
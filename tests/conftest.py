@@ -78,4 +78,24 @@ def sample_json_data() -> Dict[str, Any]:
             {"product": "Widget A", "quantity": 5, "price": 100},
             {"product": "Widget B", "quantity": 2, "price": 200}
         ]
-    }
\ No newline at end of file
+    }
+
+@pytest.fixture
+def slow_chat_model():
+    """Chat model that blocks for a fixed delay before answering, like a real network call"""
+    import time
+    from langchain_core.language_models.chat_models import SimpleChatModel
+
+    class SlowChatModel(SimpleChatModel):
+        delay: float = 0.3
+        response: str = '{"classified_format": "Email_Text", "classified_intent": "RFQ", "reasoning": "Test reasoning"}'
+
+        @property
+        def _llm_type(self) -> str:
+            return "slow-fake"
+
+        def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+            time.sleep(self.delay)
+            return self.response
+
+    return SlowChatModel()
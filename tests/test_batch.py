@@ -0,0 +1,67 @@
+import pytest
+import asyncio
+import io
+import json
+from batch import collect_documents, run_batch, percentile
+
+@pytest.fixture
+def batch_dir(tmp_path):
+    (tmp_path / "a.txt").write_text("Subject: Hello\n\nFirst email")
+    (tmp_path / "b.json").write_text('{"invoice_id": "INV-1"}')
+    (tmp_path / "notes.md").write_text("ignored")
+    return tmp_path
+
+def test_collect_documents_from_directory(batch_dir):
+    documents = list(collect_documents(str(batch_dir)))
+    assert [d["input_type"] for d in documents] == ["txt", "json"]
+
+def test_collect_documents_from_glob(batch_dir):
+    documents = list(collect_documents(str(batch_dir / "*.json")))
+    assert len(documents) == 1
+    assert documents[0]["path"].endswith("b.json")
+
+def test_collect_documents_from_manifest(batch_dir):
+    manifest = batch_dir / "manifest.jsonl"
+    manifest.write_text(
+        json.dumps({"id": "doc-1", "path": "a.txt"}) + "\n\n"
+        + json.dumps({"text": "inline text", "input_type": "email"}) + "\n"
+    )
+    documents = list(collect_documents(str(manifest)))
+    assert documents[0]["source"] == "doc-1"
+    assert documents[0]["path"] == str(batch_dir / "a.txt")
+    assert documents[1]["text"] == "inline text"
+    assert documents[1]["input_type"] == "email"
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([], 95) == 0.0
+
+@pytest.mark.asyncio
+async def test_run_batch_bounds_concurrency_and_streams_results(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("".join(json.dumps({"text": f"doc {i}"}) + "\n" for i in range(20)))
+    in_flight = 0
+    peak = 0
+
+    async def fake_process(text, input_type=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if text == "doc 3":
+            return {"status": "error", "error": "boom"}
+        return {"status": "success", "result": text}
+
+    output = io.StringIO()
+    summary = await run_batch([str(manifest)], concurrency=4, output=output, process=fake_process)
+
+    assert peak == 4
+    assert summary["documents"] == 20
+    assert summary["failed"] == 1
+    assert summary["docs_per_sec"] > 0
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(records) == 20
+    assert all("latency_seconds" in r for r in records)
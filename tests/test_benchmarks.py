@@ -0,0 +1,27 @@
+import pytest
+import copy
+from benchmarks.bench_pipeline import benchmark, compare_to_baseline
+
+@pytest.mark.asyncio
+async def test_pipeline_benchmark_smoke(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report = await benchmark(per_kind=1, latency="fixed:0", concurrency=2, pdf_pages=2)
+    assert report["documents"] == 11
+    assert report["failed"] == 0
+    assert set(report["kinds"]) == {"email", "html_email", "json", "pdf"}
+    assert {"load", "classify", "total"} <= set(report["stages"])
+    assert report["db"]["writes"] == 3 * report["documents"]
+    assert compare_to_baseline(report, report) == []
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {
+        "docs_per_sec": 100.0, "p95_latency_seconds": 0.5,
+        "memory": {"python_peak_mb": 10.0}, "db": {"writes_per_sec": 300.0},
+        "stages": {"llm_call": {"p95_seconds": 0.2}, "load": {"p95_seconds": 0.001}},
+    }
+    report = copy.deepcopy(baseline)
+    report["docs_per_sec"] = 70.0
+    report["stages"]["llm_call"]["p95_seconds"] = 0.21
+    report["stages"]["load"]["p95_seconds"] = 0.004
+    regressions = compare_to_baseline(report, baseline, tolerance=0.25)
+    assert [r["metric"] for r in regressions] == ["docs_per_sec"]
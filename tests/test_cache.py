@@ -0,0 +1,69 @@
+import pytest
+import time
+import main
+from cache import ResultCache, make_cache_key, normalize_text
+
+@pytest.fixture
+def result_cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache.db"), ttl_seconds=60, max_entries=3)
+
+def test_normalize_text_collapses_whitespace_and_json_formatting():
+    assert normalize_text("Hello   there\r\nWorld  \n\n\n\nBye") == "Hello there\nWorld\n\nBye"
+    assert normalize_text('{"b": 1,\n "a": 2}') == normalize_text('{"a":2,"b":1}')
+
+def test_cache_key_depends_on_versions():
+    key = make_cache_key("text", "p1", "s1")
+    assert key == make_cache_key("  text  ", "p1", "s1")
+    assert key != make_cache_key("text", "p2", "s1")
+    assert key != make_cache_key("text", "p1", "s2")
+
+def test_cache_hit_and_miss(result_cache):
+    assert result_cache.get("k") is None
+    result_cache.put("k", {"classified_intent": "RFQ"}, {"summary": "x"})
+    assert result_cache.get("k") == {"classification": {"classified_intent": "RFQ"}, "result": {"summary": "x"}}
+    stats = result_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_cache_ttl_expiry(result_cache):
+    result_cache.put("k", {}, {})
+    result_cache.conn.execute("UPDATE result_cache SET created_at = ?", (time.time() - 120,))
+    assert result_cache.get("k") is None
+    assert result_cache.stats()["expirations"] == 1
+
+def test_cache_evicts_least_recently_used(result_cache):
+    for key in ("a", "b", "c"):
+        result_cache.put(key, {}, {})
+        time.sleep(0.01)
+    result_cache.get("a")
+    result_cache.put("d", {}, {})
+    assert result_cache.get("b") is None
+    assert result_cache.get("a") is not None
+    assert result_cache.stats()["evictions"] == 1
+
+@pytest.mark.asyncio
+async def test_process_input_serves_duplicates_from_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "_result_cache", ResultCache(str(tmp_path / "flowbit.db")))
+    calls = 0
+
+    async def fake_classify(input_data, input_type=None):
+        nonlocal calls
+        calls += 1
+        return {"classified_format": "Email_Text", "classified_intent": "RFQ", "reasoning": "test"}
+
+    async def fake_email(input_data, intent, thread_context=None):
+        return {"primary_request_summary": "quote"}
+
+    monkeypatch.setattr(main, "classify_input", fake_classify)
+    monkeypatch.setattr(main, "process_email_input", fake_email)
+
+    first = await main.process_input("Subject: Quote\n\nPlease quote 5 units")
+    second = await main.process_input("Subject: Quote\r\n\r\nPlease  quote 5 units  ")
+
+    assert calls == 1
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["result"] == first["result"]
+    assert second["input_id"] != first["input_id"]
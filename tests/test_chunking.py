@@ -0,0 +1,74 @@
+import pytest
+import json
+import main
+from chunking import (estimate_tokens, representative_sample, split_text, split_json,
+                      merge_email_results, merge_json_results)
+
+def test_representative_sample_keeps_head_and_tail():
+    text = "HEAD " + "x" * 10000 + " TAIL"
+    sample = representative_sample(text, 100)
+    assert len(sample) <= 400
+    assert sample.startswith("HEAD")
+    assert sample.endswith("TAIL")
+    assert representative_sample("short", 100) == "short"
+
+def test_split_text_respects_budget_and_paragraphs():
+    paragraphs = [f"Paragraph {n} " + "word " * 50 for n in range(20)]
+    text = "\n\n".join(paragraphs)
+    chunks = split_text(text, 200)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert "".join(chunks) == text
+
+def test_split_json_by_top_level_keys():
+    payload = {f"key_{n}": "v" * 300 for n in range(10)}
+    chunks = split_json(payload, 200)
+    assert len(chunks) > 1
+    merged = {}
+    for chunk in chunks:
+        merged.update(json.loads(chunk))
+    assert merged == payload
+
+def test_merge_email_results():
+    merged = merge_email_results([
+        {"extracted_sender_name": "Sarah", "primary_request_summary": "Quote for X100.", "urgency_level": "Low",
+         "sentiment": "Neutral", "key_entities_mentioned": ["X100"], "action_items_implied": ["price"]},
+        {"extracted_sender_name": "", "primary_request_summary": "Delivery by Friday.", "urgency_level": "Specific_Date_Requested",
+         "urgency_reason_or_deadline": "Friday", "sentiment": "Neutral", "key_entities_mentioned": ["X100", "Z300"]},
+        {"error": "Failed to parse JSON response"},
+    ])
+    assert merged["extracted_sender_name"] == "Sarah"
+    assert merged["urgency_level"] == "Specific_Date_Requested"
+    assert merged["urgency_reason_or_deadline"] == "Friday"
+    assert merged["key_entities_mentioned"] == ["X100", "Z300"]
+    assert merged["primary_request_summary"] == "Quote for X100. Delivery by Friday."
+    assert merged["chunks_merged"] == 2
+
+def test_merge_json_results_recomputes_missing_fields():
+    merged = merge_json_results([
+        {"flowbit_formatted_data": {"invoiceId": "INV-1"}, "processing_report": {"unmapped_source_fields": ["a"]}},
+        {"flowbit_formatted_data": {"totalAmount": 5}, "processing_report": {"unmapped_source_fields": ["b"]}},
+    ], ["invoiceId", "totalAmount", "dueDate"], "FlowBitInvoiceV1")
+    report = merged["processing_report"]
+    assert merged["flowbit_formatted_data"] == {"invoiceId": "INV-1", "totalAmount": 5}
+    assert report["missing_required_fields"] == ["dueDate"]
+    assert report["unmapped_source_fields"] == ["a", "b"]
+
+@pytest.mark.asyncio
+async def test_long_email_is_extracted_per_chunk(monkeypatch):
+    seen = []
+
+    async def fake_invoke(chain, payload):
+        seen.append(payload)
+        class Response:
+            content = json.dumps({"primary_request_summary": f"part {len(seen)}", "messages_seen": len(payload["messages"])})
+        return Response()
+
+    monkeypatch.setattr(main, "invoke_chain", fake_invoke)
+    monkeypatch.setitem(main.CHAIN_TOKEN_BUDGETS, "email_agent", 100)
+    text = "\n\n".join("Paragraph " + "word " * 60 for _ in range(6))
+    result = await main.process_email_input(text, "RFQ")
+
+    assert len(seen) > 1
+    assert all(payload["messages"] == [] for payload in seen)
+    assert result["chunks_merged"] == len(seen)
@@ -0,0 +1,33 @@
+import pytest
+import asyncio
+import time
+import main
+from chains import classifier_agent_prompt, JSON_agent_prompt, Email_parser_agent_prompt
+
+@pytest.mark.asyncio
+async def test_concurrent_classifications_overlap(monkeypatch, slow_chat_model):
+    """Concurrent documents should share the LLM latency instead of queueing behind it."""
+    monkeypatch.setattr(main, "classifier_agent_chain", classifier_agent_prompt | slow_chat_model)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(main.classify_input(f"document {i}") for i in range(5)))
+    elapsed = time.perf_counter() - started
+
+    assert all(r["classified_intent"] == "RFQ" for r in results)
+    # Sequential execution would take 5 * delay
+    assert elapsed < 2 * slow_chat_model.delay
+
+@pytest.mark.asyncio
+async def test_concurrent_extractions_overlap(monkeypatch, slow_chat_model):
+    slow_chat_model.response = '{"flowbit_formatted_data": {}, "processing_report": {}}'
+    monkeypatch.setattr(main, "JSON_agent_chain", JSON_agent_prompt | slow_chat_model)
+    monkeypatch.setattr(main, "email_parser_agent_chain", Email_parser_agent_prompt | slow_chat_model)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(main.process_json_input('{"id": 1}', "Invoice") for _ in range(2)),
+        *(main.process_email_input("Subject: Hi\n\nHello", "RFQ") for _ in range(2)),
+    )
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 2 * slow_chat_model.delay
@@ -0,0 +1,53 @@
+import gzip
+import glob
+import json
+import pytest
+from memory import SharedMemory
+from export import export
+
+def _store(db_path: str, ids):
+    store = SharedMemory(db_path)
+    for input_id in ids:
+        store.store_input(input_id, f"Subject: order {input_id}\n\n\"quoted\" text", "email", {"source": input_id})
+        store.store_classification(input_id, {"classified_format": "Email_Text", "classified_intent": "RFQ", "reasoning": "r"})
+        store.store_result(input_id, {"primary_request_summary": f"order {input_id}"})
+    store.close()
+
+def _exported(output_dir: str):
+    rows = []
+    for path in sorted(glob.glob(f"{output_dir}/*.jsonl.gz")):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            rows.extend(json.loads(line) for line in f)
+    return rows
+
+def test_jsonl_export_is_incremental(tmp_path):
+    db_path, output_dir = str(tmp_path / "flowbit.db"), str(tmp_path / "out")
+    _store(db_path, [f"a{i}" for i in range(5)])
+    summary = export(db_path, output_dir, chunk_rows=2, workers=2, settle_seconds=0)
+    assert summary["rows"] == 5 and len(summary["files"]) == 3
+
+    rows = _exported(output_dir)
+    assert [row["input_id"] for row in rows] == [f"a{i}" for i in range(5)]
+    assert rows[0]["input_text"].endswith('"quoted" text')
+    assert rows[0]["metadata"] == {"source": "a0"} and rows[0]["result"] == {"primary_request_summary": "order a0"}
+    assert rows[0]["classified_intent"] == "RFQ"
+
+    _store(db_path, ["b0", "b1"])
+    # rows younger than the settle window wait for the next run
+    assert export(db_path, output_dir, settle_seconds=3600)["rows"] == 0
+    assert export(db_path, output_dir, settle_seconds=0)["rows"] == 2
+    assert [row["input_id"] for row in _exported(output_dir)][-2:] == ["b0", "b1"]
+    assert export(db_path, output_dir, settle_seconds=0)["rows"] == 0
+
+def test_columnar_export(tmp_path):
+    db_path = str(tmp_path / "flowbit.db")
+    _store(db_path, ["a0", "a1"])
+    try:
+        import pyarrow.parquet as pq
+    except ModuleNotFoundError:
+        with pytest.raises(RuntimeError, match="pyarrow"):
+            export(db_path, str(tmp_path / "out"), format="parquet", settle_seconds=0)
+        return
+    summary = export(db_path, str(tmp_path / "out"), format="parquet", settle_seconds=0)
+    table = pq.read_table(summary["files"][0])
+    assert table.column("input_id").to_pylist() == ["a0", "a1"]
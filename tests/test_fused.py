@@ -0,0 +1,74 @@
+import pytest
+import json
+import main
+
+EMAIL_EXTRACTION = {
+    "extracted_sender_name": "Sarah", "primary_request_summary": "Quote", "key_entities_mentioned": [],
+    "urgency_level": "Low", "urgency_reason_or_deadline": "", "sentiment": "Neutral",
+    "action_items_implied": [], "contact_information_in_body": []
+}
+
+def _response(payload):
+    class Response:
+        content = json.dumps(payload)
+    return Response()
+
+def test_validate_fused_email_response():
+    response = {"classified_format": "Email_Text", "classified_intent": "RFQ", "reasoning": "r", "extraction": EMAIL_EXTRACTION}
+    classification, result = main.validate_fused_response(response)
+    assert classification["classified_intent"] == "RFQ"
+    assert result == EMAIL_EXTRACTION
+
+def test_validate_fused_json_response_recomputes_report():
+    response = {
+        "classified_format": "JSON", "classified_intent": "Invoice", "reasoning": "r",
+        "extraction": {"flowbit_formatted_data": {"invoiceId": "INV-1"}, "processing_report": {"status": "success"}}
+    }
+    _, result = main.validate_fused_response(response)
+    report = result["processing_report"]
+    assert report["schema_used"] == "FlowBitInvoiceV1"
+    assert report["status"] == "error"
+    assert "totalAmount" in report["missing_required_fields"]
+
+@pytest.mark.parametrize("response", [
+    {"error": "Failed to parse JSON response"},
+    {"classified_format": "Email_Text", "classified_intent": "Gossip", "extraction": EMAIL_EXTRACTION},
+    {"classified_format": "Email_Text", "classified_intent": "RFQ", "extraction": {"sentiment": "Neutral"}},
+    {"classified_format": "JSON", "classified_intent": "Invoice", "extraction": {"flowbit_formatted_data": []}},
+])
+def test_validate_fused_rejects_bad_responses(response):
+    assert main.validate_fused_response(response) is None
+
+@pytest.fixture
+def isolated_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+@pytest.mark.asyncio
+async def test_fused_mode_uses_one_call(monkeypatch, isolated_store):
+    calls = []
+
+    async def fake_invoke(chain, payload):
+        calls.append(chain)
+        return _response({"classified_format": "Email_Text", "classified_intent": "Other", "reasoning": "r", "extraction": EMAIL_EXTRACTION})
+
+    monkeypatch.setattr(main, "invoke_chain", fake_invoke)
+    result = await main.process_input("Hey, are we still on for lunch?", use_cache=False, mode="fused")
+    assert result["status"] == "success"
+    assert calls == [main.fused_agent_chain]
+
+@pytest.mark.asyncio
+async def test_fused_mode_falls_back_to_two_stage(monkeypatch, isolated_store):
+    calls = []
+
+    async def fake_invoke(chain, payload):
+        calls.append(chain)
+        if chain is main.fused_agent_chain:
+            return _response({"classified_format": "Email_Text"})
+        if chain is main.classifier_agent_chain:
+            return _response({"classified_format": "Email_Text", "classified_intent": "Other", "reasoning": "r"})
+        return _response(EMAIL_EXTRACTION)
+
+    monkeypatch.setattr(main, "invoke_chain", fake_invoke)
+    result = await main.process_input("Hey, are we still on for lunch?", use_cache=False, mode="fused")
+    assert result["status"] == "success"
+    assert calls == [main.fused_agent_chain, main.classifier_agent_chain, main.email_parser_agent_chain]
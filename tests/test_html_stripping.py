@@ -38,4 +38,30 @@ def test_extract_email_parts():
     assert parts["subject"] == "Test Email"
     assert parts["from"] == "sender@example.com"
     assert parts["to"] == "recipient@example.com"
-    assert "Hello," in parts["body"]
\ No newline at end of file
+    assert "Hello," in parts["body"]
+
+EDGE_CASES = [
+    '<p>a<script>var x = "<p>";</script> b &amp; c</p><style>.x{}</style>',
+    '<p>a<p>b',
+    '<div>  one  </div>\r\n<div>two<br/>three</div>',
+    '<!-- note --><p>hi</p><![CDATA[x]]>',
+    '<!DOCTYPE html><html><head><title>T</title></head><body><div class="a>b">x</div></body></html>',
+    '<p>caf&eacute; &#8364;5</p><DIV>A<br />B</DIV>',
+    'Hello <b>bold</b> &lt;tag&gt;',
+]
+
+@pytest.mark.parametrize("html", EDGE_CASES)
+def test_streaming_and_large_input_paths_match_soup(html, monkeypatch):
+    """Both converters keep the original BeautifulSoup output."""
+    from benchmarks.bench_html import legacy_strip_html
+    from utils import email_utils
+    expected = legacy_strip_html(html)
+    assert strip_html(html) == expected
+    monkeypatch.setattr(email_utils, "HTML_PARSER_MAX_CHARS", 0)
+    assert strip_html(html) == expected
+
+def test_strip_html_large_marketing_email():
+    from benchmarks.bench_html import legacy_strip_html, make_marketing_email
+    html = make_marketing_email(size_kb=40)
+    assert strip_html(html) == legacy_strip_html(html)
+    assert "window.dataLayer" not in strip_html(html)
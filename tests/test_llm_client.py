@@ -0,0 +1,86 @@
+import pytest
+import asyncio
+import json
+from llm_client import LLMClient, BACKENDS, register_backend
+from fake_llm import FakeChatModel, LatencyDistribution
+from chains import classifier_agent_prompt, JSON_agent_prompt, Email_parser_agent_prompt, clean_json_response
+from schema_registry import get_schema_registry
+
+class CountingModel(FakeChatModel):
+    calls: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+def _classifier_client(latency=0.05):
+    client = LLMClient("fake")
+    client.set_backend(CountingModel(latency=latency))
+    return client, classifier_agent_prompt | client
+
+def test_backend_is_created_lazily():
+    created = []
+    register_backend("lazy-test", lambda: created.append(1) or FakeChatModel())
+    try:
+        client = LLMClient("lazy-test")
+        assert created == []
+        client.invoke("hello")
+        client.invoke("hello again")
+        assert created == [1]
+    finally:
+        del BACKENDS["lazy-test"]
+
+def test_unknown_backend_fails_on_first_call():
+    client = LLMClient("no-such-backend")
+    with pytest.raises(ValueError, match="Unknown LLM backend"):
+        client.invoke("hello")
+
+@pytest.mark.asyncio
+async def test_identical_inflight_prompts_share_one_call():
+    client, chain = _classifier_client()
+    payload = {"input_text": "Request for quotation: 100 units", "messages": []}
+    responses = await asyncio.gather(*(chain.ainvoke(payload) for _ in range(5)))
+    assert client.model.calls == 1
+    assert client.stats()["coalesced"] == 4
+    assert len({response.content for response in responses}) == 1
+
+@pytest.mark.asyncio
+async def test_distinct_and_sequential_prompts_are_not_coalesced():
+    client, chain = _classifier_client(latency=0)
+    await asyncio.gather(
+        chain.ainvoke({"input_text": "first", "messages": []}),
+        chain.ainvoke({"input_text": "second", "messages": []}),
+    )
+    await chain.ainvoke({"input_text": "first", "messages": []})
+    assert client.model.calls == 3
+    assert client.stats()["coalesced"] == 0
+
+@pytest.mark.asyncio
+async def test_fake_backend_answers_agent_prompts(sample_email_text, sample_json_data):
+    client = LLMClient("fake")
+
+    classification = clean_json_response((await (classifier_agent_prompt | client).ainvoke(
+        {"input_text": sample_email_text, "messages": []})).content)
+    assert classification["classified_format"] == "Email_Text"
+    assert classification["classified_intent"] == "RFQ"
+
+    schema = get_schema_registry().get_for_intent("Invoice")
+    mapped = clean_json_response((await (JSON_agent_prompt | client).ainvoke(
+        {"input_json": json.dumps(sample_json_data), "schema": schema.prompt_text, "messages": []})).content)
+    assert mapped["flowbit_formatted_data"]["invoiceId"] == "INV-2023-001"
+    assert mapped["processing_report"]["schema_used"] == schema.name
+
+    email = clean_json_response((await (Email_parser_agent_prompt | client).ainvoke(
+        {"email_text": sample_email_text, "intent": "RFQ", "messages": []})).content)
+    assert email["primary_request_summary"] == "Request for Quotation"
+    assert email["urgency_level"] == "Specific_Date_Requested"
+    assert email["extracted_sender_name"] == "John Doe"
+
+def test_latency_distribution_is_seeded_and_non_negative():
+    first = [LatencyDistribution("normal:0.01,0.05", seed=3).sample() for _ in range(3)]
+    second = [LatencyDistribution("normal:0.01,0.05", seed=3).sample() for _ in range(3)]
+    assert first == second
+    distribution = LatencyDistribution("normal:0.01,0.05")
+    assert all(distribution.sample() >= 0 for _ in range(100))
+    with pytest.raises(ValueError, match="Unknown latency distribution"):
+        LatencyDistribution("pareto:1")
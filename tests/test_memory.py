@@ -0,0 +1,97 @@
+import pytest
+import asyncio
+import sqlite3
+from unittest.mock import ANY
+from memory import SharedMemory, AsyncSharedMemory, get_shared_memory, register_blob_functions, SELECT_INPUT_SQL
+
+@pytest.fixture
+def memory(tmp_path):
+    store = SharedMemory(str(tmp_path / "flowbit.db"), batch_size=50, flush_interval=0.2)
+    yield store
+    store.close()
+
+def test_uses_wal_journal(memory):
+    assert memory.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_writes_visible_after_flush(memory):
+    memory.store_input("id-1", "hello", "txt")
+    memory.store_classification("id-1", {"classified_format": "Email_Text", "classified_intent": "RFQ", "reasoning": "r"})
+    memory.store_result("id-1", {"summary": "s"})
+    memory.flush()
+
+    conn = sqlite3.connect(memory.db_path)
+    register_blob_functions(conn)
+    assert conn.execute(SELECT_INPUT_SQL, ("id-1",)).fetchone()[1:4] == (None, ANY, "txt")
+    assert conn.execute("SELECT flowbit_blob(b.codec, b.data) FROM inputs i JOIN blobs b ON b.hash = i.input_hash "
+                        "WHERE i.input_id = 'id-1'").fetchone() == ("hello",)
+    assert conn.execute("SELECT intent FROM classifications WHERE input_id = 'id-1'").fetchone() == ("RFQ",)
+    assert conn.execute("SELECT flowbit_blob(b.codec, b.data) FROM results r JOIN blobs b ON b.hash = r.result_hash "
+                        "WHERE r.input_id = 'id-1'").fetchone() == ('{"summary": "s"}',)
+
+def test_writes_are_grouped_into_transactions(memory):
+    for i in range(120):
+        memory.store_input(f"id-{i}", "text")
+    memory.flush()
+    assert memory.writes == 120
+    assert memory.batches <= 5
+
+def test_bad_write_does_not_drop_batch(memory):
+    memory.store_input("dup", "first")
+    memory.store_input("dup", "second")
+    memory.store_input("other", "third")
+    memory.flush()
+    assert [memory.get_input(input_id)["input_text"] for input_id in ("dup", "other")] == ["first", "third"]
+    assert memory.conn.execute("SELECT COUNT(*) FROM inputs").fetchone()[0] == 2
+
+def test_get_shared_memory_reuses_store(tmp_path):
+    db_path = str(tmp_path / "shared.db")
+    first = get_shared_memory(db_path)
+    assert get_shared_memory(db_path) is first
+    first.close()
+    assert get_shared_memory(db_path) is not first
+
+def test_read_methods(memory):
+    memory.store_input("id-1", "hello", "txt")
+    memory.store_result("id-1", {"summary": "s"})
+    memory.flush()
+    record = memory.get_record("id-1")
+    assert record["input"]["input_text"] == "hello"
+    assert record["classification"] is None
+    assert record["result"]["result"] == {"summary": "s"}
+
+@pytest.mark.asyncio
+async def test_async_memory_round_trip(tmp_path):
+    async with AsyncSharedMemory(str(tmp_path / "flowbit.db")) as store:
+        await store.store_input("id-1", "hello", "txt")
+        await store.store_classification("id-1", {"classified_format": "JSON", "classified_intent": "Invoice"})
+        await store.store_result("id-1", {"invoiceId": "INV-1"})
+        record = await store.get_record("id-1")
+    assert record["input"]["input_type"] == "txt"
+    assert record["classification"]["classified_intent"] == "Invoice"
+    assert record["result"]["result"] == {"invoiceId": "INV-1"}
+
+@pytest.mark.asyncio
+async def test_async_memory_groups_concurrent_commits(tmp_path):
+    async with AsyncSharedMemory(str(tmp_path / "flowbit.db")) as store:
+        await asyncio.gather(*(store.store_input(f"id-{i}", "text") for i in range(50)))
+        assert store.writes == 50
+        assert store.commits < 50
+    conn = sqlite3.connect(str(tmp_path / "flowbit.db"))
+    assert conn.execute("SELECT COUNT(*) FROM inputs").fetchone()[0] == 50
+
+def test_existing_database_gains_summary_column_and_indexes(tmp_path):
+    db_path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE results (input_id TEXT PRIMARY KEY, result_data JSON, timestamp TEXT)")
+    conn.execute("INSERT INTO results VALUES ('old', '{}', '2024-01-01')")
+    conn.commit()
+    conn.close()
+
+    store = SharedMemory(db_path)
+    store.store_result("new", {"primary_request_summary": "Quote   for\n5 units"})
+    store.flush()
+    rows = store.conn.execute("SELECT input_id, summary FROM results ORDER BY input_id").fetchall()
+    indexes = {row[1] for row in store.conn.execute("PRAGMA index_list(classifications)")}
+    store.close()
+    assert rows == [("new", "Quote for 5 units"), ("old", None)]
+    assert {"idx_classifications_intent", "idx_classifications_format"} <= indexes
@@ -0,0 +1,64 @@
+import pytest
+import sqlite3
+import urllib.request
+from utils import tracing
+from utils.metrics import Registry, start_metrics_server, stop_metrics_server
+from memory import get_shared_memory, COMMIT_SECONDS
+from view_db import compute_stats
+import main
+
+def test_prometheus_text_format():
+    registry = Registry()
+    registry.counter("docs_total", "Documents", ("intent",)).inc(intent='say "hi"')
+    histogram = registry.histogram("latency_seconds", "Latency", ("chain",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 2):
+        histogram.observe(value, chain="classifier")
+    registry.register_callback("depth", "Queue depth", (), lambda: [({}, 3)])
+
+    lines = registry.render().splitlines()
+    assert '# TYPE docs_total counter' in lines
+    assert 'docs_total{intent="say \\"hi\\""} 1' in lines
+    assert 'latency_seconds_bucket{chain="classifier",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{chain="classifier",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{chain="classifier",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{chain="classifier"} 2.55' in lines
+    assert 'latency_seconds_count{chain="classifier"} 3' in lines
+    assert 'depth 3' in lines
+    with pytest.raises(ValueError):
+        histogram.observe(1)
+
+def test_metrics_endpoint():
+    registry = Registry()
+    registry.counter("requests_total", "Requests").inc(2)
+    server = start_metrics_server(0, registry=registry)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "requests_total 2" in response.read().decode()
+    finally:
+        stop_metrics_server()
+
+@pytest.mark.asyncio
+async def test_pipeline_metrics_and_stored_stats(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tracing, "_enabled", True)
+    commits = COMMIT_SECONDS.count()
+    text = "Subject: Question\n\nCould you tell me more about Widget A?"
+    response = await main.process_input(text, use_cache=False)
+    memory = get_shared_memory()
+    memory.flush()
+
+    classification = response["classification"]
+    assert main.DOCUMENTS.value(format=classification["classified_format"], intent=classification["classified_intent"],
+                                status="success") >= 1
+    assert main.LLM_SECONDS.count(chain="email_agent") >= 1
+    assert COMMIT_SECONDS.count() > commits
+    assert "flowbit_db_write_queue_depth" in main.REGISTRY.render()
+
+    stats = compute_stats(sqlite3.connect("flowbit.db"))
+    assert stats["total_documents"] == 1 and stats["failed_results"] == 0
+    assert stats["documents"][0]["intent"] == classification["classified_intent"]
+    assert stats["chain_latency"]["email_agent"]["count"] == 1
+    assert stats["stage_latency"]["process_input"]["count"] == 1
+    assert stats["db_commit_latency"]["count"] >= 1
+    memory.close()
@@ -0,0 +1,69 @@
+import pytest
+import json
+import fitz
+from email.message import EmailMessage
+from utils.mime_utils import is_mime_message, parse_mime
+from memory import get_shared_memory
+import main
+
+def _pdf_bytes(text: str) -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def build_message() -> str:
+    message = EmailMessage()
+    message["Subject"] = "Invoice INV-7 and order data"
+    message["From"] = "Billing <billing@acme.com>"
+    message["To"] = "ap@example.com"
+    message["Message-ID"] = "<m1@acme.com>"
+    message.set_content("Hello,\n\nPlease find the invoice for order 42 attached. Payment is due by Friday.\n\nRegards,\nAcme",
+                        cte="quoted-printable")
+    message.add_alternative("<p>Hello,</p><p>Please find the <b>invoice</b> attached.</p>", subtype="html")
+    message.add_attachment(_pdf_bytes("Invoice INV-7 total amount due 1200 USD"), maintype="application",
+                           subtype="pdf", filename="invoice.pdf")
+    message.add_attachment(json.dumps({"order_id": "42", "items": [{"sku": "W-1", "quantity": 3}]}).encode(),
+                           maintype="application", subtype="json", filename="order.json")
+    message.add_attachment(b"\x89PNG" + bytes(4000), maintype="image", subtype="png", filename="logo.png")
+    return message.as_string()
+
+def test_is_mime_message():
+    assert is_mime_message(build_message())
+    assert not is_mime_message("Subject: Question\n\nCould you tell me more about Widget A?")
+    assert not is_mime_message('{"content-type": "json"}')
+
+def test_parse_mime_picks_text_body_and_drops_binary():
+    parsed = parse_mime(build_message(), chunk_size=256)
+    assert parsed.body_type == "plain"
+    assert "Payment is due by Friday." in parsed.body
+    assert parsed.headers["Message-ID"] == "<m1@acme.com>"
+    assert [(a.filename, a.kind) for a in parsed.attachments] == [("invoice.pdf", "pdf"), ("order.json", "json")]
+    assert [a.filename for a in parsed.dropped] == ["logo.png"]
+    assert "INV-7" in parsed.attachments[0].text()
+    assert json.loads(parsed.attachments[1].text())["order_id"] == "42"
+
+    prompt = parsed.prompt_text()
+    assert prompt.startswith("Subject: Invoice INV-7 and order data\nFrom: Billing <billing@acme.com>")
+    assert "logo.png (image/png" in prompt
+    assert "iVBOR" not in prompt and "JVBER" not in prompt and "=\n" not in prompt
+
+@pytest.mark.asyncio
+async def test_attachments_fan_out_as_child_documents(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    response = await main.process_input(build_message(), use_cache=False)
+    assert response["status"] == "success"
+    assert [child["filename"] for child in response["attachments"]] == ["invoice.pdf", "order.json"]
+    assert all(child["status"] == "success" for child in response["attachments"])
+
+    memory = get_shared_memory()
+    memory.flush()
+    parent = memory.get_input(response["input_id"])
+    assert parent["input_type"] == "email" and "JVBER" not in parent["input_text"]
+    assert parent["metadata"]["mime"]["dropped_parts"][0]["filename"] == "logo.png"
+    children = memory.get_children(response["input_id"])
+    assert {child["metadata"]["filename"] for child in children} == {"invoice.pdf", "order.json"}
+    pdf_child = next(child for child in children if child["input_type"] == "pdf")
+    assert "INV-7" in pdf_child["input_text"]
+    memory.close()
@@ -0,0 +1,40 @@
+import pytest
+import fitz
+from utils.pdf_utils import extract_pdf_text, extract_pdf_text_async, iter_pdf_pages, aiter_pdf_pages, open_pdf
+
+@pytest.fixture
+def multi_page_pdf(tmp_path):
+    path = tmp_path / "multi.pdf"
+    doc = fitz.open()
+    for n in range(6):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page number {n}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_iter_pdf_pages_streams_in_order(multi_page_pdf):
+    pages = list(iter_pdf_pages(multi_page_pdf))
+    assert len(pages) == 6
+    assert "Page number 0" in pages[0]
+    assert "Page number 5" in pages[5]
+
+def test_parallel_extraction_matches_sequential(multi_page_pdf):
+    sequential = extract_pdf_text(multi_page_pdf)
+    parallel = extract_pdf_text(multi_page_pdf, parallel_threshold=2)
+    assert parallel == sequential
+    assert sequential.index("Page number 1") < sequential.index("Page number 4")
+
+@pytest.mark.asyncio
+async def test_async_extraction(multi_page_pdf):
+    assert await extract_pdf_text_async(multi_page_pdf, parallel_threshold=2) == extract_pdf_text(multi_page_pdf)
+    pages = [page async for page in aiter_pdf_pages(multi_page_pdf)]
+    assert len(pages) == 6
+
+def test_open_pdf_rejects_non_pdf(tmp_path):
+    text_file = tmp_path / "notes.txt"
+    text_file.write_text("not a pdf")
+    with pytest.raises(ValueError):
+        open_pdf(str(text_file))
+    with pytest.raises(FileNotFoundError):
+        open_pdf(str(tmp_path / "missing.pdf"))
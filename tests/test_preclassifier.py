@@ -0,0 +1,36 @@
+import pytest
+import json
+import main
+from preclassifier import preclassify, try_preclassify, detect_format
+
+def test_detect_format():
+    assert detect_format('{"a": 1}')[0] == "JSON"
+    assert detect_format("Subject: Hi\nFrom: a@b.com\n\nBody")[0] == "Email_Text"
+    assert detect_format("Some text", "pdf")[0] == "PDF_Content"
+    assert detect_format("just words")[0] == "Undetermined_Format"
+
+def test_email_rfq_is_confident(sample_email_text):
+    result = preclassify(sample_email_text)
+    assert result["classified_format"] == "Email_Text"
+    assert result["classified_intent"] == "RFQ"
+    assert result["confidence"] >= 0.85
+
+def test_json_intent_from_schema_fields():
+    payload = {"invoice_id": "INV-1", "customer": {"name": "Acme"}, "total_amount_due": 5, "due_date": "2025-01-01"}
+    result = preclassify(json.dumps(payload))
+    assert result["classified_format"] == "JSON"
+    assert result["classified_intent"] == "Invoice"
+    assert result["confidence"] >= 0.85
+
+def test_ambiguous_input_falls_back():
+    assert try_preclassify("Hello, how are you?") is None
+    assert preclassify('{"event": "heartbeat"}')["classified_intent"] == "Other"
+
+@pytest.mark.asyncio
+async def test_classify_input_skips_llm_for_obvious_input(monkeypatch, sample_email_text):
+    async def fail_invoke(chain, payload):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(main, "invoke_chain", fail_invoke)
+    result = await main.classify_input(sample_email_text)
+    assert result["classified_intent"] == "RFQ"
@@ -0,0 +1,93 @@
+import pytest
+import asyncio
+import time
+from google.api_core.exceptions import ResourceExhausted
+from utils.rate_limit import TokenBucket, RateLimiter, AIMDController
+from llm_client import LLMClient
+from fake_llm import FakeChatModel
+
+def test_token_bucket_reports_wait_when_empty():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    assert bucket.try_consume(1) == 0
+    assert bucket.try_consume(1) == 0
+    assert bucket.try_consume(1) == pytest.approx(1.0, abs=0.05)
+    # Oversized requests wait for a full bucket rather than forever
+    assert bucket.try_consume(10) <= 2.0
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests_and_tokens():
+    limiter = RateLimiter(requests_per_minute=1200, burst_fraction=10 / 1200)
+    started = time.monotonic()
+    for _ in range(15):
+        await limiter.acquire()
+    assert time.monotonic() - started >= 0.2
+
+    limiter = RateLimiter(tokens_per_minute=6000, burst_fraction=0.1)
+    await limiter.acquire(600)
+    started = time.monotonic()
+    await limiter.acquire(50)
+    assert time.monotonic() - started >= 0.4
+
+@pytest.mark.asyncio
+async def test_rate_limiter_pause_holds_callers():
+    limiter = RateLimiter()
+    limiter.pause(0.2)
+    started = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - started >= 0.19
+
+@pytest.mark.asyncio
+async def test_aimd_bounds_concurrency_and_grows_when_healthy():
+    controller = AIMDController(initial_limit=2, max_limit=4, latency_tolerance=100)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with controller.slot():
+            peak = max(peak, controller.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(4)))
+    assert peak == 2
+    await asyncio.gather(*(call() for _ in range(40)))
+    assert controller.limit == 4
+    assert controller.increases > 0
+
+def test_aimd_cuts_once_per_burst_of_overload_errors():
+    controller = AIMDController(initial_limit=8)
+    loop = asyncio.new_event_loop()
+    try:
+        starts = [loop.run_until_complete(controller.acquire()) for _ in range(4)]
+    finally:
+        loop.close()
+    for started in starts:
+        controller.release(started, ResourceExhausted("quota"))
+    assert controller.limit == 4
+    assert controller.decreases == 1
+
+    # Request errors say nothing about capacity
+    started = time.monotonic()
+    controller.in_flight += 1
+    controller.release(started, ValueError("bad payload"))
+    assert controller.limit == 4
+
+def test_aimd_cuts_on_latency_spike():
+    controller = AIMDController(initial_limit=8, latency_slack=0)
+    controller.in_flight = 2
+    now = time.monotonic()
+    controller.release(now - 0.1)
+    controller.release(now - 1.0)
+    assert controller.limit == 4
+
+@pytest.mark.asyncio
+async def test_client_pauses_all_calls_on_provider_retry_after():
+    class QuotaModel(FakeChatModel):
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            raise ResourceExhausted("Quota exceeded, retry in 0.3s")
+
+    client = LLMClient("fake")
+    client.set_backend(QuotaModel())
+    with pytest.raises(ResourceExhausted):
+        await client.ainvoke("classify this")
+    assert client.rate_limiter.paused_until > time.monotonic() + 0.2
+    assert client.concurrency.decreases == 1
@@ -0,0 +1,90 @@
+import pytest
+import random
+from utils.reply_utils import reduce_reply_chain
+from benchmarks.synthetic import make_thread
+from memory import get_shared_memory
+import main
+
+REPLY = """Subject: Re: Order 42
+From: bob@example.com
+
+Hi Alice,
+
+Yes, please ship 20 units by Friday.
+
+Thanks,
+Bob
+-- 
+Bob Smith | Purchasing
++1 555 123 4567
+Sent from my iPhone
+
+CONFIDENTIALITY NOTICE: This email is confidential and intended solely for the named addressee.
+If you received this message in error, please delete it.
+
+On Mon, 3 Jun 2024 at 10:00, Alice Jones <alice@example.com>
+wrote:
+> Hi Bob, how many units do you need?
+>> Earlier history"""
+
+def test_reply_history_signature_and_disclaimer_are_stripped():
+    reduction = reduce_reply_chain(REPLY)
+    assert "ship 20 units by Friday" in reduction.text and "Thanks,\nBob" in reduction.text
+    assert "+1 555 123 4567" in reduction.text
+    for removed in ("how many units", "CONFIDENTIALITY", "Purchasing", "iPhone", "wrote:"):
+        assert removed not in reduction.text
+    assert [span["kind"] for span in reduction.stripped] == ["signature", "signature", "disclaimer", "quote"]
+    for span in reduction.stripped:
+        assert REPLY[span["start"]:span["end"]] == span["text"]
+
+def test_outlook_history_and_forwarded_headers():
+    text = ("Subject: FW: PO\nFrom: ann@example.com\n\nFYI, see below.\n\n"
+            "---------- Forwarded message ---------\nFrom: Carol <carol@example.com>\nDate: Mon, 3 Jun 2024\n\n"
+            "Please see PO 77 attached.\n\n"
+            "________________________________\nFrom: Ann\nSent: Monday\nSubject: PO\n\nOlder message")
+    reduction = reduce_reply_chain(text)
+    assert "Please see PO 77 attached." in reduction.text
+    assert "carol@example.com" not in reduction.text and "Older message" not in reduction.text
+    assert [span["kind"] for span in reduction.stripped] == ["forward_header", "quote"]
+
+def test_leading_whitespace_before_headers_is_not_a_reply_header():
+    text = ("\nFrom: Bob <bob@example.com>\nDate: Mon, 3 Jun 2024\nSubject: Re: Quote\n\n"
+            "Hi Alice,\n\nPlease send the quote.\n\n"
+            "On Mon, 3 Jun 2024, Alice wrote:\n> Which items?")
+    reduction = reduce_reply_chain(text)
+    assert [span["kind"] for span in reduction.stripped] == ["quote"]
+    assert "Please send the quote." in reduction.text and "Which items?" not in reduction.text
+    assert reduction.text == reduce_reply_chain(text.lstrip()).text
+
+def test_fully_quoted_message_is_left_alone():
+    text = "Subject: Fwd\n\n> only quoted\n> text"
+    reduction = reduce_reply_chain(text)
+    assert reduction.text == text and reduction.stripped == []
+
+def test_synthetic_threads_shrink():
+    thread = make_thread(random.Random(1), messages=5)
+    last = reduce_reply_chain(thread[-1])
+    assert last.removed_chars > len(thread[-1]) * 0.5
+    assert thread[-1].split("\n\n")[2] in last.text
+
+@pytest.mark.asyncio
+async def test_process_input_prompts_with_reduced_text_and_stores_spans(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    prompts = []
+    real_invoke = main.invoke_chain.__wrapped__
+
+    async def capture(chain, payload):
+        prompts.append(payload)
+        return await real_invoke(chain, payload)
+
+    monkeypatch.setattr(main, "invoke_chain", capture)
+    response = await main.process_input(REPLY, use_cache=False)
+    assert response["status"] == "success"
+    assert prompts and all("how many units" not in str(payload) for payload in prompts)
+
+    memory = get_shared_memory()
+    memory.flush()
+    assert memory.get_input(response["input_id"])["input_text"] == REPLY
+    kinds = [span["kind"] for span in memory.get_stripped_spans(response["input_id"])]
+    assert kinds == ["signature", "signature", "disclaimer", "quote"]
+    memory.close()
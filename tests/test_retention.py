@@ -0,0 +1,126 @@
+import pytest
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from cache import ResultCache
+from memory import SharedMemory
+from threads import ThreadStore
+from retention import apply_retention, archive_path, parse_policy, start_retention_from_env
+
+TEXT = "Subject: Quote\n\n" + "Please quote 3 x Widget A\n" * 200
+
+def make_store(db_path, ages):
+    """One classified document per (input_id, intent, age in days)."""
+    memory = SharedMemory(db_path)
+    for input_id, intent, _ in ages:
+        memory.store_input(input_id, TEXT if input_id in ("a", "c") else TEXT + input_id, "email")
+        if intent:
+            memory.store_classification(input_id, {"classified_format": "Email", "classified_intent": intent})
+        memory.store_result(input_id, {"processing_report": {"status": "success"}, "id": input_id})
+        memory.store_stripped_spans(input_id, [{"kind": "quote", "start": 0, "end": 5, "text": "> old"}])
+    memory.close()
+    conn = sqlite3.connect(db_path)
+    for input_id, _, days in ages:
+        stamp = (datetime.now() - timedelta(days=days)).isoformat()
+        for table in ("inputs", "classifications", "results"):
+            conn.execute(f"UPDATE {table} SET timestamp = ? WHERE input_id = ?", (stamp, input_id))
+    conn.commit()
+    conn.close()
+
+def test_parse_policy():
+    assert parse_policy("RFQ=30, Invoice=365d,Complaint=forever,*=90") == {
+        "RFQ": 30, "Invoice": 365, "Complaint": None, "*": 90}
+    with pytest.raises(ValueError):
+        parse_policy("RFQ")
+
+def test_expired_documents_move_to_monthly_archives(tmp_path):
+    db_path = str(tmp_path / "flowbit.db")
+    make_store(db_path, [("a", "RFQ", 40), ("b", "Invoice", 400), ("c", "Complaint", 40), ("d", None, 100)])
+    archive_dir = str(tmp_path / "archive")
+
+    report = apply_retention(db_path, parse_policy("RFQ=30,Invoice=forever,*=90"), archive_dir, batch_rows=1, yield_seconds=0)
+    assert report["archived"] == 2 and report["batches"] == 2
+    # a's text is still used by c; a's result blob is dropped, d's text and result too
+    assert report["blobs_deleted"] == 3
+
+    memory = SharedMemory(db_path)
+    assert memory.get_input("a") is None and memory.get_input("d") is None
+    assert memory.get_record("c")["input"]["input_text"] == TEXT
+    assert memory.get_input("b") is not None
+    assert memory.conn.execute("SELECT COUNT(*) FROM stripped_spans").fetchone()[0] == 2
+    memory.close()
+
+    for input_id, days in (("a", 40), ("d", 100)):
+        stamp = (datetime.now() - timedelta(days=days)).isoformat()
+        archive = SharedMemory(archive_path(archive_dir, stamp))
+        record = archive.get_record(input_id)
+        assert record["input"]["input_text"].startswith(TEXT)
+        assert record["result"]["result"]["id"] == input_id
+        assert len(archive.get_stripped_spans(input_id)) == 1
+        archive.close()
+
+    assert apply_retention(db_path, parse_policy("RFQ=30,Invoice=forever,*=90"), archive_dir)["archived"] == 0
+
+def test_thread_messages_and_cache_entries_expire_with_their_documents(tmp_path):
+    db_path = str(tmp_path / "flowbit.db")
+    make_store(db_path, [("a", "RFQ", 40), ("b", "Invoice", 40)])
+    cache = ResultCache(db_path)
+    cache.put("old-rfq", {"classified_intent": "RFQ"}, {"id": "a"})
+    cache.put("old-invoice", {"classified_intent": "Invoice"}, {"id": "b"})
+    cache.put("new-rfq", {"classified_intent": "RFQ"}, {"id": "new"})
+    cache.conn.execute("UPDATE result_cache SET created_at = ? WHERE cache_key LIKE 'old-%'",
+                       ((datetime.now() - timedelta(days=40)).timestamp(),))
+    cache.conn.commit()
+    cache.conn.close()
+    store = ThreadStore(db_path)
+    for input_id in ("a", "b"):
+        context = store.resolve({"Message-ID": f"<{input_id}@example.com>", "References": f"<{input_id}-parent@example.com>",
+                                 "Subject": f"Order {input_id}"})
+        store.record(context, input_id, {"classified_intent": "RFQ"}, {"primary_request_summary": input_id})
+    store.close()
+
+    archive_dir = str(tmp_path / "archive")
+    report = apply_retention(db_path, parse_policy("RFQ=30,Invoice=forever"), archive_dir, yield_seconds=0)
+    assert report["archived"] == 1 and report["threads_deleted"] == 1 and report["cache_deleted"] == 1
+
+    conn = sqlite3.connect(db_path)
+    assert [row[0] for row in conn.execute("SELECT cache_key FROM result_cache ORDER BY cache_key")] == ["new-rfq", "old-invoice"]
+    assert [row[0] for row in conn.execute("SELECT message_id FROM thread_messages ORDER BY message_id")] == [
+        "<b-parent@example.com>", "<b@example.com>"]
+    assert conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0] == 1
+    conn.close()
+
+    archive = sqlite3.connect(archive_path(archive_dir, (datetime.now() - timedelta(days=40)).isoformat()))
+    assert archive.execute("SELECT input_id, result_data FROM thread_messages").fetchall() == [
+        ("a", '{"primary_request_summary": "a"}')]
+    assert "a" in archive.execute("SELECT state FROM threads").fetchone()[0]
+    archive.close()
+
+def test_incremental_vacuum_returns_space(tmp_path):
+    db_path = str(tmp_path / "flowbit.db")
+    memory = SharedMemory(db_path, compact=False)
+    for number in range(300):
+        memory.store_input(f"doc-{number}", TEXT + str(number), "email")
+    memory.close()
+
+    report = apply_retention(db_path, {"*": 0}, str(tmp_path / "archive"), batch_rows=100, vacuum_pages=50,
+                             yield_seconds=0, now=datetime.now() + timedelta(days=1))
+    assert report["archived"] == 300 and report["incremental_vacuum"]
+    assert report["vacuum_pages"] > 0 and report["reclaimed_bytes"] > 0
+    assert report["size_after"] < report["size_before"]
+    assert 0 < report["max_pause_ms"] <= report["total_pause_ms"]
+
+def test_scheduler_runs_from_env(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "flowbit.db")
+    make_store(db_path, [("a", "RFQ", 40)])
+    monkeypatch.setenv("FLOWBIT_RETENTION", "RFQ=30")
+    monkeypatch.setenv("FLOWBIT_ARCHIVE_DIR", str(tmp_path / "archive"))
+    scheduler = start_retention_from_env(db_path)
+    deadline = time.time() + 10
+    while scheduler.last_report is None and time.time() < deadline:
+        time.sleep(0.05)
+    scheduler.stop(timeout=10)
+    assert scheduler.last_report["archived"] == 1
+
+    monkeypatch.delenv("FLOWBIT_RETENTION")
+    assert start_retention_from_env(db_path) is None
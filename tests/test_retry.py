@@ -0,0 +1,86 @@
+import pytest
+import asyncio
+import time
+from utils.retry import retry_with_exponential_backoff, RetryError, get_retry_after
+
+class RateLimited(ConnectionError):
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@pytest.mark.asyncio
+async def test_retry_does_not_block_event_loop():
+    """Other coroutines keep running while a call is backing off."""
+    calls = 0
+
+    @retry_with_exponential_backoff(max_retries=1, base_delay=0.2, jitter=False)
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ConnectionError("transient")
+        return "ok"
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    result, _ = await asyncio.gather(flaky(), ticker())
+    assert result == "ok"
+    assert ticks == 10
+    assert flaky.retry_stats.retries == 1
+    assert flaky.retry_stats.total_backoff == pytest.approx(0.2)
+
+@pytest.mark.asyncio
+async def test_retry_honours_retry_after_hint():
+    calls = 0
+
+    @retry_with_exponential_backoff(max_retries=2, base_delay=5, jitter=False)
+    async def rate_limited():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RateLimited("429", retry_after=0.05)
+        return "ok"
+
+    started = time.perf_counter()
+    assert await rate_limited() == "ok"
+    assert time.perf_counter() - started < 1
+    assert rate_limited.retry_stats.total_backoff == pytest.approx(0.05)
+
+@pytest.mark.asyncio
+async def test_retry_gives_up_when_time_budget_exceeded():
+    @retry_with_exponential_backoff(max_retries=5, base_delay=1, jitter=False, max_total_time=0.5)
+    async def always_fails():
+        raise ConnectionError("down")
+
+    with pytest.raises(RetryError, match="budget"):
+        await always_fails()
+    stats = always_fails.retry_stats.as_dict()
+    assert stats["attempts"] == 1
+    assert stats["giveups"] == 1
+
+@pytest.mark.asyncio
+async def test_retry_counts_giveups_after_max_retries():
+    @retry_with_exponential_backoff(max_retries=2, base_delay=0.01)
+    async def always_fails():
+        raise ConnectionError("down")
+
+    with pytest.raises(RetryError):
+        await always_fails()
+    stats = always_fails.retry_stats.as_dict()
+    assert stats["attempts"] == 3
+    assert stats["retries"] == 2
+    assert stats["giveups"] == 1
+    # Full jitter never sleeps longer than the exponential cap
+    assert stats["total_backoff_seconds"] <= 0.03
+
+def test_get_retry_after_parses_hints():
+    assert get_retry_after(RateLimited("x", retry_after=3)) == 3.0
+    assert get_retry_after(Exception("429 Quota exceeded. Please retry in 12.5s.")) == 12.5
+    assert get_retry_after(Exception("retry_delay {\n  seconds: 7\n}")) == 7.0
+    assert get_retry_after(Exception("boom")) is None
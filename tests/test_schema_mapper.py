@@ -0,0 +1,73 @@
+import pytest
+import json
+import main
+from chains import get_schema_for_intent
+from schema_mapper import map_to_schema, resolve_path, coerce_value, CoercionError
+
+def test_resolve_path():
+    data = {"customer": {"name": "Acme"}, "items": [{"sku": "A1"}]}
+    assert resolve_path(data, "customer.name") == "Acme"
+    assert resolve_path(data, "items.0.sku") == "A1"
+    assert resolve_path(data, "$") is data
+
+@pytest.mark.parametrize("value,field_type,expected", [
+    ("1,250.50", "number", 1250.5),
+    ("USD 300", "number", 300),
+    ("2025-05-30", "date", "2025-05-30"),
+    ("2025-05-30T10:00:00Z", "date", "2025-05-30"),
+    ("May 30, 2025", "date", "2025-05-30"),
+    (42, "string", "42"),
+])
+def test_coerce_value(value, field_type, expected):
+    assert coerce_value(value, {"type": field_type}) == expected
+
+def test_coerce_value_rejects_bad_number():
+    with pytest.raises(CoercionError):
+        coerce_value("twelve", {"type": "number"})
+
+def test_map_complete_invoice():
+    payload = {
+        "invoice_id": "INV-9",
+        "customer": {"name": "Acme Corp"},
+        "grand_total": "1,200.00",
+        "due_date": "2025-07-01",
+        "items": [{"product": "Widget A", "quantity": 5}],
+        "notes": "thanks"
+    }
+    result = map_to_schema(payload, get_schema_for_intent("Invoice"))
+    data = result["flowbit_formatted_data"]
+    report = result["processing_report"]
+    assert data["invoiceId"] == "INV-9"
+    assert data["customerName"] == "Acme Corp"
+    assert data["totalAmount"] == 1200.0
+    assert data["currency"] == "USD"
+    assert data["itemsDescription"] == "Widget A x5"
+    assert report["status"] == "success"
+    assert report["schema_used"] == "FlowBitInvoiceV1"
+    assert report["unmapped_source_fields"] == ["notes"]
+
+def test_map_reports_missing_and_mismatched_fields():
+    payload = {"customer": {"name": "Acme"}, "amount": "lots", "due_date": "2025-07-01"}
+    report = map_to_schema(payload, get_schema_for_intent("Invoice"))["processing_report"]
+    assert report["status"] == "error"
+    assert report["missing_required_fields"] == ["invoiceId", "totalAmount"]
+    assert report["type_mismatches"][0]["field"] == "totalAmount"
+
+def test_map_array_items():
+    payload = {
+        "order_number": "O-1", "customer": {"name": "Bob"}, "date_placed": "2025-01-02",
+        "grand_total": 30, "line_items": [{"sku": "S1", "qty": "3", "price": "10"}]
+    }
+    data = map_to_schema(payload, get_schema_for_intent("Order_Confirmation"))["flowbit_formatted_data"]
+    assert data["items"] == [{"productId": "S1", "quantity": 3, "unitPrice": 10}]
+
+@pytest.mark.asyncio
+async def test_process_json_input_skips_llm_when_mapping_complete(monkeypatch):
+    async def fail_invoke(chain, payload):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(main, "invoke_chain", fail_invoke)
+    payload = {"id": "INV-1", "clientName": "Acme", "amount": 10, "payment_due": "2025-01-01"}
+    result = await main.process_json_input(json.dumps(payload), "Invoice")
+    assert result["processing_report"]["status"] == "success"
+    assert result["flowbit_formatted_data"]["invoiceId"] == "INV-1"
@@ -0,0 +1,45 @@
+import pytest
+import json
+import os
+from schema_registry import SchemaRegistry
+
+@pytest.fixture
+def schema_file(tmp_path):
+    path = tmp_path / "json_schema.json"
+    path.write_text(json.dumps([
+        {"schema_name": "FlowBitInvoiceV1", "fields": [
+            {"flowbit_name": "invoiceId", "source_path": ["invoice_id"], "type": "string", "required": True}
+        ]},
+        {"schema_name": "FlowBitGenericData_V1", "fields": []}
+    ]))
+    return path
+
+def test_lookup_by_intent_and_name(schema_file):
+    registry = SchemaRegistry(str(schema_file))
+    assert registry.get_for_intent("Invoice").name == "FlowBitInvoiceV1"
+    assert registry.get_for_intent("Unknown").name == "FlowBitGenericData_V1"
+    assert registry.get_by_name("FlowBitInvoiceV1").required_fields == ["invoiceId"]
+
+def test_compiled_schema_caches_prompt_text(schema_file):
+    schema = SchemaRegistry(str(schema_file)).get_for_intent("Invoice")
+    assert json.loads(schema.prompt_text) == schema.schema
+    assert schema.fields[0].paths == [("invoice_id", ("invoice_id",))]
+
+def test_hot_reload_on_mtime_change(schema_file):
+    registry = SchemaRegistry(str(schema_file), check_interval=0)
+    version = registry.get_version()
+    schemas = json.loads(schema_file.read_text())
+    schemas[0]["fields"].append({"flowbit_name": "total", "source_path": ["total"], "type": "number", "required": True})
+    schema_file.write_text(json.dumps(schemas))
+    stat = os.stat(schema_file)
+    os.utime(schema_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert registry.get_for_intent("Invoice").required_fields == ["invoiceId", "total"]
+    assert registry.get_version() != version
+
+def test_broken_file_keeps_previous_schemas(schema_file):
+    registry = SchemaRegistry(str(schema_file), check_interval=0)
+    schema_file.write_text("{not json")
+    stat = os.stat(schema_file)
+    os.utime(schema_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert registry.get_for_intent("Invoice").name == "FlowBitInvoiceV1"
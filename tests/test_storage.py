@@ -0,0 +1,75 @@
+import pytest
+import sqlite3
+from memory import SharedMemory, AsyncSharedMemory
+from migrate_storage import migrate
+from utils.compression import compress, decompress, zstandard
+
+TEXT = "Subject: Invoice\n\n" + "Line item: 3 x Widget A at $10.00\n" * 200
+
+@pytest.mark.parametrize("codec", ["zlib", "zstd"])
+def test_compression_round_trip(codec):
+    if codec == "zstd" and zstandard is None:
+        pytest.skip("zstandard not installed")
+    used, payload = compress(TEXT.encode(), codec)
+    assert used == codec and len(payload) < len(TEXT) // 10
+    assert decompress(used, payload) == TEXT.encode()
+    assert compress(b"short", codec) == ("raw", b"short")
+
+def test_identical_inputs_share_one_compressed_blob(tmp_path):
+    memory = SharedMemory(str(tmp_path / "flowbit.db"))
+    odd = "café \udce9 " + TEXT
+    for input_id in ("a", "b", "c"):
+        memory.store_input(input_id, TEXT if input_id != "c" else odd, "pdf")
+        memory.store_result(input_id, {"processing_report": {"status": "success"}})
+    memory.flush()
+    assert memory.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 3
+    assert memory.conn.execute("SELECT SUM(LENGTH(data)) FROM blobs").fetchone()[0] < len(TEXT) // 5
+    assert memory.get_input("b")["input_text"] == TEXT
+    assert memory.get_input("c")["input_text"] == odd
+    assert memory.get_result("a")["result"] == {"processing_report": {"status": "success"}}
+    memory.close()
+
+@pytest.mark.asyncio
+async def test_async_memory_compact_round_trip(tmp_path):
+    async with AsyncSharedMemory(str(tmp_path / "flowbit.db")) as store:
+        await store.store_input("id-1", TEXT, "txt")
+        await store.store_result("id-1", {"summary": "s"})
+        record = await store.get_record("id-1")
+    assert record["input"]["input_text"] == TEXT and record["result"]["result"] == {"summary": "s"}
+
+def test_migrate_moves_inline_rows_to_blobs(tmp_path):
+    db_path = str(tmp_path / "flowbit.db")
+    memory = SharedMemory(db_path, compact=False)
+    for input_id in ("a", "b", "c"):
+        memory.store_input(input_id, TEXT, "pdf")
+        memory.store_result(input_id, {"invoice": input_id})
+    memory.close()
+
+    report = migrate(db_path, batch_rows=2, vacuum=True)
+    assert report["inputs"] == {"rows": 3, "blobs": 1}
+    assert report["results"] == {"rows": 3, "blobs": 3}
+    assert report["size_after"] < report["size_before"]
+    assert migrate(db_path)["inputs"]["rows"] == 0
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM inputs WHERE input_text IS NOT NULL").fetchone()[0] == 0
+    memory = SharedMemory(db_path)
+    assert memory.get_record("b")["input"]["input_text"] == TEXT
+    assert memory.get_record("b")["result"]["result"] == {"invoice": "b"}
+    memory.close()
+
+def test_input_preview_is_stored_inline_and_backfilled(tmp_path):
+    db_path = str(tmp_path / "flowbit.db")
+    memory = SharedMemory(db_path)
+    for input_id in ("a", "b"):
+        memory.store_input(input_id, TEXT, "pdf")
+    memory.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT preview FROM inputs WHERE input_id = 'a'").fetchone()[0] == TEXT[:50]
+    # a compact row written before the column existed
+    conn.execute("UPDATE inputs SET preview = NULL WHERE input_id = 'b'")
+    conn.commit()
+    assert migrate(db_path)["previews"] == 1
+    assert conn.execute("SELECT preview FROM inputs WHERE input_id = 'b'").fetchone()[0] == TEXT[:50]
+    conn.close()
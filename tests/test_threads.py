@@ -0,0 +1,61 @@
+import pytest
+import main
+from threads import ThreadStore, normalize_subject, message_headers
+
+def test_normalize_subject_and_headers():
+    assert normalize_subject("RE: Fwd: [Sales] AW:  Quote for  Widget A") == "quote for widget a"
+    headers = message_headers("Subject: Re: Quote\nMessage-ID: <b@x>\nReferences: <a@x>\n <z@x>\n\nBody\nIn-Reply-To: <c@x>")
+    assert headers == {"Subject": "Re: Quote", "Message-ID": "<b@x>", "References": "<a@x> <z@x>"}
+    mime = {"mime": {"headers": {"Subject": "Quote", "From": "a@x", "In-Reply-To": "<a@x>"}}}
+    assert message_headers("ignored", mime) == {"Subject": "Quote", "In-Reply-To": "<a@x>"}
+
+def test_thread_store_groups_by_references_and_subject(tmp_path):
+    store = ThreadStore(str(tmp_path / "flowbit.db"))
+    # the reply arrives before the message it answers
+    reply = store.resolve({"Subject": "Re: Quote", "Message-ID": "<b@x>", "In-Reply-To": "<a@x>"})
+    first = store.resolve({"Subject": "Quote", "Message-ID": "<a@x>"})
+    assert (reply.outcome, first.outcome) == ("started", "joined")
+    assert first.thread_id == reply.thread_id
+
+    store.record(first, "input-a", {"classified_format": "Email_Text", "classified_intent": "RFQ"},
+                 {"primary_request_summary": "quote", "action_items_implied": ["send quote"]})
+    by_subject = store.resolve({"Subject": "RE: quote", "Message-ID": "<c@y>"})
+    assert by_subject.thread_id == first.thread_id
+    assert by_subject.classification["classified_intent"] == "RFQ"
+    assert "send quote" in by_subject.prompt_context()
+    # the same subject without a reply prefix is a new conversation
+    assert store.resolve({"Subject": "Quote", "Message-ID": "<d@y>"}).thread_id != first.thread_id
+
+    duplicate = store.resolve({"Subject": "Quote", "Message-ID": "<a@x>"})
+    assert duplicate.outcome == "duplicate" and duplicate.duplicate["input_id"] == "input-a"
+    assert store.get_thread(first.thread_id)["message_count"] == 1
+    store.close()
+
+@pytest.mark.asyncio
+async def test_replies_reuse_thread_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "PRECLASSIFY_THRESHOLD", 1.01)
+    classified, contexts = [], []
+
+    async def fake_classify(input_data, input_type=None):
+        classified.append(input_data)
+        return {"classified_format": "Email_Text", "classified_intent": "RFQ", "reasoning": "test"}
+
+    async def fake_email(input_data, intent, thread_context=None):
+        contexts.append(thread_context)
+        return {"primary_request_summary": input_data.rsplit("\n", 1)[-1], "action_items_implied": [f"item {len(contexts)}"]}
+
+    monkeypatch.setattr(main, "classify_input", fake_classify)
+    monkeypatch.setattr(main, "process_email_input", fake_email)
+
+    first = await main.process_input("Subject: Quote\nMessage-ID: <a@x>\n\nPlease quote 5 units")
+    second = await main.process_input("Subject: Re: Quote\nMessage-ID: <b@x>\nIn-Reply-To: <a@x>\n\nMake it 10 units")
+    again = await main.process_input("Subject: Re: Quote\nMessage-ID: <b@x>\nIn-Reply-To: <a@x>\n\nMake it 10 units")
+
+    assert len(classified) == 1
+    assert second["thread_id"] == first["thread_id"]
+    assert second["classification"]["classified_intent"] == "RFQ"
+    assert contexts[0] is None and "item 1" in contexts[1]
+    assert again["duplicate"] is True and len(contexts) == 2
+    state = main.get_thread_store().get_thread(first["thread_id"])["state"]
+    assert state["messages"] == 2 and state["action_items"] == ["item 1", "item 2"]
@@ -0,0 +1,73 @@
+import pytest
+import io
+from utils import tracing
+from utils.tracing import span, start_trace, current_span, traced, to_chrome_trace, NOOP_SPAN
+from memory import get_shared_memory
+from batch import run_batch
+import main
+
+@pytest.fixture
+def tracing_enabled(monkeypatch):
+    monkeypatch.setattr(tracing, "_enabled", True)
+
+def test_spans_are_noops_without_a_trace():
+    with start_trace("doc") as trace:
+        assert trace is None
+        with span("stage") as stage:
+            assert stage is NOOP_SPAN
+            stage.set(ignored=True)
+    assert current_span() is NOOP_SPAN
+
+def test_spans_nest_and_record_errors(tracing_enabled):
+    @traced("helper")
+    def helper():
+        current_span().set(items=3)
+
+    with start_trace("doc") as trace:
+        with span("outer", kind="test"):
+            helper()
+            with pytest.raises(ValueError):
+                with span("failing"):
+                    raise ValueError("boom")
+
+    spans = {s.name: s for s in trace.spans}
+    assert spans["outer"].parent_id is None
+    assert spans["helper"].parent_id == spans["outer"].span_id
+    assert spans["helper"].attributes == {"items": 3}
+    assert spans["failing"].attributes["error"] == "ValueError"
+    assert all(s.duration_us >= 0 for s in trace.spans)
+
+def test_chrome_trace_export(tracing_enabled):
+    with start_trace("doc") as trace:
+        with span("stage", tokens=10):
+            pass
+    events = to_chrome_trace(trace.as_dicts())["traceEvents"]
+    assert events[0]["ph"] == "M" and events[0]["args"]["name"] == "doc"
+    assert events[1]["name"] == "stage" and events[1]["ph"] == "X" and events[1]["args"] == {"tokens": 10}
+
+@pytest.mark.asyncio
+async def test_process_input_persists_spans(tracing_enabled, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    response = await main.process_input("Subject: Question\n\nCould you tell me more about Widget A?", use_cache=False)
+    memory = get_shared_memory()
+    memory.flush()
+    names = [s["name"] for s in memory.get_spans(response["input_id"])]
+    assert names[0] == "process_input"
+    assert {"classify", "extract", "strip_html", "llm.call", "json.clean", "sqlite.commit"} <= set(names)
+    llm_call = next(s for s in memory.get_spans(response["input_id"]) if s["name"] == "llm.call")
+    assert llm_call["attributes"]["input_tokens"] > 0 and llm_call["attributes"]["output_tokens"] > 0
+    memory.close()
+
+@pytest.mark.asyncio
+async def test_batch_file_loading_joins_document_trace(tracing_enabled, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "doc.txt").write_text("Subject: Complaint\n\nThe delivery arrived damaged, this is unacceptable.")
+    output = io.StringIO()
+    await run_batch([str(tmp_path)], concurrency=1, output=output,
+                    process=lambda text, input_type: main.process_input(text, input_type, use_cache=False))
+    memory = get_shared_memory()
+    memory.flush()
+    input_id = memory.conn.execute("SELECT input_id FROM inputs").fetchone()[0]
+    names = [s["name"] for s in memory.get_spans(input_id)]
+    assert "read_file" in names and "process_input" in names
+    memory.close()
@@ -0,0 +1,29 @@
+import sqlite3
+from memory import SharedMemory
+from view_db import list_rows
+
+def _store(tmp_path) -> str:
+    db_path = str(tmp_path / "flowbit.db")
+    store = SharedMemory(db_path)
+    for i in range(5):
+        store.store_input(f"id-{i}", f"Subject: order {i}\n\n" + "text " * 100, "email")
+        store.store_classification(f"id-{i}", {"classified_format": "Email_Text",
+                                               "classified_intent": "RFQ" if i % 2 else "Invoice", "reasoning": "r"})
+        store.store_result(f"id-{i}", {"primary_request_summary": f"order {i}"})
+    store.close()
+    return db_path
+
+def test_list_rows_pages_by_cursor(tmp_path):
+    conn = sqlite3.connect(_store(tmp_path))
+    first = list(list_rows(conn, "results", limit=2))
+    assert [row["summary"] for row in first] == ["order 0", "order 1"]
+    cursor = f"{first[-1]['timestamp']},{first[-1]['input_id']}"
+    assert [row["input_id"] for row in list_rows(conn, "results", after=cursor)] == ["id-2", "id-3", "id-4"]
+    assert len(next(list_rows(conn, "inputs"))["preview"]) == 50
+
+def test_list_rows_filters(tmp_path):
+    conn = sqlite3.connect(_store(tmp_path))
+    assert [row["input_id"] for row in list_rows(conn, "inputs", intent="RFQ")] == ["id-1", "id-3"]
+    assert len(list(list_rows(conn, "classifications", format="Email_Text", intent="Invoice"))) == 3
+    assert list(list_rows(conn, "results", since="2999-01-01")) == []
+    assert len(list(list_rows(conn, "results", until="2999-01-01"))) == 5
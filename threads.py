@@ -0,0 +1,244 @@
+from typing import Dict, Any, List, Optional
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+# "Re:", "Fwd:", "AW:", "[External] Re:" ... prefixes removed before comparing subjects
+_SUBJECT_PREFIX_RE = re.compile(r'^\s*(?:(?:re|fw|fwd|aw|wg|sv|antw)\s*(?:\[\d+\])?\s*:|\[[^\]]{1,30}\])\s*', re.IGNORECASE)
+_REPLY_PREFIX_RE = re.compile(r'^\s*(?:\[[^\]]{1,30}\]\s*)*(?:re|fw|fwd|aw|wg|sv|antw)\s*(?:\[\d+\])?\s*:', re.IGNORECASE)
+_MESSAGE_ID_RE = re.compile(r'<[^<>\s]+>')
+_HEADER_LINE_RE = re.compile(r'^([A-Za-z][\w-]*):\s*(.*)$')
+THREAD_HEADERS = ("Subject", "Message-ID", "In-Reply-To", "References")
+# most recent action items/entities repeated to the agent, so the context stays a fixed size
+CONTEXT_ITEMS = 8
+
+def normalize_subject(subject: str) -> str:
+    """Subject with reply/forward prefixes and list tags removed, lowercased and whitespace-collapsed."""
+    previous = None
+    while previous != subject:
+        previous = subject
+        subject = _SUBJECT_PREFIX_RE.sub('', subject, count=1)
+    return re.sub(r'\s+', ' ', subject).strip().lower()
+
+def message_headers(text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    Threading headers of an email.
+
+    Taken from the MIME metadata when the message was parsed as MIME,
+    otherwise from the header block at the top of the text.
+    """
+    mime_headers = ((metadata or {}).get("mime") or {}).get("headers") or {}
+    if mime_headers:
+        return {name: mime_headers[name] for name in THREAD_HEADERS if mime_headers.get(name)}
+    headers: Dict[str, str] = {}
+    last = None
+    for line in text.lstrip().splitlines()[:50]:
+        if not line.strip():
+            break
+        if line[:1] in (' ', '\t') and last:
+            headers[last] += ' ' + line.strip()
+            continue
+        match = _HEADER_LINE_RE.match(line)
+        if not match:
+            break
+        name = next((known for known in THREAD_HEADERS if known.lower() == match.group(1).lower()), None)
+        last = name
+        if name:
+            headers[name] = match.group(2).strip()
+    return headers
+
+CREATE_THREAD_TABLE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS threads (
+        thread_id TEXT PRIMARY KEY,
+        subject_key TEXT,
+        state JSON,
+        message_count INTEGER DEFAULT 0,
+        last_input_id TEXT,
+        updated_at REAL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS thread_messages (
+        message_id TEXT PRIMARY KEY,
+        thread_id TEXT,
+        input_id TEXT,
+        classification JSON,
+        result_data JSON
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_threads_subject ON threads (subject_key, updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_thread_messages_thread ON thread_messages (thread_id)",
+    # retention archives messages and threads by the document they were processed as
+    "CREATE INDEX IF NOT EXISTS idx_thread_messages_input ON thread_messages (input_id)",
+    "CREATE INDEX IF NOT EXISTS idx_threads_last_input ON threads (last_input_id)",
+]
+
+def ensure_thread_schema(conn: sqlite3.Connection) -> None:
+    """Create the thread tables and indexes if missing; safe to run on every open."""
+    for statement in CREATE_THREAD_TABLE_SQL:
+        conn.execute(statement)
+    conn.commit()
+
+def _message_ids(value: Optional[str]) -> List[str]:
+    return _MESSAGE_ID_RE.findall(value or '')
+
+class ThreadContext:
+    """Where a message belongs: its thread, the thread's state so far, and any earlier copy of it."""
+
+    def __init__(self, thread_id: str, message_id: Optional[str], state: Optional[Dict[str, Any]],
+                 outcome: str, duplicate: Optional[Dict[str, Any]] = None):
+        self.thread_id = thread_id
+        self.message_id = message_id
+        self.state = state
+        # "started", "joined" or "duplicate"
+        self.outcome = outcome
+        self.duplicate = duplicate
+
+    @property
+    def classification(self) -> Optional[Dict[str, Any]]:
+        return (self.state or {}).get("classification")
+
+    def prompt_context(self) -> Optional[str]:
+        """Summary of earlier messages, given to the email agent alongside the new content."""
+        if not self.state:
+            return None
+        lines = [f"Earlier messages in this thread: {self.state.get('messages', 0)}."]
+        if self.state.get("summary"):
+            lines.append(f"Latest request so far: {self.state['summary']}")
+        if self.state.get("action_items"):
+            lines.append(f"Open action items: {'; '.join(map(str, self.state['action_items'][-CONTEXT_ITEMS:]))}")
+        if self.state.get("entities"):
+            lines.append(f"Entities mentioned: {', '.join(map(str, self.state['entities'][-CONTEXT_ITEMS:]))}")
+        lines.append("Extract only what the new message adds or changes.")
+        return "\n".join(lines)
+
+def _union(*lists: Optional[List[Any]]) -> List[Any]:
+    merged: Dict[str, Any] = {}
+    for values in lists:
+        for value in values or []:
+            merged.setdefault(json.dumps(value, sort_keys=True, default=str), value)
+    return list(merged.values())
+
+def merge_thread_state(state: Optional[Dict[str, Any]], classification: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold one message's extraction into the thread state; the newest message wins for scalar fields."""
+    state = dict(state or {})
+    state["messages"] = state.get("messages", 0) + 1
+    state["classification"] = {key: classification.get(key) for key in ("classified_format", "classified_intent", "reasoning")}
+    for key, field in (("summary", "primary_request_summary"), ("sender", "extracted_sender_name"),
+                       ("urgency_level", "urgency_level"), ("sentiment", "sentiment")):
+        if result.get(field):
+            state[key] = result[field]
+    state["action_items"] = _union(state.get("action_items"), result.get("action_items_implied"))
+    state["entities"] = _union(state.get("entities"), result.get("key_entities_mentioned"))
+    state["contacts"] = _union(state.get("contacts"), result.get("contact_information_in_body"))
+    return state
+
+class ThreadStore:
+    """
+    Email threads and their running state, stored next to SharedMemory.
+
+    Messages join a thread through In-Reply-To/References, or through a
+    normalized subject when a reply carries no known references. Message-IDs
+    referenced before their own message arrives are registered as
+    placeholders, so out-of-order mailboxes still end up in one thread.
+    """
+
+    def __init__(self, db_path: str = "flowbit.db", subject_window_seconds: float = 30 * 24 * 3600):
+        self.subject_window_seconds = subject_window_seconds
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.create_tables()
+
+    def create_tables(self):
+        ensure_thread_schema(self.conn)
+
+    def resolve(self, headers: Dict[str, str]) -> ThreadContext:
+        """Find or start the thread for a message and register its Message-ID."""
+        message_ids = _message_ids(headers.get("Message-ID"))
+        message_id = message_ids[0] if message_ids else None
+        # nearest ancestor first
+        references = _message_ids(headers.get("In-Reply-To")) + _message_ids(headers.get("References"))[::-1]
+        subject = headers.get("Subject", "")
+        subject_key = normalize_subject(subject)
+        now = time.time()
+        with self._lock:
+            thread_id = None
+            if message_id:
+                row = self.conn.execute(
+                    "SELECT thread_id, input_id, classification, result_data FROM thread_messages WHERE message_id = ?",
+                    (message_id,)
+                ).fetchone()
+                if row is not None:
+                    thread_id = row[0]
+                    if row[1] is not None:
+                        duplicate = {"input_id": row[1], "classification": json.loads(row[2]), "result": json.loads(row[3])}
+                        return ThreadContext(thread_id, message_id, self._state(thread_id), "duplicate", duplicate)
+            for reference in references:
+                if thread_id:
+                    break
+                row = self.conn.execute("SELECT thread_id FROM thread_messages WHERE message_id = ?", (reference,)).fetchone()
+                thread_id = row[0] if row else None
+            if thread_id is None and subject_key and _REPLY_PREFIX_RE.match(subject):
+                row = self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE subject_key = ? AND updated_at >= ? ORDER BY updated_at DESC LIMIT 1",
+                    (subject_key, now - self.subject_window_seconds)
+                ).fetchone()
+                thread_id = row[0] if row else None
+            outcome = "joined"
+            if thread_id is None:
+                thread_id, outcome = str(uuid.uuid4()), "started"
+                self.conn.execute("INSERT INTO threads (thread_id, subject_key, updated_at) VALUES (?, ?, ?)",
+                                  (thread_id, subject_key, now))
+            for known in ([message_id] if message_id else []) + references:
+                self.conn.execute("INSERT OR IGNORE INTO thread_messages (message_id, thread_id) VALUES (?, ?)", (known, thread_id))
+            self.conn.commit()
+            return ThreadContext(thread_id, message_id, self._state(thread_id), outcome)
+
+    def record(self, context: ThreadContext, input_id: str, classification: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a processed message and fold it into its thread's state; returns the new state."""
+        with self._lock:
+            if context.duplicate is not None:
+                # a reprocessed message replaces its stored result but is not counted again
+                self._store_message(context, input_id, classification, result)
+                self.conn.commit()
+                return self._state(context.thread_id)
+            state = merge_thread_state(self._state(context.thread_id), classification, result)
+            self.conn.execute(
+                "UPDATE threads SET state = ?, message_count = message_count + 1, last_input_id = ?, updated_at = ? WHERE thread_id = ?",
+                (json.dumps(state), input_id, time.time(), context.thread_id)
+            )
+            self._store_message(context, input_id, classification, result)
+            self.conn.commit()
+        return state
+
+    def _store_message(self, context: ThreadContext, input_id: str, classification: Dict[str, Any], result: Dict[str, Any]):
+        if context.message_id:
+            self.conn.execute(
+                "UPDATE thread_messages SET input_id = ?, classification = ?, result_data = ? WHERE message_id = ?",
+                (input_id, json.dumps(classification), json.dumps(result), context.message_id)
+            )
+
+    def _state(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT state FROM threads WHERE thread_id = ?", (thread_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT subject_key, state, message_count, last_input_id FROM threads WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            inputs = [r[0] for r in self.conn.execute(
+                "SELECT input_id FROM thread_messages WHERE thread_id = ? AND input_id IS NOT NULL", (thread_id,)
+            )]
+        return {"thread_id": thread_id, "subject": row[0], "state": json.loads(row[1]) if row[1] else None,
+                "message_count": row[2], "last_input_id": row[3], "input_ids": inputs}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import threading
+import zlib
+from typing import Tuple
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+# payloads smaller than this are stored as-is; compressing them saves nothing
+MIN_COMPRESS_BYTES = int(os.getenv("FLOWBIT_COMPRESS_MIN_BYTES", 256))
+ZSTD_LEVEL = int(os.getenv("FLOWBIT_ZSTD_LEVEL", 3))
+ZLIB_LEVEL = int(os.getenv("FLOWBIT_ZLIB_LEVEL", 6))
+# zstd when the zstandard package is installed, zlib otherwise
+DEFAULT_CODEC = os.getenv("FLOWBIT_BLOB_CODEC") or ("zstd" if zstandard is not None else "zlib")
+CODECS = ("raw", "zlib", "zstd")
+
+# zstandard contexts are not thread-safe; each thread keeps its own
+_local = threading.local()
+
+def _zstd_compressor():
+    if not hasattr(_local, "compressor"):
+        _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _local.compressor
+
+def _zstd_decompressor():
+    if not hasattr(_local, "decompressor"):
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def compress(data: bytes, codec: str = None) -> Tuple[str, bytes]:
+    """Compress data, returning the codec actually used with the payload."""
+    codec = codec or DEFAULT_CODEC
+    if len(data) < MIN_COMPRESS_BYTES or codec == "raw":
+        return "raw", data
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package: pip install zstandard")
+        return "zstd", _zstd_compressor().compress(data)
+    if codec == "zlib":
+        return "zlib", zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec: {codec}")
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "raw":
+        return bytes(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This database holds zstd blobs; install the zstandard package to read them")
+        return _zstd_decompressor().decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
@@ -1,6 +1,73 @@
-from bs4 import BeautifulSoup
+from html import unescape
+from html.parser import HTMLParser
+import os
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+# above this many characters HTML is converted with C-level regex passes instead of the parser
+HTML_PARSER_MAX_CHARS = int(os.getenv("FLOWBIT_HTML_PARSER_MAX_CHARS", 1_000_000))
+
+# tags that start and end a block of text
+BLOCK_TAGS = frozenset(('p', 'div'))
+# tags whose content is never text
+SKIP_TAGS = frozenset(('script', 'style'))
+
+class _TextExtractor(HTMLParser):
+    """
+    Single-pass HTML-to-text converter driven by parser events.
+
+    Emits a newline for <br> and around every <p>/<div>, drops comments,
+    declarations and script/style content, and decodes entities.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'br' or tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'br' or tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA[') and not self._skip_depth:
+            self.parts.append(data[6:])
+
+def _parse_html_text(content: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(content)
+    parser.close()
+    return ''.join(parser.parts)
+
+_SKIPPED_RE = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?(?:-->|$)|<![^\[][^>]*>|<\?[^>]*>', re.IGNORECASE | re.DOTALL)
+_CDATA_RE = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.DOTALL)
+# attribute values may contain '>'
+_ATTRS = r'''(?:[^>"']|"[^"]*"|'[^']*')*'''
+_BREAK_RE = re.compile(r'<(?:br|/?(?:p|div))(?:\s' + _ATTRS + r')?/?>', re.IGNORECASE)
+_TAG_RE = re.compile(r'</?[a-zA-Z]' + _ATTRS + r'>')
+
+def _regex_html_text(content: str) -> str:
+    """Approximate the parser's output with regex passes; used for very large documents."""
+    text = _SKIPPED_RE.sub('', content)
+    text = _CDATA_RE.sub(r'\1', text)
+    text = _BREAK_RE.sub('\n', text)
+    return unescape(_TAG_RE.sub('', text))
 
 def strip_html(content: str) -> str:
     """
@@ -18,20 +85,10 @@ def strip_html(content: str) -> str:
     # Check if content appears to be HTML
     if '<' in content and '>' in content:
         try:
-            # Parse HTML and extract text
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Handle br tags first
-            for br in soup.find_all('br'):
-                br.replace_with('\n')
-            
-            # Handle paragraphs and divs
-            for tag in soup.find_all(['p', 'div']):
-                tag.insert_before(soup.new_string('\n'))
-                tag.append(soup.new_string('\n'))
-            
-            # Get text and clean up whitespace
-            text = soup.get_text()
+            if len(content) > HTML_PARSER_MAX_CHARS:
+                text = _regex_html_text(content)
+            else:
+                text = _parse_html_text(content)
             # Normalize line endings
             text = re.sub(r'\r\n?', '\n', text)
             # Remove multiple newlines
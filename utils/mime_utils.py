@@ -0,0 +1,172 @@
+import os
+import re
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesFeedParser
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from utils.email_utils import strip_html
+from utils.pdf_utils import extract_pdf_bytes_text
+
+# only the header block is scanned when deciding whether text is a MIME message
+HEADER_SCAN_CHARS = 8192
+FEED_CHUNK_BYTES = 64 * 1024
+
+# headers rendered into the prompt text; extract_email_parts understands these
+PROMPT_HEADERS = ("Subject", "From", "To")
+# headers kept in the stored metadata
+METADATA_HEADERS = ("Subject", "From", "To", "Cc", "Date", "Message-ID", "In-Reply-To", "References")
+
+# attachment kinds that are processed as child documents, with the input_type they are processed as
+CONTENT_TYPE_KINDS = {
+    "application/pdf": "pdf",
+    "application/json": "json",
+    "text/json": "json",
+    "text/plain": "txt",
+    "message/rfc822": "email",
+}
+EXTENSION_KINDS = {".pdf": "pdf", ".json": "json", ".txt": "txt", ".eml": "email"}
+
+# an RFC 5322 field name followed by a colon
+_HEADER_LINE_RE = re.compile(r'[!-9;-~]+:')
+_MIME_HEADER_RE = re.compile(r'^(?:mime-version|content-type|content-transfer-encoding)[ \t]*:', re.IGNORECASE | re.MULTILINE)
+_BLANK_LINE_RE = re.compile(r'\r?\n[ \t]*\r?\n')
+
+def is_mime_message(text: str) -> bool:
+    """True if the text starts with an RFC 5322 header block that declares MIME content."""
+    header_block = _BLANK_LINE_RE.split(text[:HEADER_SCAN_CHARS].lstrip(), 1)[0]
+    return bool(_HEADER_LINE_RE.match(header_block)) and bool(_MIME_HEADER_RE.search(header_block))
+
+def _clean(text: str) -> str:
+    # undecodable bytes come through as surrogates, which SQLite and the LLM client reject
+    return text.encode('utf-8', 'replace').decode('utf-8')
+
+def _decode_text(part: EmailMessage) -> str:
+    try:
+        content = part.get_content()
+    except (LookupError, UnicodeError, KeyError):
+        content = part.get_payload(decode=True) or b''
+    if isinstance(content, bytes):
+        # non-text parts (application/json) come back undecoded
+        try:
+            content = content.decode(part.get_content_charset() or 'utf-8', 'replace')
+        except LookupError:
+            content = content.decode('utf-8', 'replace')
+    return _clean(content)
+
+def _encoded_size(part: EmailMessage) -> int:
+    """Decoded size of a leaf part, estimated without decoding it."""
+    payload = part.get_payload()
+    if not isinstance(payload, str):
+        return len(part.as_bytes())
+    if part.get('Content-Transfer-Encoding', '').lower() == 'base64':
+        return len(payload.replace('\n', '').replace('\r', '')) * 3 // 4
+    return len(payload)
+
+class Attachment:
+    """A non-body MIME part; the payload is only decoded when text() is called."""
+
+    __slots__ = ('filename', 'content_type', 'kind', 'size', '_part')
+
+    def __init__(self, part: EmailMessage, kind: Optional[str]):
+        self.filename = _clean(part.get_filename() or '')
+        self.content_type = part.get_content_type()
+        self.kind = kind
+        self.size = _encoded_size(part)
+        self._part = part
+
+    @property
+    def input_type(self) -> Optional[str]:
+        return self.kind
+
+    def text(self) -> str:
+        """Decode the part into the text it is processed as."""
+        if self.kind == "pdf":
+            return extract_pdf_bytes_text(self._part.get_payload(decode=True) or b'')
+        if self.kind == "email":
+            if self.content_type == "message/rfc822":
+                return self._part.get_payload()[0].as_bytes().decode('utf-8', 'replace')
+            return (self._part.get_payload(decode=True) or b'').decode('utf-8', 'replace')
+        return _decode_text(self._part)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"filename": self.filename, "content_type": self.content_type, "kind": self.kind, "size": self.size}
+
+class ParsedEmail:
+    """Headers, best text body and attachments of one MIME message."""
+
+    def __init__(self, headers: Dict[str, str], body: str, body_type: Optional[str],
+                 attachments: List[Attachment], dropped: List[Attachment]):
+        self.headers = headers
+        self.body = body
+        self.body_type = body_type
+        self.attachments = attachments
+        self.dropped = dropped
+
+    def prompt_text(self) -> str:
+        """Plain-text rendering sent to the agents: a short header block, the body and an attachment list."""
+        lines = [f"{name}: {self.headers[name]}" for name in PROMPT_HEADERS if self.headers.get(name)]
+        text = "\n".join(lines) + "\n\n" + self.body.strip()
+        listed = self.attachments + self.dropped
+        if listed:
+            names = ", ".join(f"{a.filename or 'unnamed'} ({a.content_type}, {a.size / 1024:.1f} KB)" for a in listed)
+            text += f"\n\n[Attachments: {names}]"
+        return text.strip()
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "headers": self.headers,
+            "body_type": self.body_type,
+            "attachments": [a.as_dict() for a in self.attachments],
+            "dropped_parts": [a.as_dict() for a in self.dropped],
+        }
+
+def _leaf_parts(part: EmailMessage, in_alternative: bool = False) -> Iterator[Tuple[EmailMessage, bool]]:
+    """Walk non-multipart parts, noting which ones are alternative renderings of the same content."""
+    if part.get_content_maintype() == 'multipart':
+        alternative = part.get_content_subtype() == 'alternative'
+        for sub in part.iter_parts():
+            yield from _leaf_parts(sub, alternative)
+    else:
+        yield part, in_alternative
+
+def _attachment_kind(part: EmailMessage) -> Optional[str]:
+    extension = os.path.splitext(part.get_filename() or '')[1].lower()
+    return EXTENSION_KINDS.get(extension) or CONTENT_TYPE_KINDS.get(part.get_content_type())
+
+def parse_mime(source: Union[str, bytes], chunk_size: int = FEED_CHUNK_BYTES) -> ParsedEmail:
+    """
+    Parse an RFC 5322 / MIME message.
+
+    The message is fed to the parser in chunks. Only the chosen text body is
+    decoded here (text/plain preferred, HTML stripped otherwise); attachments
+    are decoded on demand, and parts that are neither text, PDF, JSON nor
+    message/rfc822 are listed as dropped and never decoded.
+    """
+    data = source.encode('utf-8', 'surrogateescape') if isinstance(source, str) else source
+    parser = BytesFeedParser(policy=policy.default)
+    for start in range(0, len(data), chunk_size):
+        parser.feed(data[start:start + chunk_size])
+    message = parser.close()
+
+    headers = {name: _clean(str(message[name])) for name in METADATA_HEADERS if message[name] is not None}
+    body_part = message.get_body(preferencelist=('plain', 'html'))
+    body, body_type = "", None
+    if body_part is not None:
+        body_type = body_part.get_content_subtype()
+        body = _decode_text(body_part)
+        if body_type == 'html':
+            body = strip_html(body)
+
+    attachments: List[Attachment] = []
+    dropped: List[Attachment] = []
+    for part, alternative in _leaf_parts(message):
+        if part is body_part or (alternative and not part.is_attachment()):
+            continue
+        # unnamed inline text (e.g. a footer part) belongs to the body
+        if part.get_content_type() in ('text/plain', 'text/html') and not part.is_attachment() and not part.get_filename():
+            extra = _decode_text(part)
+            body += "\n\n" + (strip_html(extra) if part.get_content_subtype() == 'html' else extra)
+            continue
+        kind = _attachment_kind(part)
+        (attachments if kind else dropped).append(Attachment(part, kind))
+    return ParsedEmail(headers, body, body_type, attachments, dropped)
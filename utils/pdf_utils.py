@@ -0,0 +1,128 @@
+import asyncio
+import atexit
+import fitz
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from utils.tracing import span
+
+# Documents with fewer pages are decoded in-process; the pool only pays off for large files
+PARALLEL_PAGE_THRESHOLD = 64
+PAGES_PER_TASK = 32
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared page-extraction process pool, starting it on first use."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _process_pool
+
+@atexit.register
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+def open_pdf(pdf_path: str) -> fitz.Document:
+    """
+    Open and validate a PDF in one step.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is not a readable PDF
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        raise ValueError(f"Invalid PDF file: {str(e)}")
+    if not doc.is_pdf:
+        doc.close()
+        raise ValueError("Invalid PDF file")
+    return doc
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """Yield the text of each page in order, opening the file once."""
+    doc = open_pdf(pdf_path)
+    try:
+        for page in doc:
+            yield page.get_text()
+    finally:
+        doc.close()
+
+async def aiter_pdf_pages(pdf_path: str) -> AsyncIterator[str]:
+    """Async variant of iter_pdf_pages; each page is decoded off the event loop."""
+    loop = asyncio.get_running_loop()
+    doc = await loop.run_in_executor(None, open_pdf, pdf_path)
+    try:
+        for page_number in range(doc.page_count):
+            yield await loop.run_in_executor(None, lambda n=page_number: doc[n].get_text())
+    finally:
+        doc.close()
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> str:
+    """Worker task: extract a contiguous range of pages."""
+    doc = fitz.open(pdf_path)
+    try:
+        return "".join(doc[n].get_text() for n in range(start, stop))
+    finally:
+        doc.close()
+
+def _page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+def extract_pdf_text(pdf_path: str, parallel_threshold: int = PARALLEL_PAGE_THRESHOLD) -> str:
+    """
+    Extract the full text of a PDF.
+
+    Small documents are decoded in the calling process. Documents with at
+    least parallel_threshold pages are split into page ranges decoded in
+    the shared process pool.
+    """
+    doc = open_pdf(pdf_path)
+    try:
+        page_count = doc.page_count
+        if page_count < parallel_threshold:
+            return "".join(page.get_text() for page in doc)
+    finally:
+        doc.close()
+
+    pool = get_process_pool()
+    futures = [pool.submit(_extract_page_range, pdf_path, start, stop)
+               for start, stop in _page_ranges(page_count, PAGES_PER_TASK)]
+    return "".join(future.result() for future in futures)
+
+async def extract_pdf_text_async(pdf_path: str, parallel_threshold: int = PARALLEL_PAGE_THRESHOLD) -> str:
+    """Non-blocking extract_pdf_text for use inside the event loop."""
+    loop = asyncio.get_running_loop()
+    with span("pdf.extract") as extract_span:
+        doc = await loop.run_in_executor(None, open_pdf, pdf_path)
+        try:
+            page_count = doc.page_count
+            extract_span.set(pages=page_count, parallel=page_count >= parallel_threshold)
+            if page_count < parallel_threshold:
+                return await loop.run_in_executor(None, lambda: "".join(page.get_text() for page in doc))
+        finally:
+            doc.close()
+
+        pool = get_process_pool()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(pool, _extract_page_range, pdf_path, start, stop)
+            for start, stop in _page_ranges(page_count, PAGES_PER_TASK)
+        ))
+        return "".join(chunks)
+
+def extract_pdf_bytes_text(data: bytes) -> str:
+    """Extract the text of an in-memory PDF, such as an email attachment."""
+    try:
+        doc = fitz.open(stream=data, filetype="pdf")
+    except Exception as e:
+        raise ValueError(f"Invalid PDF file: {str(e)}")
+    try:
+        return "".join(page.get_text() for page in doc)
+    finally:
+        doc.close()
@@ -0,0 +1,194 @@
+import asyncio
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Any, Optional
+from collections import deque
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# errors that mean the provider is overloaded, as opposed to a bad request or response
+OVERLOAD_ERRORS = (ResourceExhausted, ServiceUnavailable, DeadlineExceeded, asyncio.TimeoutError)
+
+def is_overload_error(error: BaseException) -> bool:
+    return isinstance(error, OVERLOAD_ERRORS)
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute.
+
+    capacity bounds the burst; requests larger than the bucket are clamped
+    to it so a single huge prompt waits for a full bucket instead of forever.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, amount: float) -> float:
+        """Take amount tokens if available; return 0, or the seconds to wait before retrying."""
+        amount = min(amount, self.capacity)
+        self._refill(time.monotonic())
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one provider.
+
+    A limit of 0 disables that bucket. pause() holds every caller back, which
+    is how a 429 with a retry-after hint is applied to the whole process
+    instead of to the single call that saw it.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, burst_fraction: float = 0.1):
+        self.requests = TokenBucket(requests_per_minute, max(1.0, requests_per_minute * burst_fraction)) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, max(1.0, tokens_per_minute * burst_fraction)) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        logger.warning(f"Rate limited by provider, pausing LLM calls for {seconds:.2f}s")
+
+    async def acquire(self, tokens: float = 0) -> None:
+        """Wait until one request of the given token size is allowed."""
+        started = time.monotonic()
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay <= 0:
+                delay = self.requests.try_consume(1) if self.requests else 0.0
+                if delay <= 0 and self.tokens:
+                    delay = self.tokens.try_consume(tokens)
+                    if delay > 0 and self.requests:
+                        # Give back the request slot taken above
+                        self.requests.tokens = min(self.requests.capacity, self.requests.tokens + 1)
+                if delay <= 0:
+                    break
+            await asyncio.sleep(delay)
+        self.acquired += 1
+        self.waited_seconds += time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        return {"acquired": self.acquired, "waited_seconds": round(self.waited_seconds, 3)}
+
+# moving-average weights for the recent and long-run latency estimates
+RECENT_LATENCY_WEIGHT = 0.3
+BASELINE_LATENCY_WEIGHT = 0.02
+
+class AIMDController:
+    """
+    Adaptive limit on concurrent LLM calls (additive increase, multiplicative decrease).
+
+    Every healthy completion while the limit is in use adds 1/limit, so the
+    limit grows by about one per round trip. An overload error, or a recent
+    (fast-moving average) latency above latency_tolerance times the long-run
+    average, cuts the limit by decrease_factor. Calls that started before the
+    last cut cannot cut it again, so one burst of failures counts once.
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 64,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 2.0, latency_slack: float = 0.05):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack = latency_slack
+        self.in_flight = 0
+        self.recent_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.increases = 0
+        self.decreases = 0
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass to release()."""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._wake()
+                raise
+        self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, error: Optional[BaseException] = None) -> None:
+        now = time.monotonic()
+        latency = now - started
+        was_saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+
+        if error is not None and not is_overload_error(error):
+            # Bad requests say nothing about provider capacity
+            self._wake()
+            return
+
+        if error is None:
+            # Single samples vary too much (prompt and output length) to judge on their own
+            if self.baseline_latency is None:
+                self.recent_latency = self.baseline_latency = latency
+            else:
+                self.recent_latency += (latency - self.recent_latency) * RECENT_LATENCY_WEIGHT
+                self.baseline_latency += (latency - self.baseline_latency) * BASELINE_LATENCY_WEIGHT
+        healthy = error is None and self.recent_latency <= max(self.baseline_latency * self.latency_tolerance,
+                                                               self.baseline_latency + self.latency_slack)
+
+        if healthy:
+            if was_saturated and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.increases += 1
+        elif started >= self.last_decrease:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self.last_decrease = now
+            self.decreases += 1
+            logger.info(f"LLM concurrency limit cut to {int(self.limit)} ({'error' if error else f'latency {self.recent_latency:.2f}s'})")
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        started = await self.acquire()
+        try:
+            yield
+        except BaseException as e:
+            self.release(started, e)
+            raise
+        else:
+            self.release(started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "recent_latency_seconds": round(self.recent_latency, 4) if self.recent_latency is not None else None,
+            "baseline_latency_seconds": round(self.baseline_latency, 4) if self.baseline_latency is not None else None,
+        }
@@ -0,0 +1,166 @@
+import re
+from typing import Any, Dict, List, Optional
+
+# quoted history starts at an attribution or an Outlook-style separator
+_ATTRIBUTION_RE = re.compile(
+    r'^\s*(?:On\b.{0,300}\bwrote|Am\b.{0,300}\bschrieb|Le\b.{0,300}\ba écrit)\s*:\s*$', re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r'^\s*(?:-{2,}\s*Original Message\s*-{2,}|_{10,})\s*$', re.IGNORECASE)
+_FORWARD_RE = re.compile(r'^\s*(?:-{2,}\s*Forwarded message\s*-{2,}|Begin forwarded message:)\s*$', re.IGNORECASE)
+_HEADER_RE = re.compile(r'^\s*\*?(From|Sent|Date|To|Cc|Subject)\*?:', re.IGNORECASE)
+# any other RFC 5322 field name, accepted once a header block has started
+_FIELD_RE = re.compile(r'^\s*[A-Za-z][\w-]*:\s')
+_QUOTE_RE = re.compile(r'^\s*>')
+# RFC 3676 signature delimiter, plus client boilerplate
+_SIGNATURE_DELIMITER_RE = re.compile(r'^--\s?$')
+_MOBILE_SIGNATURE_RE = re.compile(r'^\s*(?:Sent from my \w+|Get Outlook for \w+)', re.IGNORECASE)
+_CONTACT_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s().-]{7,}\d')
+_DISCLAIMER_RES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'\bconfidential',
+    r'\bprivileged\b',
+    r'\bintended (?:solely |only )?for the (?:use of the )?(?:named )?(?:addressee|recipient|individual)',
+    r'\breceived this (?:e-?mail|message|communication) in error',
+    r'\bdisclaimer\b',
+    r'\b(?:unauthori[sz]ed|any) (?:use|disclosure|copying|distribution)',
+)]
+# lines appended by the MIME parser that must survive reduction
+_PROTECTED_RE = re.compile(r'^\[Attachments: ')
+
+class Reduction:
+    """Reduced email text and the spans that were removed from it."""
+
+    def __init__(self, text: str, stripped: List[Dict[str, Any]], original_chars: int):
+        self.text = text
+        self.stripped = stripped
+        self.original_chars = original_chars
+
+    @property
+    def removed_chars(self) -> int:
+        return self.original_chars - len(self.text)
+
+def _body_start(lines: List[str]) -> int:
+    """Skip the message's own header block so it is not mistaken for a quoted reply header."""
+    first = 0
+    while first < len(lines) and not lines[first].strip():
+        first += 1
+    if first == len(lines) or not _HEADER_RE.match(lines[first]):
+        return 0
+    index = first + 1
+    while index < len(lines) and (_HEADER_RE.match(lines[index]) or _FIELD_RE.match(lines[index])):
+        index += 1
+    return index
+
+def _forward_header_end(lines: List[str], marker: int, end: int) -> int:
+    """Index after the From:/Date:/Subject: block that follows a forwarded-message marker."""
+    index = marker + 1
+    while index < end and index - marker <= 12 and (_HEADER_RE.match(lines[index]) or not lines[index].strip()):
+        index += 1
+    return index
+
+def _history_start(lines: List[str], start: int) -> Optional[int]:
+    # a From:/Date: block with nothing above it is the message's own header, not a reply header
+    seen_content = any(line.strip() for line in lines[:start])
+    index = start - 1
+    while index + 1 < len(lines):
+        index += 1
+        line = lines[index]
+        at_top = not seen_content
+        seen_content = seen_content or bool(line.strip())
+        # a forwarded message's own headers are not a reply header
+        if _FORWARD_RE.match(line):
+            index = _forward_header_end(lines, index, len(lines)) - 1
+            continue
+        if _SEPARATOR_RE.match(line) or _ATTRIBUTION_RE.match(line):
+            return index
+        # attributions are often wrapped: "On Mon, 1 Jan 2024, Jane Doe <jane@example.com>\nwrote:"
+        if index + 1 < len(lines) and line.lstrip().lower().startswith('on ') and \
+                _ATTRIBUTION_RE.match(f"{line} {lines[index + 1].strip()}"):
+            return index
+        # Outlook reply headers: From: followed by Sent:/Date: without an attribution line
+        if not at_top and line.lstrip().lower().startswith(('from:', '*from:*')) and index + 1 < len(lines) and \
+                re.match(r'^\s*\*?(?:Sent|Date)\*?:', lines[index + 1], re.IGNORECASE):
+            return index
+    return None
+
+def _is_disclaimer(paragraph: str) -> bool:
+    return sum(1 for pattern in _DISCLAIMER_RES if pattern.search(paragraph)) >= 2
+
+def reduce_reply_chain(text: str) -> Reduction:
+    """
+    Remove quoted history, signatures and legal disclaimers from an email.
+
+    Detects "On ... wrote:" attributions, Outlook separators and reply
+    headers, ">" quoted lines, forwarded-message header blocks (the
+    forwarded body is kept), "-- " signatures (contact lines are kept) and
+    disclaimer paragraphs. Every removed span is returned with its kind and
+    offsets into the line-ending-normalized text. If nothing but quoted
+    text would remain, the email is returned unchanged.
+    """
+    normalized = text.replace('\r\n', '\n')
+    lines = normalized.split('\n')
+    kinds: List[Optional[str]] = [None] * len(lines)
+    protected = [bool(_PROTECTED_RE.match(line)) for line in lines]
+    start = _body_start(lines)
+
+    history = _history_start(lines, start)
+    end = len(lines)
+    if history is not None:
+        for index in range(history, len(lines)):
+            if not protected[index]:
+                kinds[index] = "quote"
+        end = history
+
+    for index in range(start, end):
+        line = lines[index]
+        if _QUOTE_RE.match(line):
+            kinds[index] = "quote"
+        elif _MOBILE_SIGNATURE_RE.match(line):
+            kinds[index] = "signature"
+        elif _FORWARD_RE.match(line):
+            for header in range(index, _forward_header_end(lines, index, end)):
+                if lines[header].strip():
+                    kinds[header] = "forward_header"
+
+    for index in range(start, end):
+        if _SIGNATURE_DELIMITER_RE.match(lines[index]):
+            for sig in range(index, end):
+                if sig > index and not lines[sig].strip():
+                    break
+                if kinds[sig] is None and not protected[sig] and not (sig > index and _CONTACT_RE.search(lines[sig])):
+                    kinds[sig] = "signature"
+            break
+
+    # disclaimers are whole paragraphs
+    paragraph: List[int] = []
+    for index in range(start, end + 1):
+        if index < end and lines[index].strip():
+            paragraph.append(index)
+            continue
+        if paragraph and _is_disclaimer(" ".join(lines[i] for i in paragraph)):
+            for i in paragraph:
+                if kinds[i] is None and not protected[i]:
+                    kinds[i] = "disclaimer"
+        paragraph = []
+
+    if not any(kind is None and line.strip() for kind, line in zip(kinds[start:], lines[start:])):
+        return Reduction(normalized, [], len(normalized))
+
+    kept: List[str] = []
+    stripped: List[Dict[str, Any]] = []
+    offset = 0
+    for index, line in enumerate(lines):
+        line_end = offset + len(line) + (1 if index < len(lines) - 1 else 0)
+        kind = kinds[index]
+        if kind is None:
+            if protected[index] and kept and kept[-1].strip():
+                kept.append('')
+            kept.append(line)
+        elif stripped and stripped[-1]["kind"] == kind and stripped[-1]["end"] == offset:
+            stripped[-1]["end"] = line_end
+        else:
+            stripped.append({"kind": kind, "start": offset, "end": line_end})
+        offset = line_end
+    for span in stripped:
+        span["text"] = normalized[span["start"]:span["end"]]
+
+    reduced = re.sub(r'\n{3,}', '\n\n', '\n'.join(kept)).strip()
+    return Reduction(reduced, stripped, len(normalized))
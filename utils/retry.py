@@ -1,8 +1,13 @@
+import asyncio
 import functools
+import random
+import re
 import time
 import logging
-from typing import Type, Tuple, Optional
+from typing import Type, Tuple, Optional, Dict, Any
 from langchain_core.exceptions import OutputParserException  # Changed import
+from utils.tracing import span
+from utils.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
@@ -10,47 +15,160 @@ class RetryError(Exception):
     """Custom error for retry failures"""
     pass
 
+class RetryStats:
+    """Counters for a single retried function."""
+
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.successes = 0
+        self.giveups = 0
+        self.total_backoff = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "successes": self.successes,
+            "giveups": self.giveups,
+            "total_backoff_seconds": round(self.total_backoff, 3),
+        }
+
+# stats for every wrapped function, keyed by module.qualname
+_retry_stats: Dict[str, RetryStats] = {}
+
+def get_retry_stats() -> Dict[str, Dict[str, Any]]:
+    """Return retry counters for every wrapped function."""
+    return {name: stats.as_dict() for name, stats in _retry_stats.items()}
+
+def _retry_samples():
+    for name, stats in list(_retry_stats.items()):
+        yield {"function": name, "outcome": "retry"}, stats.retries
+        yield {"function": name, "outcome": "giveup"}, stats.giveups
+
+REGISTRY.register_callback("flowbit_retries_total", "Retried attempts and exhausted calls per wrapped function",
+                           ("function", "outcome"), _retry_samples, type="counter")
+
+def reset_retry_stats() -> None:
+    for name in _retry_stats:
+        _retry_stats[name] = RetryStats()
+
+_RETRY_AFTER_PATTERNS = (
+    re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE),
+)
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extract a server-provided retry-after hint from an exception.
+
+    Args:
+        error: Exception raised by the wrapped call
+
+    Returns:
+        Delay in seconds, or None if the error carries no hint
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is None:
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('Retry-After') or headers.get('retry-after')
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            return None
+
+    message = str(error)
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
 def retry_with_exponential_backoff(
     max_retries: int = 3,
     base_delay: float = 1,
     max_delay: float = 10,
     exceptions: Tuple[Type[Exception], ...] = (OutputParserException, ConnectionError),  # Updated exceptions
     logger: Optional[logging.Logger] = None,
+    jitter: bool = True,
+    max_total_time: Optional[float] = None,
 ):
     """
-    Decorator for retrying functions with exponential backoff.
-    
+    Decorator for retrying coroutines with exponential backoff.
+
+    Sleeps with asyncio.sleep so other in-flight work keeps running while a
+    call backs off.
+
     Args:
         max_retries: Maximum number of retry attempts
         base_delay: Initial delay between retries in seconds
         max_delay: Maximum delay between retries in seconds
         exceptions: Tuple of exceptions to catch and retry
         logger: Logger instance for logging retry attempts
+        jitter: Randomize each delay ("full jitter") to avoid thundering herds
+        max_total_time: Give up once this many seconds have been spent on a call
     """
     def decorator(func):
+        stats = _retry_stats.setdefault(f"{func.__module__}.{func.__qualname__}", RetryStats())
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
+            with span(func.__name__) as call_span:
+                return await _call_with_retries(call_span, *args, **kwargs)
+
+        async def _call_with_retries(call_span, *args, **kwargs):
             local_logger = logger or logging.getLogger(func.__module__)
-            
+            started = time.monotonic()
+            stats.calls += 1
+            backoff = 0.0
+
             for attempt in range(max_retries + 1):
+                call_span.set(attempts=attempt + 1, backoff_seconds=round(backoff, 3))
+                stats.attempts += 1
                 try:
-                    return await func(*args, **kwargs)
-                    
+                    result = await func(*args, **kwargs)
+                    stats.successes += 1
+                    return result
+
                 except exceptions as e:
                     if attempt == max_retries:
+                        stats.giveups += 1
                         local_logger.error(
                             f"Failed after {max_retries} retries. Final error: {str(e)}"
                         )
                         raise RetryError(f"Max retries ({max_retries}) exceeded. Last error: {str(e)}")
-                    
-                    delay = min(base_delay * (2 ** attempt), max_delay)
+
+                    retry_after = get_retry_after(e)
+                    if retry_after is not None:
+                        delay = retry_after
+                    else:
+                        delay = min(base_delay * (2 ** attempt), max_delay)
+                        if jitter:
+                            delay = random.uniform(0, delay)
+
+                    elapsed = time.monotonic() - started
+                    if max_total_time is not None and elapsed + delay > max_total_time:
+                        stats.giveups += 1
+                        local_logger.error(
+                            f"Giving up after {elapsed:.2f}s (budget {max_total_time:.2f}s). Final error: {str(e)}"
+                        )
+                        raise RetryError(f"Retry time budget ({max_total_time}s) exceeded. Last error: {str(e)}")
+
                     local_logger.warning(
                         f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}. "
                         f"Retrying in {delay:.2f} seconds..."
                     )
-                    
-                    time.sleep(delay)
-            
+                    stats.retries += 1
+                    stats.total_backoff += delay
+                    backoff += delay
+                    await asyncio.sleep(delay)
+
             return None  # Should never reach here
+
+        wrapper.retry_stats = stats
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,241 @@
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tracing is off unless FLOWBIT_TRACING is set; spans then cost one context lookup
+_enabled = os.getenv("FLOWBIT_TRACING", "").lower() in ("1", "true", "yes")
+# Optional JSONL file every finished trace is appended to
+TRACE_FILE = os.getenv("FLOWBIT_TRACE_FILE")
+
+def enable_tracing(enabled: bool = True) -> None:
+    global _enabled
+    _enabled = enabled
+
+def is_tracing_enabled() -> bool:
+    return _enabled
+
+class Span:
+    """A named, timed stage of one trace."""
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'start_us', 'duration_us', 'lane', 'attributes')
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_us = time.time_ns() // 1000
+        self.duration_us = 0
+        self.lane = _lane()
+        self.attributes = attributes
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_us": self.start_us,
+            "duration_us": self.duration_us,
+            "lane": self.lane,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    """Stand-in returned when no trace is active; setting attributes does nothing."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+def _lane() -> str:
+    """Timeline lane: the asyncio task, or the thread outside the event loop."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return f"task-{id(task):x}" if task is not None else threading.current_thread().name
+
+class Trace:
+    """All spans recorded for one document, keyed by its input_id."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        self._callbacks: List[Callable[["Trace"], None]] = []
+
+    def new_span_id(self) -> int:
+        return next(self._ids)
+
+    def add_span(self, name: str, start_us: int, duration_us: int, parent_id: Optional[int] = None, **attributes: Any) -> Span:
+        """Record a span measured elsewhere, e.g. by the SQLite writer thread."""
+        span = Span(name, self.new_span_id(), parent_id, attributes)
+        span.start_us = start_us
+        span.duration_us = duration_us
+        self.spans.append(span)
+        return span
+
+    def on_finish(self, callback: Callable[["Trace"], None]) -> None:
+        self._callbacks.append(callback)
+
+    def finish(self) -> None:
+        for callback in self._callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.warning(f"Trace callback failed: {str(e)}")
+        if TRACE_FILE:
+            append_jsonl(self, TRACE_FILE)
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [{"trace_id": self.trace_id, **span.as_dict()} for span in self.spans]
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("flowbit_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("flowbit_span", default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def current_span():
+    """The innermost open span, or a no-op span when tracing is inactive."""
+    return _current_span.get() or NOOP_SPAN
+
+class _TraceContext:
+    def __init__(self, trace_id: Optional[str]):
+        self.trace_id = trace_id
+        self.trace: Optional[Trace] = None
+        self.token = None
+        self.span_token = None
+
+    def __enter__(self) -> Optional[Trace]:
+        if not _enabled:
+            return None
+        existing = _current_trace.get()
+        # An outer caller (e.g. the batch runner timing file loading) may have opened an anonymous trace
+        if existing is not None and existing.trace_id is None:
+            existing.trace_id = self.trace_id
+            return existing
+        self.trace = Trace(self.trace_id)
+        self.token = _current_trace.set(self.trace)
+        self.span_token = _current_span.set(None)
+        return self.trace
+
+    def __exit__(self, *exc_info) -> None:
+        if self.trace is not None:
+            _current_span.reset(self.span_token)
+            _current_trace.reset(self.token)
+            self.trace.finish()
+
+def start_trace(trace_id: Optional[str] = None) -> _TraceContext:
+    """
+    Open a trace for one document.
+
+    Joins an enclosing anonymous trace if there is one; the outermost trace
+    runs its on_finish callbacks when it exits. Yields None when disabled.
+    """
+    return _TraceContext(trace_id)
+
+class _SpanContext:
+    __slots__ = ('trace', 'span', 'token', 'started')
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        parent = _current_span.get()
+        self.span = Span(name, trace.new_span_id(), parent.span_id if parent else None, attributes)
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        self.started = time.perf_counter_ns()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.duration_us = (time.perf_counter_ns() - self.started) // 1000
+        if exc_type is not None:
+            self.span.attributes["error"] = exc_type.__name__
+        _current_span.reset(self.token)
+        self.trace.spans.append(self.span)
+
+class _NoopContext:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+_NOOP_CONTEXT = _NoopContext()
+
+def span(name: str, **attributes: Any):
+    """Time a block as a child of the current span; a shared no-op when no trace is active."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_CONTEXT
+    return _SpanContext(trace, name, attributes)
+
+def traced(name: Optional[str] = None):
+    """Decorator that wraps every call of a function or coroutine in a span."""
+    def decorator(func):
+        label = name or func.__qualname__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(label):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# export
+def to_chrome_trace(spans: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert span dicts to the Chrome trace event format.
+
+    Load the result in chrome://tracing or https://ui.perfetto.dev. Each
+    trace becomes a process and each task or thread a row.
+    """
+    pids: Dict[Any, int] = {}
+    tids: Dict[Any, int] = {}
+    events: List[Dict[str, Any]] = []
+    for span_dict in spans:
+        trace_id = span_dict.get("trace_id")
+        if trace_id not in pids:
+            pids[trace_id] = len(pids) + 1
+            events.append({"name": "process_name", "ph": "M", "pid": pids[trace_id], "args": {"name": str(trace_id)}})
+        lane = (trace_id, span_dict.get("lane"))
+        if lane not in tids:
+            tids[lane] = len(tids) + 1
+        events.append({
+            "name": span_dict["name"],
+            "ph": "X",
+            "ts": span_dict["start_us"],
+            "dur": span_dict["duration_us"],
+            "pid": pids[trace_id],
+            "tid": tids[lane],
+            "args": span_dict.get("attributes") or {},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def append_jsonl(trace: Trace, path: str) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        for span_dict in trace.as_dicts():
+            f.write(json.dumps(span_dict, default=str) + "\n")
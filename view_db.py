@@ -1,5 +1,12 @@
 import sqlite3
 import json
+import math
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from memory import (SELECT_INPUT_SQL, SELECT_RESULT_SQL, SELECT_SPANS_SQL, SELECT_STRIPPED_SPANS_SQL, blob_text,
+                    ensure_schema, register_blob_functions, span_row)
+from utils.tracing import to_chrome_trace
 from tabulate import tabulate
 import typer
 from rich.console import Console
@@ -9,66 +16,253 @@ app = typer.Typer()
 console = Console()
 
 def connect_db():
-    return sqlite3.connect("flowbit.db")
+    conn = sqlite3.connect("flowbit.db")
+    # databases written by older versions get the listing indexes and summary column on first view
+    ensure_schema(conn)
+    register_blob_functions(conn)
+    return conn
 
-@app.command()
-def view_inputs():
-    """View all stored inputs"""
-    conn = connect_db()
-    cursor = conn.execute("SELECT input_id, input_text, timestamp, input_type FROM inputs")
-    data = cursor.fetchall()
-    
-    table = Table(title="Stored Inputs")
-    table.add_column("ID", style="cyan")
-    table.add_column("Text", style="green")
-    table.add_column("Timestamp", style="magenta")
-    table.add_column("Type", style="yellow")
-    
-    for row in data:
-        table.add_row(str(row[0]), str(row[1])[:50] + "...", str(row[2]), str(row[3]))
-    
-    console.print(table)
+def fetch_spans(conn, input_id: Optional[str] = None):
+    """Stored spans for one input, or for all inputs; empty if nothing was ever traced."""
+    try:
+        if input_id:
+            rows = conn.execute(SELECT_SPANS_SQL, (input_id,))
+        else:
+            rows = conn.execute(SELECT_SPANS_SQL.replace("WHERE input_id = ? ", ""))
+        return [span_row(row) for row in rows]
+    except sqlite3.OperationalError:
+        return []
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1] if ordered else 0.0
+
+def _latency_row(durations_us: List[int]) -> Dict[str, Any]:
+    ordered = sorted(durations_us)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(_percentile(ordered, 50) / 1000, 2),
+        "p95_ms": round(_percentile(ordered, 95) / 1000, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) / 1000, 2) if ordered else 0.0,
+    }
+
+def compute_stats(conn) -> Dict[str, Any]:
+    """
+    Aggregate operational numbers from the stored records.
+
+    Document counts come from every stored input; latencies, retries, cache
+    hits and commit times need spans, so they cover traced runs only.
+    """
+    try:
+        documents = conn.execute("""
+            SELECT COALESCE(c.format, 'unclassified'), COALESCE(c.intent, 'unclassified'), COUNT(*)
+            FROM inputs i LEFT JOIN classifications c ON c.input_id = i.input_id
+            GROUP BY 1, 2 ORDER BY 3 DESC
+        """).fetchall()
+        register_blob_functions(conn)
+        failed = conn.execute("""
+            SELECT COUNT(*) FROM results r LEFT JOIN blobs b ON b.hash = r.result_hash
+            WHERE json_extract(COALESCE(r.result_data, flowbit_blob(b.codec, b.data)), '$.error') IS NOT NULL
+        """).fetchone()[0]
+    except sqlite3.OperationalError:
+        documents, failed = [], 0
+
+    spans = fetch_spans(conn)
+    stages: Dict[str, List[int]] = {}
+    chains: Dict[str, List[int]] = {}
+    commits: Dict[int, int] = {}
+    retries = giveups = hits = lookups = 0
+    for span in spans:
+        attributes = span["attributes"]
+        if span["name"] == "sqlite.commit":
+            # One commit is recorded on every trace it wrote for; count it once
+            commits[span["start_us"]] = span["duration_us"]
+            continue
+        stages.setdefault(span["name"], []).append(span["duration_us"])
+        if "chain" in attributes:
+            chains.setdefault(attributes["chain"], []).append(span["duration_us"])
+            retries += attributes.get("attempts", 1) - 1
+            giveups += attributes.get("error") == "RetryError"
+        if span["name"] == "cache.lookup":
+            lookups += 1
+            hits += bool(attributes.get("hit"))
+
+    return {
+        "documents": [{"format": fmt, "intent": intent, "count": count} for fmt, intent, count in documents],
+        "total_documents": sum(count for _, _, count in documents),
+        "failed_results": failed,
+        "stage_latency": {name: _latency_row(values) for name, values in sorted(stages.items())},
+        "chain_latency": {name: _latency_row(values) for name, values in sorted(chains.items())},
+        "retries": retries,
+        "retry_giveups": giveups,
+        "cache": {"lookups": lookups, "hits": hits, "hit_rate": round(hits / lookups, 4) if lookups else 0.0},
+        "db_commit_latency": _latency_row(list(commits.values())),
+    }
+
+def _latency_table(title: str, rows: Dict[str, Dict[str, Any]]) -> Table:
+    table = Table(title=title)
+    table.add_column("Name", style="cyan")
+    for column in ("Count", "p50 (ms)", "p95 (ms)", "Mean (ms)"):
+        table.add_column(column, style="green", justify="right")
+    for name, row in rows.items():
+        table.add_row(name, str(row["count"]), f"{row['p50_ms']:.2f}", f"{row['p95_ms']:.2f}", f"{row['mean_ms']:.2f}")
+    return table
 
 @app.command()
-def view_classifications():
-    """View all classifications"""
-    conn = connect_db()
-    cursor = conn.execute("""
-        SELECT c.input_id, c.format, c.intent, c.reasoning, c.timestamp 
-        FROM classifications c
-        JOIN inputs i ON c.input_id = i.input_id
-    """)
-    data = cursor.fetchall()
+def stats(as_json: bool = typer.Option(False, "--json", help="Print the aggregates as JSON")):
+    """Aggregate document counts, latencies, retries, cache hits and DB commit times"""
+    result = compute_stats(connect_db())
+    if as_json:
+        console.print_json(json.dumps(result))
+        return
     
-    table = Table(title="Classifications")
-    table.add_column("ID", style="cyan")
+    table = Table(title=f"Documents ({result['total_documents']} total, {result['failed_results']} failed)")
     table.add_column("Format", style="green")
     table.add_column("Intent", style="blue")
-    table.add_column("Reasoning", style="yellow")
-    table.add_column("Timestamp", style="magenta")
+    table.add_column("Count", style="cyan", justify="right")
+    for row in result["documents"]:
+        table.add_row(row["format"], row["intent"], str(row["count"]))
+    console.print(table)
     
-    for row in data:
-        table.add_row(str(row[0]), str(row[1]), str(row[2]), str(row[3])[:50] + "...", str(row[4]))
+    if not result["stage_latency"]:
+        console.print("[yellow]No spans stored; process with FLOWBIT_TRACING=1 for latency, retry and cache numbers[/yellow]")
+        return
+    console.print(_latency_table("Stage latency", result["stage_latency"]))
+    console.print(_latency_table("LLM latency per chain", result["chain_latency"]))
+    console.print(_latency_table("DB commit latency", {"sqlite.commit": result["db_commit_latency"]}))
+    cache = result["cache"]
+    console.print(f"Retries: {result['retries']} ({result['retry_giveups']} gave up)")
+    console.print(f"Cache: {cache['hits']}/{cache['lookups']} hits ({cache['hit_rate']:.1%})")
+
+def fetch_stripped_spans(conn, input_id: str):
+    """Quoted history, signatures and disclaimers removed from an input before prompting."""
+    try:
+        rows = conn.execute(SELECT_STRIPPED_SPANS_SQL, (input_id,))
+        return [{"kind": row[0], "start": row[1], "end": row[2], "text": row[3]} for row in rows]
+    except sqlite3.OperationalError:
+        return []
+
+# listings are paged by (timestamp, input_id), which the indexes in memory.py cover
+PAGE_SIZE = 50
+FETCH_ROWS = 500
+LISTINGS = {
+    # compact inputs written before inputs.preview existed show none until migrate_storage.py backfills it
+    "inputs": ("i", ["input_id", "preview", "timestamp", "input_type"],
+               "SELECT i.input_id, COALESCE(i.preview, substr(i.input_text, 1, 50)), i.timestamp, i.input_type FROM inputs i"),
+    "classifications": ("c", ["input_id", "format", "intent", "reasoning", "timestamp"],
+                        "SELECT c.input_id, c.format, c.intent, substr(c.reasoning, 1, 50), c.timestamp FROM classifications c"),
+    # rows written before results.summary existed fall back to the start of the JSON
+    "results": ("r", ["input_id", "summary", "timestamp"],
+                "SELECT r.input_id, COALESCE(r.summary, substr(r.result_data, 1, 50)), r.timestamp FROM results r"),
+}
+
+def _cursor_value(row: Dict[str, Any]) -> str:
+    return f"{row['timestamp']},{row['input_id']}"
+
+def _check_timestamp(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            raise typer.BadParameter(f"not an ISO date or datetime: {value}")
+    return value
+
+def list_rows(conn, listing: str, intent: Optional[str] = None, format: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None, after: Optional[str] = None,
+              limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows of a listing in (timestamp, input_id) order.
+
+    since is inclusive and until exclusive; after is the cursor printed with
+    the previous page, so each page is an index range scan however deep it is.
+    """
+    alias, columns, sql = LISTINGS[listing]
+    register_blob_functions(conn)
+    clauses: List[str] = []
+    params: List[Any] = []
+    if (intent or format) and alias != "c":
+        sql += f" JOIN classifications c ON c.input_id = {alias}.input_id"
+    for column, value in (("c.intent", intent), ("c.format", format)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since:
+        clauses.append(f"{alias}.timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append(f"{alias}.timestamp < ?")
+        params.append(until)
+    if after:
+        timestamp, _, input_id = after.partition(",")
+        clauses.append(f"({alias}.timestamp, {alias}.input_id) > (?, ?)")
+        params.extend([timestamp, input_id])
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {alias}.timestamp, {alias}.input_id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(columns, row))
+
+def _show_listing(listing: str, title: str, styles: Dict[str, str], intent: Optional[str], format: Optional[str],
+                  since: Optional[str], until: Optional[str], after: Optional[str], limit: Optional[int], jsonl: bool):
+    rows = list_rows(connect_db(), listing, intent, format, _check_timestamp(since), _check_timestamp(until), after,
+                     limit if limit is not None or jsonl else PAGE_SIZE)
+    if jsonl:
+        # one line per row as it is read, for piping into other tools
+        for row in rows:
+            sys.stdout.write(json.dumps(row) + "\n")
+        return
     
+    table = Table(title=title)
+    for column, style in styles.items():
+        table.add_column(column, style=style)
+    last = None
+    for last in rows:
+        table.add_row(*(str(value) for value in last.values()))
     console.print(table)
+    if last is not None and table.row_count == (limit or PAGE_SIZE):
+        console.print(f"Next page: --after '{_cursor_value(last)}'")
+
+# options shared by the listing commands
+INTENT_OPTION = typer.Option(None, help="Only rows classified with this intent")
+FORMAT_OPTION = typer.Option(None, "--format", help="Only rows classified with this format")
+SINCE_OPTION = typer.Option(None, help="Only rows at or after this ISO date/time")
+UNTIL_OPTION = typer.Option(None, help="Only rows before this ISO date/time")
+AFTER_OPTION = typer.Option(None, help="Cursor printed with the previous page")
+LIMIT_OPTION = typer.Option(None, help=f"Rows to show (default {PAGE_SIZE}; all with --jsonl)")
+JSONL_OPTION = typer.Option(False, "--jsonl", help="Stream rows as JSON lines instead of a table")
 
 @app.command()
-def view_results():
-    """View processing results"""
-    conn = connect_db()
-    cursor = conn.execute("SELECT input_id, result_data, timestamp FROM results")
-    data = cursor.fetchall()
-    
-    table = Table(title="Processing Results")
-    table.add_column("ID", style="cyan")
-    table.add_column("Result", style="green")
-    table.add_column("Timestamp", style="magenta")
-    
-    for row in data:
-        result_preview = json.dumps(json.loads(row[1]), indent=2)[:50] + "..."
-        table.add_row(str(row[0]), result_preview, str(row[2]))
-    
-    console.print(table)
+def view_inputs(intent: Optional[str] = INTENT_OPTION, format: Optional[str] = FORMAT_OPTION,
+                since: Optional[str] = SINCE_OPTION, until: Optional[str] = UNTIL_OPTION,
+                after: Optional[str] = AFTER_OPTION, limit: Optional[int] = LIMIT_OPTION, jsonl: bool = JSONL_OPTION):
+    """View stored inputs, oldest first"""
+    _show_listing("inputs", "Stored Inputs", {"ID": "cyan", "Text": "green", "Timestamp": "magenta", "Type": "yellow"},
+                  intent, format, since, until, after, limit, jsonl)
+
+@app.command()
+def view_classifications(intent: Optional[str] = INTENT_OPTION, format: Optional[str] = FORMAT_OPTION,
+                         since: Optional[str] = SINCE_OPTION, until: Optional[str] = UNTIL_OPTION,
+                         after: Optional[str] = AFTER_OPTION, limit: Optional[int] = LIMIT_OPTION,
+                         jsonl: bool = JSONL_OPTION):
+    """View classifications, oldest first"""
+    _show_listing("classifications", "Classifications",
+                  {"ID": "cyan", "Format": "green", "Intent": "blue", "Reasoning": "yellow", "Timestamp": "magenta"},
+                  intent, format, since, until, after, limit, jsonl)
+
+@app.command()
+def view_results(intent: Optional[str] = INTENT_OPTION, format: Optional[str] = FORMAT_OPTION,
+                 since: Optional[str] = SINCE_OPTION, until: Optional[str] = UNTIL_OPTION,
+                 after: Optional[str] = AFTER_OPTION, limit: Optional[int] = LIMIT_OPTION, jsonl: bool = JSONL_OPTION):
+    """View processing results, oldest first"""
+    _show_listing("results", "Processing Results", {"ID": "cyan", "Result": "green", "Timestamp": "magenta"},
+                  intent, format, since, until, after, limit, jsonl)
 
 @app.command()
 def view_full_record(input_id: str):
@@ -76,7 +270,7 @@ def view_full_record(input_id: str):
     conn = connect_db()
     
     # Get input
-    cursor = conn.execute("SELECT * FROM inputs WHERE input_id = ?", (input_id,))
+    cursor = conn.execute(SELECT_INPUT_SQL, (input_id,))
     input_data = cursor.fetchone()
     
     # Get classification
@@ -84,12 +278,12 @@ def view_full_record(input_id: str):
     classification = cursor.fetchone()
     
     # Get result
-    cursor = conn.execute("SELECT * FROM results WHERE input_id = ?", (input_id,))
+    cursor = conn.execute(SELECT_RESULT_SQL, (input_id,))
     result = cursor.fetchone()
     
     if input_data:
         console.print(f"\n[cyan]Input Record[/cyan] (ID: {input_id})")
-        console.print(f"Text: {input_data[1]}")
+        console.print(f"Text: {input_data[1] if input_data[1] is not None else blob_text(input_data[5], input_data[6])}")
         console.print(f"Type: {input_data[3]}")
         console.print(f"Timestamp: {input_data[2]}")
         
@@ -101,9 +295,54 @@ def view_full_record(input_id: str):
             
         if result:
             console.print("\n[yellow]Processing Result[/yellow]")
-            console.print(json.dumps(json.loads(result[1]), indent=2))
+            console.print(json.dumps(json.loads(result[1] if result[1] is not None else blob_text(result[3], result[4])), indent=2))
+        
+        stripped = fetch_stripped_spans(conn, input_id)
+        if stripped:
+            console.print("\n[magenta]Stripped Before Prompting[/magenta]")
+            for span in stripped:
+                console.print(f"{span['kind']} [{span['start']}:{span['end']}]: {span['text'][:80]!r}")
     else:
         console.print(f"[red]No record found for ID: {input_id}[/red]")
 
+@app.command()
+def view_trace(input_id: str):
+    """View the timed stages recorded for an input (needs FLOWBIT_TRACING=1 when processing)"""
+    conn = connect_db()
+    spans = fetch_spans(conn, input_id)
+    if not spans:
+        console.print(f"[red]No spans recorded for ID: {input_id}[/red]")
+        return
+    
+    depth = {}
+    for span in spans:
+        depth[span["span_id"]] = depth.get(span["parent_id"], -1) + 1
+    
+    table = Table(title=f"Trace {input_id}")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Duration (ms)", style="green", justify="right")
+    table.add_column("Attributes", style="yellow")
+    
+    for span in spans:
+        table.add_row("  " * depth[span["span_id"]] + span["name"], f"{span['duration_us'] / 1000:.2f}",
+                      json.dumps(span["attributes"])[:80])
+    
+    console.print(table)
+
+@app.command()
+def export_traces(output: str, input_id: Optional[str] = None, format: str = typer.Option("chrome", help="chrome or jsonl")):
+    """Export stored spans as a Chrome trace (chrome://tracing, Perfetto) or JSONL"""
+    spans = fetch_spans(connect_db(), input_id)
+    
+    with open(output, "w", encoding="utf-8") as f:
+        if format == "chrome":
+            json.dump(to_chrome_trace(spans), f)
+        elif format == "jsonl":
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+        else:
+            raise typer.BadParameter("format must be chrome or jsonl")
+    console.print(f"Exported {len(spans)} spans to {output}")
+
 if __name__ == "__main__":
     app()
\ No newline at end of file